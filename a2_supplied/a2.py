@@ -1,10 +1,11 @@
 from __future__ import annotations
 from collections import UserString
+from heapq import heappop, heappush
 from math import floor
 #from tkinter.constants import FALSE, TRUE
-from typing import Dict, List, Optional, Tuple
+from typing import Dict, Hashable, List, Optional, Tuple
+from weakref import WeakValueDictionary
 from a2_support import *
-import copy
 
 
 # Replace these <strings> with your name, student number and email address.
@@ -20,6 +21,8 @@ class PokemonStats(object):
     """
     #A class modelling the stats of a pokemon. These stats must be non-negative.
     """
+    __slots__ = ('_hit_chance', '_max_health', '_attack', '_defense')
+
     def __init__(self, stats: Tuple[float, int, int, int]) -> None:
         """
         Constructs an instance of PokemonStats.
@@ -82,6 +85,10 @@ class PokemonStats(object):
 
         return PokemonStats(tuple(modified_stats))
 
+    def copy(self) -> PokemonStats:
+        """Return a new PokemonStats instance with the same stats as this one."""
+        return PokemonStats((self._hit_chance, self._max_health, self._attack, self._defense))
+
     def __str__(self) -> str:
         """Returns the string representation of this class."""
         return str(f'PokemonStats(({self.get_hit_chance()}, {self.get_max_health()}, {self.get_attack()}, {self.get_defense()}))')
@@ -97,6 +104,9 @@ class Pokemon(object):
     A pokemon's level is determined by its experience points, through the formula: level = floor(experience ^ (1/3)).
     A pokemon can learn a maximum of 4 moves.
     """
+    __slots__ = ('_name', '_stats_unmod', '_stats', '_element_type', '_element_index', '_moves', '_level',
+                 '_current_health', '_move_uses', '_experience', '_modifier', '_fainted', '_owners')
+
     def __init__(self, name: str, stats: PokemonStats, element_type: str, moves: List[ForwardRef('Move')], level: int = 1) -> None:
         """
         Creates a Pokemon instance.
@@ -110,12 +120,22 @@ class Pokemon(object):
         _current_health : pokemon's health during battle.
         _move_uses      : A dictionary of uses related to each move.
         _experience     : The experience this pokemon owns. At the begining, it would be level^3
-        _modifier       : A list of modifiers working on this pokemon.
+        _element_index  : The interned index of this pokemon's type in the effectiveness matrix.
+        _modifier       : A list of modifiers working on this pokemon, in the order they were added.
         _stats_unmod    : The pokemon's stats not effected by modifiers
+        _stats          : The cached stats after all modifiers have been applied.
+        _fainted        : Whether this pokemon had fainted when its health or stats last changed.
+        _owners         : The trainers with this pokemon in their roster, whose alive counts follow _fainted.
+
+        Notes
+        The stats are copied once on creation. After that the pokemon never modifies a PokemonStats in place,
+        so _stats and _stats_unmod may safely share an instance without being copied.
         """
         self._name          = name
-        self._stats         = copy.deepcopy(stats)
+        self._stats_unmod   = stats.copy()
+        self._stats         = self._stats_unmod
         self._element_type  = element_type
+        self._element_index = ElementType.index_of(element_type)
         self._moves         = moves
         self._level         = level
 
@@ -123,7 +143,8 @@ class Pokemon(object):
         self._move_uses      = dict()
         self._experience     = pow(self.get_level(), 3)
         self._modifier       = list()
-        self._stats_unmod    = copy.deepcopy(stats)
+        self._fainted        = self._stats.get_max_health() == 0
+        self._owners         = ()
 
     def get_name(self) -> str:
         """Get this pokemon's name."""
@@ -205,6 +226,19 @@ class Pokemon(object):
             self._current_health = self.get_max_health()
         elif self._current_health < 0:
             self._current_health = 0
+        self._update_fainted()
+
+    def _update_fainted(self) -> None:
+        """
+        Records whether this pokemon has fainted, and updates the alive counts of its owners if that has changed.
+        Health is -1 until it is first read, so this pokemon has fainted iff either its health or its max health is 0.
+        """
+        fainted = self._current_health == 0 or self._stats.get_max_health() == 0
+        if fainted != self._fainted:
+            self._fainted = fainted
+            change = -1 if fainted else 1
+            for trainer in self._owners:
+                trainer._alive += change
 
     def gain_experience(self, experience: int) -> None:
         """
@@ -223,14 +257,19 @@ class Pokemon(object):
         Increase the level of this pokemon.
         leveling up grows the pokemon's stats, and increase its current health by the amount that the maximum hp increased.
         """
-        self._stats = copy.deepcopy(self._stats_unmod)
+        self._stats = self._stats_unmod
         health_reduced = self.get_max_health() - self.get_health()
         self._level = self.get_level() + 1
-        self._stats.level_up()
-        self._stats_unmod = copy.deepcopy(self._stats)
+        self._stats_unmod = self._stats_unmod.copy()
+        self._stats_unmod.level_up()
+        self._stats = self._stats_unmod
         """Method : Increase its current health by the amount that the maximum hp increased."""
         if self.get_health() != 0:
             self._current_health = self._stats.get_max_health() - health_reduced
+        """Method : Rebuild the cached stats on top of the grown unmodified stats, and clamp health to the modified max health."""
+        self._stats = self._apply_modifiers()
+        self._current_health = self.get_health()
+        self._update_fainted()
 
     def experience_on_death(self) -> int:
         """
@@ -294,16 +333,27 @@ class Pokemon(object):
         rounds   : The number of rounds that the stat modifier will be in effect for.
         """
         self._modifier.append((modifier,rounds))
-        self._stats = self.get_stats()
+        """Method : Modifiers are applied in order, so the new one can be applied on top of the cached stats."""
+        self._stats = self._stats.apply_modifier(modifier)
+        """Method : Clamp health to the new max health straight away, rather than whenever it is next read."""
+        self._current_health = self.get_health()
+        self._update_fainted()
         
     def get_stats(self) -> PokemonStats:
-        """Return the pokemon stats after applying all current modifications."""
-        self._stats = copy.deepcopy(self._stats_unmod)
-        """Method : Apply all current codifications."""
+        """
+        Return the pokemon stats after applying all current modifications.
+        These are cached, and only rebuilt when the modifiers or the unmodified stats change.
+        """
+        return self._stats
+
+    def _apply_modifiers(self) -> PokemonStats:
+        """Return the unmodified stats after applying all current modifications in order."""
+        stats = self._stats_unmod
+        """Method : Apply all current codifications. apply_modifier returns a new instance, so the unmodified stats are never changed."""
         for mod in self._modifier:
-            self._stats = self._stats.apply_modifier(mod[0])
+            stats = stats.apply_modifier(mod[0])
 
-        return self._stats
+        return stats
 
     def post_round_actions(self) -> None:
         """
@@ -311,21 +361,22 @@ class Pokemon(object):
         Hint: students should make sure that the pokemon's health is updated appropriately after status modifiers are removed, 
               i.e. the pokemon's health should never exceed its max health.
         """
-        round_index = 1
+        expired = False
         modifier_changed = list()
         
         """Method : Decrement the remaining number of rounds they are in effect for or delete them if rounds are 1."""
-        for mod_index in range(len(self._modifier)-1,-1,-1):
-            if self._modifier[mod_index][round_index] == 1:
-                self._modifier.pop(mod_index)
+        for modifier_used, rounds in self._modifier:
+            if rounds == 1:
+                expired = True
             else:
-                modifier_used, round_decreased = self._modifier[mod_index]
-                round_decreased = round_decreased - 1
-                modifier_changed.append((modifier_used, round_decreased))
+                modifier_changed.append((modifier_used, rounds - 1))
 
         self._modifier = modifier_changed
-        self._stats = self.get_stats()
+        """Method : The cached stats only need rebuilding when a modifier has been removed."""
+        if expired:
+            self._stats = self._apply_modifiers()
         self._current_health = self.get_health()
+        self._update_fainted()
 
     def rest(self) -> None:
         """Returns this pokemon to max health, removes any remaining status modifiers, and resets all move uses to their maximums."""
@@ -334,7 +385,47 @@ class Pokemon(object):
         self._modifier       = []
         for move in self._moves:
             self._move_uses[move] = move.get_max_uses()
-        
+        self._update_fainted()
+
+    def fork(self) -> Pokemon:
+        """
+        Return an independent copy of this pokemon, e.g. to simulate ahead from the current battle state.
+        Stats and moves are never modified in place, so they are shared with the copy rather than copied.
+        The copy has no owners until it is added to a trainer, or its trainer is forked.
+        """
+        clone = Pokemon.__new__(type(self))
+        clone._name           = self._name
+        clone._stats_unmod    = self._stats_unmod
+        clone._stats          = self._stats
+        clone._element_type   = self._element_type
+        clone._element_index  = self._element_index
+        clone._moves          = list(self._moves)
+        clone._level          = self._level
+        clone._current_health = self._current_health
+        clone._move_uses      = dict(self._move_uses)
+        clone._experience     = self._experience
+        clone._modifier       = list(self._modifier)
+        clone._fainted        = self._fainted
+        clone._owners         = ()
+        if hasattr(self, '__dict__'):
+            """Method : Subclasses without __slots__ keep their own attributes too."""
+            clone.__dict__.update(self.__dict__)
+        return clone
+
+    def __setstate__(self, state: Tuple[Optional[Dict[str, object]], Dict[str, object]]) -> None:
+        """
+        Restores a copied or unpickled pokemon. The type index is interned again, as it may differ between processes.
+
+        Parameters
+        state : The attributes of this pokemon which are not slots, if it has any, and the values of its slots.
+        """
+        attributes, slots = state
+        if attributes is not None:
+            self.__dict__.update(attributes)
+        for name, value in slots.items():
+            setattr(self, name, value)
+        self._element_index = ElementType.index_of(self._element_type)
+
     def __str__(self) -> str:
         """Returns a simple representation of this pokemons name and level."""
         return str(f'{self.get_name()} (lv{self.get_level()})')
@@ -344,6 +435,157 @@ class Pokemon(object):
         return str(self)   
 
 
+class Inventory(dict):
+    """
+    A trainer's inventory: a dictionary mapping items to the count of that item remaining.
+    Alongside the counts, it keeps indexes of the items in each ranked category, which are updated on every change,
+    so the best item of a category is found without scanning the whole inventory.
+
+    Categories
+    Pokeball : Ranked by catch chance.
+    Food     : Ranked by health restored.
+    """
+    # The attribute each category of item is ranked by, with higher values being better.
+    RANKED_CATEGORIES = {'Pokeball': '_catch_chance', 'Food': '_health_restored'}
+
+    # The ranked category of each item class seen so far, by class.
+    _categories: Dict[type, Optional[str]] = {}
+
+    def __init__(self) -> None:
+        """
+        Creates an empty inventory.
+
+        Parameters
+        members : The items of each category in the order they were added, by category name.
+        totals  : The total count of the items of each category, by category name.
+        heaps   : A max-heap of (-rank, order added, item) entries for each ranked category.
+                  Entries for items which have run out are only discarded when they reach the top of the heap.
+        indexed : The items which have an entry in their category's heap.
+        """
+        super().__init__()
+        self._members = {category: dict() for category in Inventory.RANKED_CATEGORIES}
+        self._totals = {category: 0 for category in Inventory.RANKED_CATEGORIES}
+        self._heaps = {category: list() for category in Inventory.RANKED_CATEGORIES}
+        self._indexed = set()
+        self._added = 0
+
+    @staticmethod
+    def category_of(item: Item) -> Optional[str]:
+        """Return the name of the ranked category the item belongs to, or None if it isn't ranked."""
+        item_cls = type(item)
+        if item_cls not in Inventory._categories:
+            names = [cls.__name__ for cls in item_cls.__mro__ if cls.__name__ in Inventory.RANKED_CATEGORIES]
+            Inventory._categories[item_cls] = names[0] if names else None
+        return Inventory._categories[item_cls]
+
+    def __setitem__(self, item: Item, count: int) -> None:
+        """Sets the count of the item, updating the indexes of its category."""
+        category = Inventory.category_of(item)
+        if category is not None:
+            self._totals[category] += count - self.get(item, 0)
+            self._members[category][item] = None
+            if item not in self._indexed:
+                self._indexed.add(item)
+                self._added += 1
+                rank = getattr(item, Inventory.RANKED_CATEGORIES[category])
+                heappush(self._heaps[category], (-rank, self._added, item))
+        super().__setitem__(item, count)
+
+    def __delitem__(self, item: Item) -> None:
+        """Removes the item, updating the indexes of its category."""
+        count = self[item]
+        super().__delitem__(item)
+        category = Inventory.category_of(item)
+        if category is not None:
+            self._totals[category] -= count
+            del self._members[category][item]
+
+    def pop(self, item: Item, *default) -> int:
+        """Removes the item and returns its count, or the default if it isn't in the inventory."""
+        if item not in self:
+            return dict.pop(self, item, *default)
+        count = self[item]
+        del self[item]
+        return count
+
+    def popitem(self) -> Tuple[Item, int]:
+        """Removes and returns the most recently added item and its count."""
+        item = next(reversed(self))
+        return item, self.pop(item)
+
+    def setdefault(self, item: Item, count: int = 0) -> int:
+        """Return the count of the item, adding it with the supplied count if it isn't in the inventory."""
+        if item not in self:
+            self[item] = count
+        return self[item]
+
+    def update(self, *args, **kwargs) -> None:
+        """Sets the counts of every item in the supplied mapping or pairs."""
+        for item, count in dict(*args, **kwargs).items():
+            self[item] = count
+
+    def clear(self) -> None:
+        """Removes every item."""
+        super().clear()
+        for category in Inventory.RANKED_CATEGORIES:
+            self._members[category].clear()
+            self._totals[category] = 0
+            self._heaps[category].clear()
+        self._indexed.clear()
+
+    def __reduce__(self) -> tuple:
+        """Copies and pickles the inventory by its items, so that the indexes are rebuilt rather than duplicated."""
+        return Inventory, (), None, None, iter(self.items())
+
+    def get_items(self, category: str) -> List[Item]:
+        """Return the items of the named category in the inventory, in the order they were added."""
+        return list(self._members[category])
+
+    def get_first(self, category: str) -> Optional[Item]:
+        """Return the item of the named category which was added first, or None if there isn't one."""
+        return next(iter(self._members[category]), None)
+
+    def get_total(self, category: str) -> int:
+        """Return the total count of the items of the named category in the inventory."""
+        return self._totals[category]
+
+    def get_best(self, category: str) -> Optional[Item]:
+        """
+        Return the highest ranked item of the named category which has uses remaining, or None if there isn't one.
+        Ties go to the item added first.
+
+        Parameters
+        category : The name of a ranked category, e.g. 'Pokeball'.
+        """
+        heap = self._heaps[category]
+        while heap:
+            item = heap[0][2]
+            if self.get(item, 0) > 0:
+                return item
+            heappop(heap)
+            self._indexed.discard(item)
+        return None
+
+    def get_best_pokeball(self) -> Optional[Pokeball]:
+        """Return the pokeball with the highest catch chance which has uses remaining, or None if there isn't one."""
+        return self.get_best('Pokeball')
+
+    def get_best_food(self) -> Optional[Food]:
+        """Return the food restoring the most health which has uses remaining, or None if there isn't one."""
+        return self.get_best('Food')
+
+    def copy(self) -> Inventory:
+        """Return a copy of this inventory and its indexes. Items are never modified, so they are shared."""
+        clone = Inventory.__new__(Inventory)
+        dict.update(clone, self)
+        clone._members = {category: dict(members) for category, members in self._members.items()}
+        clone._totals = dict(self._totals)
+        clone._heaps = {category: list(heap) for category, heap in self._heaps.items()}
+        clone._indexed = set(self._indexed)
+        clone._added = self._added
+        return clone
+
+
 class Trainer(object):
     """A class representing a pokemon trainer. A trainer can have 6 Pokemon at maximum."""
     def __init__(self, name: str) -> None:
@@ -355,11 +597,13 @@ class Trainer(object):
         item            : A dictionary of items that this trainer owns.
         pokemon         : A list of pokemons that this trainer owns.
         current_pokemon : The pokemon that facing the battle.
+        alive           : The number of pokemon in the roster which have not fainted, kept up to date by the pokemon themselves.
         """
         self._trainer_name = name
-        self._item = dict()
+        self._item = Inventory()
         self._pokemon = list()
         self._current_pokemon = Pokemon
+        self._alive = 0
 
     def get_name(self) -> str:
         """Return the trainer's name."""
@@ -392,11 +636,8 @@ class Trainer(object):
 
     def all_pokemon_fainted(self) -> bool:
         """Return true iff all the trainer's pokemon have fainted."""
-        for index in range(len(self._pokemon)):
-            if self._pokemon[index].get_health() != 0:
-                return False
-        
-        return True
+        """Method : Each pokemon updates the alive count as it faints or recovers, so the roster isn't scanned."""
+        return self._alive == 0
 
     def can_add_pokemon(self, pokemon: Pokemon) -> bool:
         """
@@ -414,6 +655,10 @@ class Trainer(object):
         If there were no Pokemon in the roster prior to calling this method, set the current pokemon to the one that was added.
         """
         self._pokemon.append(pokemon)
+        pokemon._update_fainted()
+        pokemon._owners += (self,)
+        if not(pokemon._fainted):
+            self._alive += 1
         if self._current_pokemon == Pokemon:
             self._current_pokemon = pokemon
 
@@ -465,10 +710,29 @@ class Trainer(object):
 
     def use_item(self, item: Item) -> None:
         """If the item is present in the trainer's inventory, decrement its count. Removes the item from the inventory entirely if its count hits 0."""
-        item.decrement_item_count(self._trainer_name)
+        item.decrement_item_count(self)
 
-        if self._item.get(self) == 0:
-            del self._item[self]
+    def fork(self, forks: Optional[Dict[int, Pokemon]] = None) -> Trainer:
+        """
+        Return an independent copy of this trainer, their pokemon and their inventory, e.g. to simulate ahead from the current battle state.
+
+        Parameters
+        forks : The copies already made of pokemon shared with another trainer, by the id of the original. New copies are added to it.
+        """
+        if forks is None:
+            forks = dict()
+        for pokemon in self._pokemon:
+            if id(pokemon) not in forks:
+                forks[id(pokemon)] = pokemon.fork()
+
+        clone = Trainer.__new__(type(self))
+        clone.__dict__.update(self.__dict__)
+        clone._item = self._item.copy()
+        clone._pokemon = [forks[id(pokemon)] for pokemon in self._pokemon]
+        clone._current_pokemon = forks.get(id(self._current_pokemon), self._current_pokemon)
+        for pokemon in clone._pokemon:
+            pokemon._owners += (clone,)
+        return clone
 
     def __str__(self) -> str:
         """Returns a string representation of a Trainer"""
@@ -502,7 +766,11 @@ class Battle(object):
         trainer_action    : The action of the player.
         enemy_action      : The action of the enemy.
         end_early         : The bool value represents that if the battle ends early.
-        performed         : The action situation -> 0: Sction queue is empty 1: Action of player is performed.  2: Action of enemy is performed. 
+        order             : The trainer whose queued action is enacted next: True for the player, False for the enemy, or None until the round is ready.
+                            It is resolved from the actions' priorities once, when the queue fills, and moves to the other trainer after the first action is enacted.
+        rng               : The stream of random numbers used for the chance rolls of this battle.
+        version           : The number of changes to the battle state which can affect the trainers' legal actions.
+        legal_actions     : The legal actions of each trainer, with the version they were found at, by is_player.
         """
         self._no_action         = Attack('None', 'None', 0, 0, 0, 0)
         self._player            = player
@@ -511,22 +779,17 @@ class Battle(object):
         self._trainer_action    = self._no_action
         self._enemy_action      = self._no_action
         self._end_early         = False
-        self._performed         = 0 
+        self._order             = None
+        self._rng               = BattleRandom()
+        self._version           = 0
+        self._legal_actions     = dict()
 
     def get_turn(self) -> Optional[bool]:
         """Get whose turn it currently is"""
-        if self.is_over() or self.is_action_queue_empty() or not(self.is_ready()):
+        if self._order == None or self.is_over():
             return None
 
-        if self.is_action_queue_full():
-            if (self._trainer_action.get_priority() <= self._enemy_action.get_priority()):
-                return True
-            else:
-                return False
-        elif self.trainer_has_action_queued(True):
-            return True
-        else:
-            return False
+        return self._order
         
     def get_trainer(self, is_player: bool) -> Trainer:
         """
@@ -540,6 +803,20 @@ class Battle(object):
         else:
             return self._enemy
     
+    def get_random(self) -> BattleRandom:
+        """Return the stream of random numbers used for the chance rolls of this battle."""
+        return self._rng
+
+    def set_random(self, rng: BattleRandom) -> None:
+        """
+        Sets the stream of random numbers used for the chance rolls of this battle.
+        By default a battle draws from the module-wide generator, so battles which need to be reproduced on their own should be given a seeded stream.
+
+        Parameters
+        rng : The stream to use.
+        """
+        self._rng = rng
+
     def attempt_end_early(self) -> None:
         """Ends the battle early if it's not a trainer battle"""
         if not(self.is_trainer_battle()):
@@ -551,17 +828,11 @@ class Battle(object):
 
     def is_action_queue_full(self) -> bool:
         """Returns true if both trainers have an action queued."""
-        if self.trainer_has_action_queued(True) and self.trainer_has_action_queued(False):
-            return True
-        else:
-            return False
+        return self._trainer_action is not self._no_action and self._enemy_action is not self._no_action
 
     def is_action_queue_empty(self) -> bool:
         """Returns true if neither trainer have an action queued."""
-        if self.trainer_has_action_queued(True) or self.trainer_has_action_queued(False):
-            return False
-        else:
-            return True
+        return self._trainer_action is self._no_action and self._enemy_action is self._no_action
 
     def trainer_has_action_queued(self, is_player: bool) -> bool:
         """
@@ -570,12 +841,11 @@ class Battle(object):
         Parameters
         is_player : True iff the trainer we want to check for is the player.
         """
-        if is_player and (self._trainer_action != self._no_action):
-            return True
-        elif not(is_player) and (self._enemy_action != self._no_action):
-            return True
+        """Method : The queue slots only ever hold the battle's own sentinel when empty, so it is compared by identity."""
+        if is_player:
+            return self._trainer_action is not self._no_action
         else:
-            return False
+            return self._enemy_action is not self._no_action
 
     def is_ready(self) -> bool:
         """
@@ -583,12 +853,8 @@ class Battle(object):
         The battle is deemed ready if neither trainer has performed an action this round and the action queue is full, 
         or if one trainer has performed an action, and the other trainer is in the queue.
         """
-        if self.is_action_queue_full():
-            return True
-        elif not(self.is_action_queue_empty()) and (self._performed != 0):
-            return True
-        else:
-            return False        
+        """Method : The order is only resolved in exactly those states."""
+        return self._order != None
 
     def queue_action(self, action: Action, is_player: bool) -> None:  
         """
@@ -604,6 +870,11 @@ class Battle(object):
                 self._trainer_action = action
             else:
                 self._enemy_action = action
+            """Method : Once the queue is full, resolve the order of the round. Ties go to the player."""
+            if self.is_action_queue_full():
+                self._order = self._trainer_action.get_priority() <= self._enemy_action.get_priority()
+            """Method : Queueing an action changes what that trainer, and once the queue is full both trainers, could queue."""
+            self._version += 1
 
         self.trainer_has_action_queued(is_player)
 
@@ -615,32 +886,79 @@ class Battle(object):
         1. If the next action in the queue is invalid, it should still be removed from the queue.
         2. If this was the last turn to be performed that round, perform the post round actions.
         """
-        #self._performed check the action situation -> 0: Sction queue is empty 1: Action of player is performed.  2: Action of enemy is performed.
         player_turn = self.get_turn()
-        if (player_turn == None) or (self.is_ready() == False):
+        if player_turn == None:
             return ActionSummary("The round is not ready!")
+        self._version += 1
 
+        """Method : Actions are never modified by being applied, so the queued instance is enacted directly rather than copied."""
         if player_turn:
-            action_enact = copy.deepcopy(self._trainer_action)
+            action_enact = self._trainer_action
             self._trainer_action = self._no_action
-            self._performed = 1
-            """Method : If this was the last turn to be performed that round, perform the post round actions."""
-            if self.is_action_queue_empty():
-                self._player._current_pokemon.post_round_actions()
-                self._enemy._current_pokemon.post_round_actions()
-                self._performed = 0
         else:
-            action_enact = copy.deepcopy(self._enemy_action)
+            action_enact = self._enemy_action
             self._enemy_action = self._no_action
-            self._performed = 2
-            """Method : If this was the last turn to be performed that round, perform the post round actions."""
-            if self.is_action_queue_empty():
-                self._player._current_pokemon.post_round_actions()
-                self._enemy._current_pokemon.post_round_actions()
-                self._performed = 0
+
+        """Method : If this was the last turn to be performed that round, perform the post round actions. Otherwise the other trainer goes next."""
+        if self.is_action_queue_empty():
+            self._player._current_pokemon.post_round_actions()
+            self._enemy._current_pokemon.post_round_actions()
+            self._order = None
+        else:
+            self._order = not(player_turn)
 
         return action_enact.apply(self, player_turn)
 
+    def get_legal_actions(self, is_player: bool) -> List[Action]:
+        """
+        Returns every action the trainer could queue in the current battle state, in one pass: their current pokemon's moves with uses remaining,
+        valid switches in roster order, the items in their inventory and fleeing.
+        This is empty if queue_action would reject any action, i.e. if the battle is over, the round is ready or the trainer already has an action queued.
+        The result is cached until queue_action or enact_turn next changes the battle state.
+        Changes made to the trainers or their pokemon in any other way must be followed by a call to invalidate_legal_actions.
+
+        Parameters
+        is_player : True iff the actions are for the player.
+        """
+        cached = self._legal_actions.get(is_player)
+        if cached is not None and cached[0] == self._version:
+            return list(cached[1])
+
+        actions = list()
+        if not(self.is_over()) and not(self.is_ready()) and not(self.trainer_has_action_queued(is_player)):
+            trainer = self.get_trainer(is_player)
+            pokemon = trainer._current_pokemon
+            fainted = pokemon.has_fainted()
+            if not(fainted):
+                actions.extend(move for move in pokemon._moves if pokemon.get_remaining_move_uses(move))
+            actions.extend(SwitchPokemon(index) for index in range(len(trainer._pokemon)) if trainer.can_switch_pokemon(index))
+            if not(fainted):
+                actions.extend(trainer.get_inventory())
+                actions.append(Flee())
+
+        self._legal_actions[is_player] = (self._version, tuple(actions))
+        return actions
+
+    def invalidate_legal_actions(self) -> None:
+        """Discards the cached legal actions, after the battle state was changed other than through queue_action or enact_turn."""
+        self._version += 1
+
+    def fork(self) -> Battle:
+        """
+        Return an independent copy of this battle, which can be played on without affecting the original.
+        This is much cheaper than copy.deepcopy: only the state which changes during a battle is copied,
+        while moves, items and stats, which are never modified, are shared. Pokemon shared by both trainers stay shared.
+        The copy rolls with a new stream forked from this battle's, and keeps its cached legal actions.
+        """
+        clone = Battle.__new__(type(self))
+        clone.__dict__.update(self.__dict__)
+        forks = dict()
+        clone._player = self._player.fork(forks)
+        clone._enemy  = self._enemy.fork(forks)
+        clone._rng    = self._rng.fork()
+        clone._legal_actions = dict(self._legal_actions)
+        return clone
+
     def is_over(self) -> bool:
         """
         Returns true iff the battle is over.
@@ -706,6 +1024,8 @@ class Action(object):
 
     Subclasses: Flee, Item, Move, SwitchPokemon
     """
+    __slots__ = ()
+
     def get_priority(self) -> int:
         """
         Returns the priority of this action, which is used to determine which action is performed first each round in the battle.
@@ -761,6 +1081,8 @@ class Flee(Action):
     Inherited members
     Action: __repr__, get_priority
     """
+    __slots__ = ()
+
     def is_valid(self, battle: Battle, is_player: bool) -> bool:
         """
         Determines if an attempt to flee would be valid for a given battle state. Returns true iff it would be valid.
@@ -808,6 +1130,8 @@ class SwitchPokemon(Action):
     Inherited members
     Action: __repr__, get_priority
     """
+    __slots__ = ('_next_pokemon_index',)
+
     def __init__(self, next_pokemon_index: int) -> None:
         """
         Creates an instance of the SwitchPokemon class.
@@ -872,7 +1196,16 @@ class Item(Action):
 
     Inherited members
     Action: __repr__, apply, get_priority
+
+    Items are equal iff they have the same class and constructor arguments.
+    The key built from these is hashed once on creation, so inventory lookups don't fall back to comparing items.
     """
+    __slots__ = ('_item_name', '_key', '_hash', '__weakref__')
+
+    # The canonical instance of every item created by Item.of and still in use, by key.
+    # Entries are weak, so an item is dropped once nothing else refers to it.
+    _interned: WeakValueDictionary = WeakValueDictionary()
+
     def __init__(self, name: str) -> None:
         """
         Creates an Item.
@@ -881,6 +1214,54 @@ class Item(Action):
         name: The name of this item
         """
         self._item_name = name
+        self._set_key(name)
+
+    @classmethod
+    def of(cls, *args) -> Item:
+        """
+        Return the shared instance of this item class with the supplied constructor arguments, creating it if it doesn't yet exist.
+
+        Parameters
+        args : The constructor arguments of the item.
+        """
+        item = cls(*args)
+        return Item._interned.setdefault(item._key, item)
+
+    def _set_key(self, *fields) -> None:
+        """
+        Sets the key which identifies this item, and its hash.
+
+        Parameters
+        fields : The constructor arguments of the item.
+        """
+        self._key = (type(self),) + fields
+        self._hash = hash(self._key)
+
+    def __eq__(self, item: Item) -> bool:
+        """Return true iff the supplied item has the same class and constructor arguments as this one."""
+        if self is item:
+            return True
+        if not isinstance(item, Item):
+            return False
+        return self._hash == item._hash and self._key == item._key
+
+    def __hash__(self) -> int:
+        """Return the hash of this item's key."""
+        return self._hash
+
+    def __setstate__(self, state: Tuple[Optional[Dict[str, object]], Dict[str, object]]) -> None:
+        """
+        Restores a copied or unpickled item. The hash is recomputed, as string hashes differ between processes.
+
+        Parameters
+        state : The attributes of this item which are not slots, if it has any, and the values of its slots.
+        """
+        attributes, slots = state
+        if attributes is not None:
+            self.__dict__.update(attributes)
+        for name, value in slots.items():
+            setattr(self, name, value)
+        self._hash = hash(self._key)
 
     def get_name(self) -> str:
         """Return the name of this item"""
@@ -935,6 +1316,8 @@ class Pokeball(Item):
     Inherited members
     Item: __repr__, decrement_item_count, get_name, get_priority, is_valid
     """
+    __slots__ = ('_catch_chance',)
+
     def __init__(self, name, catch_chance) -> None:
         """
         Creates a pokeball instance, used to catch pokemon in wild battles
@@ -945,16 +1328,7 @@ class Pokeball(Item):
         """
         super().__init__(name)
         self._catch_chance      = catch_chance
-
-    def __eq__(self, pokeball: Pokeball):
-        """ Define the equality logic for comparing two objects using the equal operator (==)"""
-        if not isinstance(pokeball, Pokeball):
-            return False
-        return (self._item_name == pokeball._item_name) and (self._catch_chance == pokeball._catch_chance)
-
-    def __hash__(self):
-        """Make the class to be properly hashable."""
-        return 0
+        self._set_key(name, catch_chance)
 
     def apply(self, battle: Battle, is_player: bool) -> ActionSummary:
         """
@@ -986,7 +1360,7 @@ class Pokeball(Item):
         The did_succeed method from the support code must be used to determine if a catch attempt was successful.
         The wild pokemon will be added to the trainers roster if there is room
         """
-        if did_succeed(self._catch_chance):
+        if did_succeed(self._catch_chance, battle.get_random()):
             #In a wild battle, catching the enemy pokemon will end the battle.
             battle._end_early = 1
             catch_msg = ActionSummary(POKEBALL_SUCCESSFUL_CATCH.format(enemy._current_pokemon.get_name()))
@@ -1012,6 +1386,8 @@ class Food(Item):
     Inherited members
     Item : __repr__, decrement_item_count,, get_name, get_priority, is_valid
     """
+    __slots__ = ('_health_restored',)
+
     def __init__(self, name: str, health_restored: int) -> None:
         """
         Create a Food instance.
@@ -1022,16 +1398,7 @@ class Food(Item):
         """
         super().__init__(name)
         self._health_restored = health_restored
-
-    def __eq__(self, food: Food):
-        """ Define the equality logic for comparing two objects using the equal operator (==)"""
-        if not isinstance(food, Food):
-            return False
-        return (self._item_name == food._item_name) and (self._health_restored == food._health_restored)
-
-    def __hash__(self):
-        """Make the class to be properly hashable."""
-        return 41 * (41 + self._health_restored)
+        self._set_key(name, health_restored)
 
     def apply(self, battle: Battle, is_player: bool) -> ActionSummary:
         """
@@ -1069,7 +1436,16 @@ class Move(Action):
 
     Inherited members
     Action: __repr__
+
+    Moves are equal iff they have the same class and constructor arguments.
+    The key built from these is hashed once on creation, so move use lookups don't fall back to comparing moves.
     """
+    __slots__ = ('_name', '_element_type', '_element_index', '_max_uses', '_speed', '_key', '_hash', '__weakref__')
+
+    # The canonical instance of every move created by Move.of and still in use, by key.
+    # Entries are weak, so a move is dropped once nothing else refers to it.
+    _interned: WeakValueDictionary = WeakValueDictionary()
+
     def __init__(self, name: str, element_type: str, max_uses: int, speed: int) -> None:
         """
         Creates an instance of the Move class.
@@ -1080,11 +1456,62 @@ class Move(Action):
         element_type : The name of the type of this move
         max_uses     : The number of time this move can be used before resting
         speed        : The speed of this move, with lower values corresponding to faster moves priorities.
+        _element_index : The interned index of this move's type in the effectiveness matrix.
         """
         self._name = name
         self._element_type = element_type
+        self._element_index = ElementType.index_of(element_type)
         self._max_uses = max_uses
         self._speed = speed
+        self._set_key(name, element_type, max_uses, speed)
+
+    @classmethod
+    def of(cls, *args) -> Move:
+        """
+        Return the shared instance of this move class with the supplied constructor arguments, creating it if it doesn't yet exist.
+
+        Parameters
+        args : The constructor arguments of the move.
+        """
+        move = cls(*args)
+        return Move._interned.setdefault(move._key, move)
+
+    def _set_key(self, *fields) -> None:
+        """
+        Sets the key which identifies this move, and its hash.
+
+        Parameters
+        fields : The constructor arguments of the move.
+        """
+        self._key = (type(self),) + fields
+        self._hash = hash(self._key)
+
+    def __eq__(self, move: Move) -> bool:
+        """Return true iff the supplied move has the same class and constructor arguments as this one."""
+        if self is move:
+            return True
+        if not isinstance(move, Move):
+            return False
+        return self._hash == move._hash and self._key == move._key
+
+    def __hash__(self) -> int:
+        """Return the hash of this move's key."""
+        return self._hash
+
+    def __setstate__(self, state: Tuple[Optional[Dict[str, object]], Dict[str, object]]) -> None:
+        """
+        Restores a copied or unpickled move. The hash and type index are recomputed, as they may differ between processes.
+
+        Parameters
+        state : The attributes of this move which are not slots, if it has any, and the values of its slots.
+        """
+        attributes, slots = state
+        if attributes is not None:
+            self.__dict__.update(attributes)
+        for name, value in slots.items():
+            setattr(self, name, value)
+        self._hash = hash(self._key)
+        self._element_index = ElementType.index_of(self._element_type)
 
     def get_name(self) -> str:
         """Return the name of this move"""
@@ -1098,6 +1525,16 @@ class Move(Action):
         """Return the maximum times this move can be used"""
         return self._max_uses
 
+    def get_effectiveness(self, enemy_pokemon: Pokemon) -> float:
+        """
+        Return the damage multiplier of this move's type against the type of the supplied pokemon.
+        This is a lookup in the effectiveness matrix compiled from the registered element types.
+
+        Parameters
+        enemy_pokemon : The defending pokemon.
+        """
+        return ElementType.get_effectiveness_matrix()[self._element_index][enemy_pokemon._element_index]
+
     def get_priority(self) -> int:
         """
         Return the priority of this move.
@@ -1184,6 +1621,8 @@ class Attack(Move):
     Inherited members
     Move: __repr__, apply_ally_effects, apply_enemy_effects, get_element_type, get_max_uses, get_name, get_priority, is_valid
     """
+    __slots__ = ('_base_damage', '_hit_chance')
+
     def __init__(self, name: str, element_type: str, max_uses: int, speed: int, base_damage: int, hit_chance: float) -> None:
         """
         Creates an instance of an attacking move.
@@ -1199,16 +1638,7 @@ class Attack(Move):
         super().__init__(name, element_type, max_uses, speed)
         self._base_damage   = base_damage
         self._hit_chance    = hit_chance
-
-    def __eq__(self, attack: Attack):
-        """ Define the equality logic for comparing two objects using the equal operator (==)"""
-        if not isinstance(attack, Attack):
-            return False
-        return (self._name == attack._name) and (self._element_type == attack._element_type) and (self._max_uses == attack._max_uses) and (self._speed == self._speed) and (self._base_damage == attack._base_damage) and (self._hit_chance == attack._hit_chance)
-
-    def __hash__(self):
-        """Make the class to be properly hashable."""
-        return 41 * (41 + self._speed) + self._base_damage
+        self._set_key(name, element_type, max_uses, speed, base_damage, hit_chance)
 
     def did_hit(self, pokemon: Pokemon) -> bool:
         """
@@ -1217,7 +1647,17 @@ class Attack(Move):
         Parameters
         pokemon : The attacking pokemon
         """
-        if did_succeed(self._hit_chance) and did_succeed(pokemon._stats.get_hit_chance()):
+        return self.roll_hit(pokemon, None)
+
+    def roll_hit(self, pokemon: Pokemon, rng: Optional[BattleRandom]) -> bool:
+        """
+        Determine if the move hit, as did_hit does, drawing the rolls from the supplied stream. Returns True iff it hits.
+
+        Parameters
+        pokemon : The attacking pokemon
+        rng     : The stream to roll with, or None to use the module-wide generator.
+        """
+        if did_succeed(self._hit_chance, rng) and did_succeed(pokemon._stats.get_hit_chance(), rng):
             return True
         else:
             return False
@@ -1235,8 +1675,7 @@ class Attack(Move):
         pokemon       : The attacking trainer's pokemon
         enemy_pokemon : The defending trainer's pokemon
         """
-        element_type = ElementType(self.get_element_type())
-        effectiveness = element_type.get_effectiveness(enemy_pokemon.get_element_type())
+        effectiveness = self.get_effectiveness(enemy_pokemon)
         
         damage = floor(self._base_damage * effectiveness * pokemon._stats.get_attack() / (enemy_pokemon._stats.get_defense() + 1)) 
         return damage
@@ -1262,7 +1701,7 @@ class Attack(Move):
 
         player._current_pokemon.reduce_move_count(self)
         attack_msg = ActionSummary("{} used {}.".format(player._current_pokemon.get_name(), self.get_name()))
-        if self.did_hit(player._current_pokemon):
+        if self.roll_hit(player._current_pokemon, battle.get_random()):
             enemy._current_pokemon.modify_health(-self.calculate_damage(player._current_pokemon, enemy._current_pokemon))
             if enemy._current_pokemon.has_fainted():
                 player._current_pokemon.gain_experience(enemy._current_pokemon.experience_on_death())
@@ -1289,6 +1728,8 @@ class StatusModifier(Move):
     Inherited members
     Move: __repr__, apply, apply_ally_effects, apply_enemy_effect,s get_element_type, get_max_uses, get_name, get_priority, is_valid
     """
+    __slots__ = ('_modification', '_rounds')
+
     def __init__(self, name: str, element_type: str, max_uses: int, speed: int, modification: Tuple[float, int, int, int], rounds: int) -> None:
         """
         Creates an instance of this class
@@ -1304,6 +1745,7 @@ class StatusModifier(Move):
         super().__init__(name, element_type, max_uses, speed)
         self._modification   = modification
         self._rounds         = rounds
+        self._set_key(name, element_type, max_uses, speed, tuple(modification), rounds)
 
 
 class Buff(StatusModifier):
@@ -1316,15 +1758,7 @@ class Buff(StatusModifier):
     Inherited members
     StatusModifier:__init__, __repr__, apply_enemy_effects, get_element_type, get_max_uses, get_name, get_priority, is_valid
     """
-    def __eq__(self, buff: Buff):
-        """ Define the equality logic for comparing two objects using the equal operator (==)"""
-        if not isinstance(buff, Buff):
-            return False
-        return (self._name == buff._name) and (self._element_type == buff._element_type) and (self._max_uses == buff._max_uses) and (self._speed == buff._speed) and (self._modification == buff._modification) and (self._rounds == buff._rounds)
-
-    def __hash__(self):
-        """Make the class to be properly hashable."""
-        return 41 * (41 + self._speed) + self._rounds   
+    __slots__ = ()
 
     def apply_ally_effects(self, trainer: Trainer) -> ActionSummary:
         """
@@ -1366,15 +1800,7 @@ class Debuff(StatusModifier):
     Inherited members
     StatusModifier: __init__, __repr__, apply_ally_effects, get_element_type, get_max_uses, get_name, get_priority, is_valid
     """
-    def __eq__(self, debuff: Debuff):
-        """ Define the equality logic for comparing two objects using the equal operator (==)"""
-        if not isinstance(debuff, Debuff):
-            return False
-        return (self._name == debuff._name) and (self._element_type == debuff._element_type) and (self._max_uses == debuff._max_uses) and (self._speed == debuff._speed) and (self._modification == debuff._modification) and (self._rounds == debuff._rounds)
-
-    def __hash__(self):
-        """Make the class to be properly hashable."""
-        return 41 * (41 + self._speed) + self._rounds
+    __slots__ = ()
 
     def apply_enemy_effects(self, trainer: Trainer, enemy: Trainer) -> ActionSummary:
         """
@@ -1500,14 +1926,15 @@ class TeamRocket(Strategy):
         if not(battle.is_trainer_battle()):
             return Flee()
         if (enemy._current_pokemon.get_name() == 'Pikachu'):
-            for key in player.get_inventory():
-                if isinstance(key, Pokeball):
-                    return key
+            """Method : Throw the first pokeball in the inventory, rather than the best one."""
+            pokeball = player.get_inventory().get_first('Pokeball')
+            if pokeball is not None:
+                return pokeball
             
+        effectiveness = ElementType.get_effectiveness_matrix()
+        defending_index = enemy._current_pokemon._element_index
         for move in player._current_pokemon._moves:
-            element_type = ElementType(move.get_element_type())
-            effectiveness = element_type.get_effectiveness(enemy._current_pokemon.get_element_type())
-            if effectiveness > 1:
+            if effectiveness[move._element_index][defending_index] > 1:
                 return move
             
         for move in player._current_pokemon._moves:
@@ -1530,5 +1957,20 @@ def create_encounter(trainer: Trainer, wild_pokemon: Pokemon) -> Battle:
     pokemon_met.add_pokemon(wild_pokemon)
     return Battle(trainer, pokemon_met, False)
 
+
+def action_key(action: Action) -> Hashable:
+    """
+    Return a key identifying the action, e.g. to compare the actions chosen in different copies of a battle.
+    Switches and fleeing compare by identity, so they are keyed by value instead.
+
+    Parameters
+    action : The action to identify.
+    """
+    if isinstance(action, SwitchPokemon):
+        return 'switch', action._next_pokemon_index
+    if isinstance(action, Flee):
+        return 'flee',
+    return action
+
 if __name__ == "__main__":
     print(WRONG_FILE_MESSAGE)
@@ -1,5 +1,5 @@
-from random import random
-from typing import Tuple
+from random import Random as _Random, getrandbits as _getrandbits, random
+from typing import List, Optional, Tuple
 
 SUPPLIED_VERSION = 1.0
 
@@ -31,14 +31,27 @@ MAXIMUM_POKEMON_ROSTER = 6
 WRONG_FILE_MESSAGE = """When you have completed all non-masters tasks, run
 the game.py file to play a test Pokemon battle with the GUI."""
 
+# The number of uniform draws a seeded BattleRandom generates at a time.
+RANDOM_BLOCK_SIZE = 256
+
 # Types
 Stats = Tuple[float, int, int, int]
 
 
 class ElementType(object):
-    """A class which represents elemental types of pokemon and their moves."""
+    """A class which represents elemental types of pokemon and their moves.
+
+    Type names can be interned to small integer indices, which index into a
+    dense effectiveness matrix compiled from the registered types. The matrix
+    is only rebuilt after the registry has changed.
+    """
 
     _elements = {}
+    _indices = {}
+    _names = []
+    _version = 0
+    _matrix = None
+    _matrix_source = None
 
     @staticmethod
     def of(name: str) -> 'ElementType':
@@ -65,6 +78,63 @@ class ElementType(object):
         self._name = name
         self._effectiveness = {}
         ElementType._elements[name] = self
+        ElementType._version += 1
+
+    @staticmethod
+    def index_of(name: str) -> int:
+        """A static method which returns the small integer index interned for
+        the supplied type name, allocating a new index if it doesn't yet have
+        one. Indices are never reused, even if the registry is cleared.
+
+        Parameters:
+            name (str): The unique name of the elemental type.
+
+        Returns:
+            (int): The index of the type in the effectiveness matrix.
+        """
+        index = ElementType._indices.get(name)
+        if index is None:
+            index = len(ElementType._names)
+            ElementType._indices[name] = index
+            ElementType._names.append(name)
+        return index
+
+    @staticmethod
+    def get_effectiveness_matrix() -> Tuple[Tuple[float, ...], ...]:
+        """A static method which returns the effectiveness of every interned
+        type against every other, indexed as matrix[attacking][defending].
+        The matrix is compiled from the registered types the first time it is
+        needed after the registry changes, and reused until then.
+
+        Returns:
+            (tuple<tuple<float>>): The dense effectiveness matrix.
+        """
+        source = (ElementType._elements, ElementType._version,
+                  len(ElementType._names))
+        cached = ElementType._matrix_source
+        if cached is None or cached[0] is not source[0] \
+                or cached[1:] != source[1:]:
+            ElementType._matrix = ElementType._compile_matrix()
+            ElementType._matrix_source = source
+        return ElementType._matrix
+
+    @staticmethod
+    def _compile_matrix() -> Tuple[Tuple[float, ...], ...]:
+        """Builds the dense effectiveness matrix from the registered types.
+
+        Returns:
+            (tuple<tuple<float>>): The dense effectiveness matrix.
+        """
+        names = ElementType._names
+        rows = []
+        for attacking in names:
+            element: Optional[ElementType] = ElementType._elements.get(attacking)
+            if element is None:
+                rows.append((1.0,) * len(names))
+            else:
+                rows.append(tuple(element.get_effectiveness(defending)
+                                  for defending in names))
+        return tuple(rows)
 
     def add_type_effectiveness(self, type: str, effectiveness: float) -> None:
         """Associates a type and effectiveness for this instance.
@@ -76,6 +146,7 @@ class ElementType(object):
         
         """
         self._effectiveness[type] = effectiveness
+        ElementType._version += 1
 
     def get_effectiveness(self, defending_type: str) -> float:
         """Get the effectiveness of this instance's type against the supplied
@@ -98,17 +169,106 @@ class ElementType(object):
         return str(self)
 
 
-def did_succeed(chance: float) -> bool:
+class BattleRandom(object):
+    """A stream of random numbers used for the chance rolls of a battle.
+
+    An unseeded stream draws from the module-wide generator, so battles share
+    one stream unless they are given their own. A seeded stream has its own
+    generator, and pre-draws its numbers in blocks to cut the overhead of each
+    roll. Forking a stream creates an independent, seeded child stream, e.g.
+    for a simulation branching off a battle.
+    """
+
+    def __init__(self, seed: Optional[int] = None,
+                 block_size: int = RANDOM_BLOCK_SIZE) -> None:
+        """Creates a BattleRandom instance.
+
+        Parameters:
+            seed (int | None): The seed of the stream, or None to draw from
+                    the module-wide generator.
+            block_size (int): The number of draws to generate at a time.
+        """
+        self._block_size = block_size
+        self._generator: Optional[_Random] = None
+        self._draws = iter(())
+        self.seed(seed)
+
+    def seed(self, seed: Optional[int]) -> None:
+        """Restarts the stream from the supplied seed, discarding any
+        pre-drawn numbers.
+
+        Parameters:
+            seed (int | None): The new seed, or None to draw from the
+                    module-wide generator.
+        """
+        self._generator = None if seed is None else _Random(seed)
+        self._draws = iter(())
+
+    def is_seeded(self) -> bool:
+        """(bool): Returns true iff the stream has its own generator."""
+        return self._generator is not None
+
+    def random(self) -> float:
+        """Returns the next number in the stream.
+
+        Returns:
+            (float): A number drawn uniformly from [0, 1).
+        """
+        if self._generator is None:
+            return random()
+        for draw in self._draws:
+            return draw
+        self._draws = iter(self._draw_block())
+        return next(self._draws)
+
+    def _draw_block(self) -> List[float]:
+        """Returns the next block of numbers from the generator.
+
+        Returns:
+            (list<float>): The pre-drawn numbers.
+        """
+        draw = self._generator.random
+        return [draw() for _ in range(self._block_size)]
+
+    def did_succeed(self, chance: float) -> bool:
+        """Performs a 'roll' based on the supplied chance, and returns true iff
+        the roll succeeded.
+
+        Parameters:
+            chance (float): The probability in the range [0, 1] that the roll
+            succeeded.
+
+        Returns:
+            (bool): True iff the roll succeeded
+        """
+        return self.random() < chance
+
+    def fork(self) -> 'BattleRandom':
+        """Creates an independent child stream, seeded from this one.
+
+        Returns:
+            (BattleRandom): The child stream.
+        """
+        if self._generator is None:
+            return BattleRandom(_getrandbits(64), self._block_size)
+        return BattleRandom(self._generator.getrandbits(64), self._block_size)
+
+
+def did_succeed(chance: float, rng: Optional[BattleRandom] = None) -> bool:
     """Performs a 'roll' based on the supplied chance, and returns true iff
     the roll succeeded.
     
     Parameters:
         chance (float): The probability in the range [0, 1] that the roll
         succeeded.
+        rng (BattleRandom | None): The stream to roll with. The module-wide
+        generator is used if omitted.
         
     Returns:
         (bool): True iff the roll succeeded
     """
+    if rng is not None:
+        return rng.did_succeed(chance)
     return random() < chance
 
 
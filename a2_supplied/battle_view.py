@@ -1,5 +1,9 @@
+from collections import OrderedDict
 from enum import Enum
-from typing import List
+from queue import Empty, Queue
+from threading import Thread
+from time import perf_counter
+from typing import Callable, Dict, Hashable, List, Optional, Tuple
 import tkinter as tk
 from tkinter import messagebox
 
@@ -17,6 +21,27 @@ TYPE_COLOURS = {
     'psychic':'pink',
 }
 
+# The number of sprites kept ready to draw by each BattleField.
+SPRITE_CACHE_SIZE = 32
+
+# The time (in milliseconds) between checks for sprites finished by the preloader.
+PRELOAD_POLL_INTERVAL = 50
+
+# The time (in milliseconds) between frames of the battlefield's animations.
+FRAME_INTERVAL = 16
+
+# The time (in seconds) the health and experience bars take to move to a new value.
+ANIMATION_DURATION = 0.2
+
+# The image drawn behind the battle.
+BACKGROUND_PATH = 'images/background.jpeg'
+
+# The number of scaled backgrounds kept by each BattleField, one for each canvas size.
+BACKGROUND_CACHE_SIZE = 4
+
+# The time (in milliseconds) after the last resize of the battlefield before its background is rescaled.
+RESIZE_DEBOUNCE = 150
+
 
 class Stats(Enum):
     HP_RECT = 1
@@ -33,13 +58,15 @@ class Stats(Enum):
 class GUIBattleView:
     """ A GUI view for pokemon battles."""
     def __init__(self, root: tk.Tk, player: Trainer,
-                 enemy_pokemon: Pokemon) -> None:
+                 enemy_pokemon: Pokemon, enemy: Optional[Trainer] = None) -> None:
         """ Constructor for GUIBattleView.
 
         Parameters:
             root (tk.Tk): The master window to put the widgets into.
             player (Trainer)): The player.
             enemy_pokemon (Pokemon): The enemy's current pokemon.
+            enemy (Trainer | None): The enemy, whose sprites are preloaded along
+                                    with the player's if provided.
         """
         player_pokemon = player.get_current_pokemon()
         self._trainer = player
@@ -49,6 +76,8 @@ class GUIBattleView:
 
         self._battlefield = BattleField(root, player_pokemon, enemy_pokemon)
         self._battlefield.pack(side=tk.TOP, expand=True, fill=tk.BOTH)
+        enemy_roster = [enemy_pokemon] if enemy is None else enemy.get_all_pokemon()
+        self._battlefield.preload_sprites(player.get_all_pokemon(), enemy_roster)
 
         self._dialogue = Dialogue(root)
         self._dialogue.pack(side=tk.TOP, expand=True, fill=tk.X)
@@ -120,6 +149,286 @@ class GUIBattleView:
         self._root.quit()
 
 
+def load_sprite(pokemon_name: str, size: int, flip: bool) -> Image.Image:
+    """ Loads the sprite for the pokemon with the given name from disk, scaled
+        and flipped ready to draw.
+
+    Parameters:
+        pokemon_name (str): The name of the pokemon to load the sprite for.
+        size (int): The width and height (in pixels) to scale the sprite to.
+        flip (bool): True iff the sprite should be flipped to face right.
+
+    Returns:
+        (Image.Image): The scaled sprite.
+    """
+    img = Image.open(f'images/{pokemon_name}.png')
+    img = img.resize((size, size))
+    if flip:
+        img = img.transpose(Image.FLIP_LEFT_RIGHT)
+    return img
+
+
+class SpriteCache:
+    """ A bounded cache of sprites which are ready to draw, keyed by
+        (pokemon name, size, flip). When it is full, the least recently used
+        sprite is evicted.
+    """
+    def __init__(self, capacity: int = SPRITE_CACHE_SIZE) -> None:
+        """ Constructor for SpriteCache.
+
+        Parameters:
+            capacity (int): The most sprites kept.
+        """
+        self._capacity = capacity
+        self._sprites = OrderedDict()
+
+    def get(self, pokemon_name: str, size: int,
+            flip: bool) -> ImageTk.PhotoImage:
+        """ Returns the sprite for the pokemon with the given name, loading it
+            from disk only if it isn't cached.
+
+        Parameters:
+            pokemon_name (str): The name of the pokemon to get the sprite for.
+            size (int): The width and height (in pixels) of the sprite.
+            flip (bool): True iff the sprite should be flipped to face right.
+
+        Returns:
+            (ImageTk.PhotoImage): The sprite to be drawn on a Canvas.
+        """
+        key = pokemon_name, size, flip
+        sprite = self._sprites.get(key)
+        if sprite is None:
+            sprite = ImageTk.PhotoImage(image=load_sprite(pokemon_name, size, flip))
+            self._store(key, sprite)
+        else:
+            self._sprites.move_to_end(key)
+        return sprite
+
+    def has(self, pokemon_name: str, size: int, flip: bool) -> bool:
+        """ Returns true iff the sprite is cached, without marking it as used.
+
+        Parameters:
+            pokemon_name (str): The name of the pokemon.
+            size (int): The width and height (in pixels) of the sprite.
+            flip (bool): True iff the sprite is flipped to face right.
+        """
+        return (pokemon_name, size, flip) in self._sprites
+
+    def put(self, pokemon_name: str, size: int, flip: bool,
+            sprite: ImageTk.PhotoImage) -> None:
+        """ Adds a sprite which was loaded elsewhere, e.g. by a preloader.
+
+        Parameters:
+            pokemon_name (str): The name of the pokemon.
+            size (int): The width and height (in pixels) of the sprite.
+            flip (bool): True iff the sprite is flipped to face right.
+            sprite (ImageTk.PhotoImage): The sprite.
+        """
+        self._store((pokemon_name, size, flip), sprite)
+
+    def _store(self, key: Tuple[str, int, bool],
+               sprite: ImageTk.PhotoImage) -> None:
+        """ Stores a sprite as the most recently used, evicting the least
+            recently used sprite if the cache is full.
+        """
+        self._sprites[key] = sprite
+        self._sprites.move_to_end(key)
+        if len(self._sprites) > self._capacity:
+            self._sprites.popitem(last=False)
+
+    def __len__(self) -> int:
+        """ Returns the number of cached sprites. """
+        return len(self._sprites)
+
+
+class SpritePreloader:
+    """ Loads sprites into a SpriteCache ahead of time. Sprites are decoded
+        and scaled on a background thread, and the finished images are handed
+        back to the Tk thread, which is the only thread allowed to make
+        PhotoImages, by polling with after.
+    """
+    def __init__(self, widget: tk.Misc, cache: SpriteCache) -> None:
+        """ Constructor for SpritePreloader.
+
+        Parameters:
+            widget (tk.Misc): The widget used to schedule polling on the Tk thread.
+            cache (SpriteCache): The cache to load the sprites into.
+        """
+        self._widget = widget
+        self._cache = cache
+        self._finished = Queue()
+        self._thread = None
+
+    def preload(self, sprites: List[Tuple[str, int, bool]]) -> None:
+        """ Starts loading the sprites which aren't already cached in the
+            background. Sprites which fail to load are skipped, so drawing
+            them later reports the error as before.
+
+        Parameters:
+            sprites (list<tuple<str, int, bool>>): The (pokemon name, size, flip)
+                                                   of each sprite to load.
+        """
+        wanted = [sprite for sprite in dict.fromkeys(sprites)
+                  if not self._cache.has(*sprite)]
+        if not wanted:
+            return
+        self._thread = Thread(target=self._load, args=(wanted,), daemon=True)
+        self._thread.start()
+        self._widget.after(PRELOAD_POLL_INTERVAL, self._poll)
+
+    def is_running(self) -> bool:
+        """ Returns true iff sprites are still being loaded. """
+        return self._thread is not None and (self._thread.is_alive()
+                                             or not self._finished.empty())
+
+    def _load(self, sprites: List[Tuple[str, int, bool]]) -> None:
+        """ Decodes and scales each sprite. Runs on the background thread.
+
+        Parameters:
+            sprites (list<tuple<str, int, bool>>): The sprites to load.
+        """
+        for sprite in sprites:
+            try:
+                self._finished.put((sprite, load_sprite(*sprite)))
+            except OSError:
+                continue
+
+    def _poll(self) -> None:
+        """ Moves the finished sprites into the cache, and polls again if
+            there are more to come. Runs on the Tk thread.
+        """
+        while True:
+            try:
+                (pokemon_name, size, flip), img = self._finished.get_nowait()
+            except Empty:
+                break
+            if not self._cache.has(pokemon_name, size, flip):
+                self._cache.put(pokemon_name, size, flip,
+                                ImageTk.PhotoImage(image=img))
+        if self.is_running():
+            self._widget.after(PRELOAD_POLL_INTERVAL, self._poll)
+
+
+class Tween:
+    """ A value moving from a start to an end over a period of time, which is
+        applied to the canvas by a callback on every frame.
+    """
+    def __init__(self, start: float, end: float, duration: float,
+                 apply: Callable[[float], None]) -> None:
+        """ Constructor for Tween.
+
+        Parameters:
+            start (float): The value at the start of the tween.
+            end (float): The value at the end of the tween.
+            duration (float): The time (in seconds) the tween takes.
+            apply (function): Shows a value of the tween on the canvas.
+        """
+        self._start = start
+        self._end = end
+        self._duration = duration
+        self._apply = apply
+        self._started = perf_counter()
+
+    def step(self, now: float) -> bool:
+        """ Applies the value the tween has reached by now, and returns true
+            iff it has finished.
+
+        Parameters:
+            now (float): The time of the frame, from time.perf_counter.
+        """
+        progress = 1 if self._duration <= 0 else (now - self._started) / self._duration
+        if progress >= 1:
+            self._apply(self._end)
+            return True
+        self._apply(self._start + (self._end - self._start) * progress)
+        return False
+
+    def finish(self) -> None:
+        """ Applies the end value of the tween. """
+        self._apply(self._end)
+
+
+class AnimationScheduler:
+    """ Runs every active animation of a widget from a single frame clock,
+        instead of each animation scheduling its own callbacks.
+        Tweens are interpolated by the time elapsed, so when the Tk thread falls
+        behind, the late frames are dropped rather than replayed. In fast
+        forward mode, e.g. for headless or test runs, every animation jumps
+        straight to its end.
+    """
+    def __init__(self, widget: tk.Misc, frame_interval: int = FRAME_INTERVAL,
+                 fast_forward: bool = False) -> None:
+        """ Constructor for AnimationScheduler.
+
+        Parameters:
+            widget (tk.Misc): The widget used to schedule frames.
+            frame_interval (int): The time (in milliseconds) between frames.
+            fast_forward (bool): True iff animations should skip to their end.
+        """
+        self._widget = widget
+        self._frame_interval = frame_interval
+        self._fast_forward = fast_forward
+        self._tweens = {}
+        self._clock = None
+
+    def animate(self, key: Hashable, start: float, end: float,
+                apply: Callable[[float], None],
+                duration: float = ANIMATION_DURATION) -> None:
+        """ Starts animating a value, replacing any animation with the same key.
+
+        Parameters:
+            key (Hashable): Identifies what is animated, e.g. a canvas item id.
+            start (float): The value to animate from.
+            end (float): The value to animate to.
+            apply (function): Shows a value on the canvas.
+            duration (float): The time (in seconds) the animation takes.
+        """
+        if self._fast_forward:
+            self._tweens.pop(key, None)
+            apply(end)
+            return
+        self._tweens[key] = Tween(start, end, duration, apply)
+        if self._clock is None:
+            self._clock = self._widget.after(self._frame_interval, self._frame)
+
+    def is_animating(self) -> bool:
+        """ Returns true iff any animation is still running. """
+        return bool(self._tweens)
+
+    def set_fast_forward(self, fast_forward: bool) -> None:
+        """ Turns fast forward mode on or off. Turning it on finishes every
+            running animation immediately.
+
+        Parameters:
+            fast_forward (bool): True iff animations should skip to their end.
+        """
+        self._fast_forward = fast_forward
+        if fast_forward:
+            self.finish()
+
+    def finish(self) -> None:
+        """ Finishes every running animation immediately. """
+        tweens, self._tweens = self._tweens, {}
+        for tween in tweens.values():
+            tween.finish()
+        if self._clock is not None:
+            self._widget.after_cancel(self._clock)
+            self._clock = None
+
+    def _frame(self) -> None:
+        """ Steps every running animation, and schedules the next frame if
+            any are left.
+        """
+        now = perf_counter()
+        for key, tween in list(self._tweens.items()):
+            if tween.step(now):
+                del self._tweens[key]
+        if self._tweens:
+            self._clock = self._widget.after(self._frame_interval, self._frame)
+        else:
+            self._clock = None
+
+
 class BattleField(tk.Canvas):
     """ A Canvas on which the Pokemon battle is drawn. """
 
@@ -128,7 +437,7 @@ class BattleField(tk.Canvas):
 
     def __init__(self, master: tk.Tk, player_pokemon: Pokemon,
                  enemy_pokemon: Pokemon, width: int = 600, height: int = 300,
-                 **kwargs) -> None:
+                 scale_in_background: bool = True, **kwargs) -> None:
         """ Constructor for BattleField.
 
         Parameters:
@@ -137,23 +446,71 @@ class BattleField(tk.Canvas):
             enemy_pokemon (Pokemon): The enemy's current pokemon.
             width (int): The width (in pixels) of the battlefield.
             height (int): The height (in pixels) of the battlefield.
+            scale_in_background (bool): True iff the background is rescaled on
+                                        a background thread when the canvas
+                                        is resized.
         """
         super().__init__(master, width=width, height=height, **kwargs)
         self._width = width
         self._height = height
+        self._sprites = SpriteCache()
+        self._preloader = SpritePreloader(self, self._sprites)
+        self._animations = AnimationScheduler(self)
+
+        # Scaled backgrounds, by canvas size, and the state of resizing.
+        # The source is read once here, so scaling threads only resample it.
+        self._bg_source = Image.open(BACKGROUND_PATH)
+        self._bg_source.load()
+        self._bg = None
+        self._background = None
+        self._background_size = width, height
+        self._backgrounds = OrderedDict()
+        self._scale_in_background = scale_in_background
+        self._scaled_backgrounds = Queue()
+        self._scaling = 0
+        self._resize_job = None
 
         # Draw background
         self.draw_background()
+        self.bind('<Configure>', self._on_configure)
 
         # Draw (and remember) status info
         start_pos = self._width // 9 * 4, self._height // 2
         self._player_stats = self.init_stats(start_pos, player_pokemon)
         self._enemy_stats = self.init_stats((5, 0), enemy_pokemon,
                                             players_turn=False)
+
+        # Create the sprite items once; draw only changes their images
+        player_location, enemy_location = self._sprite_locations()
+        self._player_sprite = self.create_image(*player_location)
+        self._enemy_sprite = self.create_image(*enemy_location)
+        self._player_img = self._enemy_img = None
         self.draw(player_pokemon, enemy_pokemon)
 
+    def get_sprite_size(self) -> int:
+        """ Returns the width and height (in pixels) of the pokemon sprites. """
+        return min(self._width // 3, self._height)
+
+    def preload_sprites(self, player_pokemon: List[Pokemon],
+                        enemy_pokemon: List[Pokemon]) -> None:
+        """ Loads the sprites of the given pokemon in the background, so that
+            drawing them for the first time doesn't block the Tk mainloop.
+
+        Parameters:
+            player_pokemon (list<Pokemon>): The player's pokemon.
+            enemy_pokemon (list<Pokemon>): The enemy's pokemon.
+        """
+        size = self.get_sprite_size()
+        sprites = [(pokemon.get_name().lower(), size, True)
+                   for pokemon in player_pokemon]
+        sprites.extend((pokemon.get_name().lower(), size, False)
+                       for pokemon in enemy_pokemon)
+        self._preloader.preload(sprites)
+
     def draw_sprite(self, pokemon_name: str, flip: bool) -> ImageTk.PhotoImage:
         """ Returns the sprite image for the pokemon with the given name.
+            Sprites are cached, so redrawing a pokemon doesn't read its image
+            from disk again.
 
         Parameters:
             pokemon_name (str): The name of the pokemon to get the sprite for.
@@ -163,19 +520,105 @@ class BattleField(tk.Canvas):
         Returns:
             (ImageTk.PhotoImage): The sprite to be drawn on the Canvas
         """
-        size = min(self._width // 3, self._height)
-        img = Image.open(f'images/{pokemon_name}.png')
-        img = img.resize((size, size))
-        if flip:
-            img = img.transpose(Image.FLIP_LEFT_RIGHT)
-        return ImageTk.PhotoImage(image=img)
+        return self._sprites.get(pokemon_name, self.get_sprite_size(), flip)
 
     def draw_background(self) -> None:
-        """ Draws the background of the battlefield. """
-        img = Image.open('images/background.jpeg')
-        img = img.resize((self._width, self._height), Image.ANTIALIAS)
-        self._bg = ImageTk.PhotoImage(image=img)
-        self.create_image(self._width // 2, self._height // 2, image=self._bg)
+        """ Draws the background of the battlefield, scaled to fill the canvas.
+            Scaled backgrounds are cached by size, so the image is only
+            resampled for sizes that haven't been drawn before.
+        """
+        size = self._background_size
+        bg = self._backgrounds.get(size)
+        if bg is None:
+            bg = ImageTk.PhotoImage(image=self._scale_background(size))
+        self._show_background(size, bg)
+
+    def _scale_background(self, size: Tuple[int, int]) -> Image.Image:
+        """ Returns the background scaled to the given size. The source image
+            is never modified, so this is safe to call off the Tk thread.
+
+        Parameters:
+            size (tuple<int, int>): The width and height (in pixels) to scale to.
+        """
+        return self._bg_source.resize(size, Image.LANCZOS)
+
+    def _show_background(self, size: Tuple[int, int],
+                         bg: ImageTk.PhotoImage) -> None:
+        """ Caches the scaled background for its size, and shows it centred on
+            the canvas, behind everything else.
+
+        Parameters:
+            size (tuple<int, int>): The canvas size the background was scaled to.
+            bg (ImageTk.PhotoImage): The scaled background.
+        """
+        self._backgrounds[size] = bg
+        self._backgrounds.move_to_end(size)
+        if len(self._backgrounds) > BACKGROUND_CACHE_SIZE:
+            self._backgrounds.popitem(last=False)
+
+        width, height = size
+        self._bg = bg
+        if self._background is None:
+            self._background = self.create_image(width // 2, height // 2, image=bg)
+        else:
+            self.itemconfig(self._background, image=bg)
+            self.coords(self._background, width // 2, height // 2)
+        self.tag_lower(self._background)
+
+    def _on_configure(self, event: tk.Event) -> None:
+        """ Rescales the background once the canvas has stopped changing size
+            for RESIZE_DEBOUNCE milliseconds, so that dragging the window edge
+            doesn't resample the background on every step.
+
+        Parameters:
+            event (tk.Event): The resize event.
+        """
+        if self._resize_job is not None:
+            self.after_cancel(self._resize_job)
+            self._resize_job = None
+        size = event.width, event.height
+        if size != self._background_size:
+            self._resize_job = self.after(RESIZE_DEBOUNCE, self._resize_background, size)
+
+    def _resize_background(self, size: Tuple[int, int]) -> None:
+        """ Shows the background for a new canvas size, scaling it on a
+            background thread if it isn't cached and scale_in_background is set.
+            The rest of the battlefield keeps its layout.
+
+        Parameters:
+            size (tuple<int, int>): The new width and height (in pixels) of the canvas.
+        """
+        self._resize_job = None
+        self._background_size = size
+        if size in self._backgrounds or not self._scale_in_background:
+            self.draw_background()
+            return
+
+        def scale():
+            try:
+                self._scaled_backgrounds.put((size, self._scale_background(size)))
+            except OSError:
+                self._scaled_backgrounds.put((size, None))
+
+        self._scaling += 1
+        Thread(target=scale, daemon=True).start()
+        self.after(PRELOAD_POLL_INTERVAL, self._poll_background)
+
+    def _poll_background(self) -> None:
+        """ Shows the backgrounds finished on the background thread, if the
+            canvas is still the size they were scaled to, and polls again if
+            there are more to come.
+        """
+        while True:
+            try:
+                size, img = self._scaled_backgrounds.get_nowait()
+            except Empty:
+                break
+            self._scaling -= 1
+            if img is not None and size == self._background_size:
+                self._show_background(size, ImageTk.PhotoImage(image=img))
+        if self._scaling:
+            self.after(PRELOAD_POLL_INTERVAL, self._poll_background)
 
     def draw(self, player_pokemon: Pokemon, enemy_pokemon: Pokemon) -> None:
         """ Updates the battlefield view to reflect the current player pokemon
@@ -185,17 +628,17 @@ class BattleField(tk.Canvas):
             player_pokemon (Pokemon): The player's current pokemon.
             enemy_pokemon (Pokemon): The enemy's current pokemon.
         """
-        # Draw the player's pokemon's sprite
-        player_pokemon_name = player_pokemon.get_name().lower()
-        player_pokemon_location = self._width // 9 * 2, self._height // 4 * 3
-        self._player_img = self.draw_sprite(player_pokemon_name, True)
-        self.create_image(*player_pokemon_location, image=self._player_img)
-
-        # Draw the enemy's pokemon's sprite
-        enemy_pokemon_name = enemy_pokemon.get_name().lower()
-        enemy_location = self._width - self._width // 9 * 2, self._height // 4
-        self._enemy_img = self.draw_sprite(enemy_pokemon_name, False)
-        self.create_image(enemy_location, image=self._enemy_img)
+        # Show the player's pokemon's sprite, if it has changed
+        player_img = self.draw_sprite(player_pokemon.get_name().lower(), True)
+        if player_img is not self._player_img:
+            self._player_img = player_img
+            self.itemconfig(self._player_sprite, image=player_img)
+
+        # Show the enemy's pokemon's sprite, if it has changed
+        enemy_img = self.draw_sprite(enemy_pokemon.get_name().lower(), False)
+        if enemy_img is not self._enemy_img:
+            self._enemy_img = enemy_img
+            self.itemconfig(self._enemy_sprite, image=enemy_img)
 
         # Update stat information
         player_start_position = self._width // 9 * 4, self._height // 2
@@ -203,47 +646,51 @@ class BattleField(tk.Canvas):
         enemy_start_position = (5, 0)
         self.draw_stats(enemy_start_position, enemy_pokemon, players_turn=False)
 
-    def _animate_bar(self, _id: int, bbox: Tuple[int, int, int, int], inc: int,
-                     end: int, direction: int = 1) -> None:
+    def _sprite_locations(self) -> Tuple[Tuple[int, int], Tuple[int, int]]:
+        """ Returns the centres of the player's and the enemy's sprites. """
+        player_location = self._width // 9 * 2, self._height // 4 * 3
+        enemy_location = self._width - self._width // 9 * 2, self._height // 4
+        return player_location, enemy_location
+
+    def get_item_count(self) -> int:
+        """ Returns the number of items on the canvas, which stays the same
+            however many times the battlefield is drawn.
+        """
+        return len(self.find_all())
+
+    def set_fast_forward(self, fast_forward: bool) -> None:
+        """ Turns fast forward mode on or off. In fast forward mode, changes to
+            the health and experience bars are shown at once, without animating.
+
+        Parameters:
+            fast_forward (bool): True iff animations should skip to their end.
+        """
+        self._animations.set_fast_forward(fast_forward)
+
+    def _animate_bar(self, _id: int, bbox: Tuple[int, int, int, int],
+                     end: int) -> None:
         """ Animates a rectangle to go from where it is now to end.
 
         Parameters:
             _id (int): The id of the rectangle to animate.
             bbox (tuple<int * 4>): The bbox of the rectangle at the start.
-            inc (int): The increments (in pixels) to move the bar by each step.
-            end (int): The pixel to end at (y_max in bbox).
-            direction (int): 1 to move forwards, -1 to move backwards.
+            end (int): The pixel to end at (x_max in bbox).
         """
         x_min, y_min, x_max, y_max = bbox
-        x_max += (inc * direction)
-        to_go = (end - x_max) * direction
+        self._animations.animate(
+            _id, x_max, end, lambda x: self.coords(_id, x_min, y_min, x, y_max))
 
-        # If we've reached the end, show the resulting rectangle
-        if to_go <= 0:
-            self.coords(_id, x_min, y_min, end, y_max)
-            return
-
-        # Otherwise, take one step and call this method again
-        bbox = x_min, y_min, x_max, y_max
-        self.coords(_id, *bbox)
-        self.after(10, lambda : self._animate_bar(_id, bbox, inc, end,
-                                                  direction=direction))
-
-    def _animate_text(self, _id: int, hp: int, end: int, inc: int, max_hp: int):
-        """ Animates the hp text with given id to go from hp down to end.
+    def _animate_text(self, _id: int, hp: int, end: int, max_hp: int):
+        """ Animates the hp text with given id to go from hp to end.
 
         Parameters:
             _id (int): The id of the text to configure.
             hp (int): The current hp to draw.
             end (int): The hp to end at.
-            inc (int): The increment to change by each time.
             max_hp (int): The maximum hp of the pokemon.
         """
-        if hp <= end:
-            self.itemconfig(_id, text=f'{int(end)}/{max_hp}')
-            return
-        self.itemconfig(_id, text=f'{int(hp)}/{max_hp}')
-        self.after(10, lambda : self._animate_text(_id, hp - inc, end, inc, max_hp))
+        self._animations.animate(
+            _id, hp, end, lambda value: self.itemconfig(_id, text=f'{int(value)}/{max_hp}'))
 
     def _animate_hp(self, stats: Stats, new_health: int,
                     bbox: Tuple[int, int, int, int]) -> None:
@@ -262,15 +709,12 @@ class BattleField(tk.Canvas):
         rect_id, text_id = stats[Stats.HP_RECT], stats[Stats.HP_TEXT]
 
         # Animate HP bar
-        x_min, _, x_max, _  = bbox
+        x_min = bbox[0]
         goal_x = x_min + (BattleField.BAR_WIDTH - 30) * (hp / hp_max)
-        inc = max((x_max - goal_x) // 20, 1)
-        self._animate_bar(rect_id, bbox, inc, goal_x, direction=-1)
+        self._animate_bar(rect_id, bbox, goal_x)
 
         # Animate HP/max_HP text
-        old_hp = stats[Stats.HP]
-        text_inc = max((old_hp - hp) // 20, 1)
-        self._animate_text(text_id, old_hp, hp, text_inc, hp_max)
+        self._animate_text(text_id, stats[Stats.HP], hp, hp_max)
 
     def _animate_exp(self, stats: Stats, new_exp: int,
                      bbox: Tuple[int, int, int, int]) -> None:
@@ -284,10 +728,9 @@ class BattleField(tk.Canvas):
                                    bbox method for rectangles because it's too
                                    inaccurate).
         """
-        start_x, _, end_x, _ = bbox
+        start_x = bbox[0]
         goal_x = start_x + 230 * new_exp
-        inc = max((goal_x - end_x) // 20, 1)
-        self._animate_bar(stats[Stats.EXP_RECT], bbox, inc, goal_x)
+        self._animate_bar(stats[Stats.EXP_RECT], bbox, goal_x)
 
     def _draw_initial_health(self, start_pos: Tuple[int, int], pokemon: Pokemon,
                              stats: Stats) -> None:
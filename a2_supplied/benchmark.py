@@ -0,0 +1,573 @@
+"""
+Benchmarks for the battle engine hot paths.
+
+Each benchmark reports one or more named measurements, which can be written out as JSON and compared against a
+baseline saved by an earlier run, e.g.
+
+    python benchmark.py --save-baseline baseline.json
+    python benchmark.py --baseline baseline.json --output results.json
+"""
+import argparse
+import copy
+import json
+import platform
+import sys
+import time
+import tracemalloc
+from random import seed as seed_random
+from typing import Callable, Dict, List, NamedTuple
+
+from a2 import *
+from simulator import play_battle
+
+# The seed used so that every benchmark plays the same battles.
+BENCHMARK_SEED = 2021
+
+# The number of pokemon created to measure their memory use.
+DEFAULT_POPULATION = 1000000
+
+# The number of times each timing is repeated. The fastest repeat is reported, as it is the least disturbed by noise.
+DEFAULT_REPEATS = 5
+
+# The number of modifiers stacked on a pokemon when timing its stats.
+MODIFIER_DEPTH = 100
+
+# The number of distinct items of each kind in a trainer's inventory when timing item use.
+INVENTORY_SIZE = 1000
+
+# The relative slowdown beyond which a measurement is reported as a regression.
+DEFAULT_TOLERANCE = 0.1
+
+
+class Measurement(NamedTuple):
+    """
+    A single benchmark result.
+
+    Fields
+    name             : The name of the measurement, prefixed by the name of its benchmark.
+    value            : The measured value.
+    unit             : The unit of the value.
+    higher_is_better : True iff a higher value is an improvement, e.g. for throughputs.
+    """
+    name: str
+    value: float
+    unit: str
+    higher_is_better: bool = True
+
+
+class Comparison(NamedTuple):
+    """
+    A measurement compared against its baseline.
+
+    Fields
+    name     : The name of the measurement.
+    baseline : The value recorded in the baseline.
+    current  : The value measured now.
+    speedup  : How many times better the current value is than the baseline, so values below 1 are slowdowns.
+    """
+    name: str
+    baseline: float
+    current: float
+    speedup: float
+
+    def is_regression(self, tolerance: float) -> bool:
+        """Return true iff the current value is worse than the baseline by more than the tolerance."""
+        return self.speedup < 1 - tolerance
+
+
+def best_rate(operation: Callable[[], object], iterations: int, repeats: int = DEFAULT_REPEATS) -> float:
+    """
+    Return the number of calls of the operation per second, from the fastest of several repeats.
+
+    Parameters
+    operation  : The operation to time.
+    iterations : The number of calls in each repeat.
+    repeats    : The number of times to repeat the timing.
+    """
+    iterations = max(1, iterations)
+    best = float('inf')
+    for _ in range(repeats):
+        start = time.perf_counter()
+        for _ in range(iterations):
+            operation()
+        best = min(best, time.perf_counter() - start)
+    return iterations / best if best > 0 else float('inf')
+
+
+class CountingBattle(Battle):
+    """A battle which counts the number of turns enacted."""
+    def __init__(self, player: Trainer, enemy: Trainer, is_trainer_battle: bool) -> None:
+        """
+        Creates a CountingBattle.
+
+        Parameters
+        player            : The trainer corresponding to the player character.
+        enemy             : The enemy trainer.
+        is_trainer_battle : True iff the battle takes place between trainers.
+        """
+        super().__init__(player, enemy, is_trainer_battle)
+        self.turns = 0
+
+    def enact_turn(self) -> Optional[ActionSummary]:
+        """Enacts the next turn and counts it."""
+        self.turns += 1
+        return super().enact_turn()
+
+
+class DeepcopyBattle(CountingBattle):
+    """A battle which deep-copies each action before enacting it, as Battle.enact_turn used to."""
+    def enact_turn(self) -> Optional[ActionSummary]:
+        """Copies the next action, then enacts the turn."""
+        copy.deepcopy(self._trainer_action if self.get_turn() else self._enemy_action)
+        return super().enact_turn()
+
+
+class RecomputingBattle(Battle):
+    """A battle which recomputes the turn and the queue's state from the queued actions on every query, as Battle used to."""
+    def get_turn(self) -> Optional[bool]:
+        """Get whose turn it currently is, from the queued actions' priorities."""
+        if self.is_over() or self.is_action_queue_empty() or not(self.is_ready()):
+            return None
+        if self.is_action_queue_full():
+            return self._trainer_action.get_priority() <= self._enemy_action.get_priority()
+        return self.trainer_has_action_queued(True)
+
+    def is_action_queue_full(self) -> bool:
+        """Returns true if both trainers have an action queued."""
+        return self.trainer_has_action_queued(True) and self.trainer_has_action_queued(False)
+
+    def is_action_queue_empty(self) -> bool:
+        """Returns true if neither trainer have an action queued."""
+        return not(self.trainer_has_action_queued(True) or self.trainer_has_action_queued(False))
+
+    def trainer_has_action_queued(self, is_player: bool) -> bool:
+        """Returns true iff the supplied trainer has an action queued, comparing against the sentinel by equality."""
+        return (self._trainer_action if is_player else self._enemy_action) != self._no_action
+
+    def is_ready(self) -> bool:
+        """Returns true iff the next action is ready to be performed."""
+        return self.is_action_queue_full() or (not(self.is_action_queue_empty()) and self._order != None)
+
+
+class ScanningBattle(CountingBattle):
+    """A battle which checks whether it is over by scanning both rosters' health, as Battle.is_over used to."""
+    def is_over(self) -> bool:
+        """Returns true iff either trainer's pokemon have all fainted, or the battle ended early."""
+        for trainer in (self._player, self._enemy):
+            if all(pokemon.get_health() == 0 for pokemon in trainer._pokemon):
+                return True
+        return self._end_early
+
+
+def time_battles(battle_cls: type, player: Trainer, enemy: Trainer, battles: int,
+                 strategy: Optional[Strategy] = None) -> Tuple[float, float]:
+    """
+    Plays battles between clones of the rosters, and returns the number of battles and turns played per second.
+
+    Parameters
+    battle_cls : The CountingBattle subclass to play.
+    player     : The player's roster.
+    enemy      : The enemy's roster.
+    battles    : The number of battles to play.
+    strategy   : The strategy used by both sides, TeamRocket by default.
+    """
+    seed_random(BENCHMARK_SEED)
+    rosters = [(copy.deepcopy(player), copy.deepcopy(enemy)) for _ in range(battles)]
+    strategy = strategy or TeamRocket()
+    turns = 0
+
+    start = time.perf_counter()
+    for player_clone, enemy_clone in rosters:
+        battle = battle_cls(player_clone, enemy_clone, True)
+        play_battle(battle, strategy, strategy)
+        turns += battle.turns
+    elapsed = time.perf_counter() - start
+    return battles / elapsed, turns / elapsed
+
+
+def time_turns(battle_cls: type, player: Trainer, enemy: Trainer, battles: int) -> float:
+    """
+    Plays battles between clones of the rosters with TeamRocket strategies, and returns the number of turns enacted per second.
+
+    Parameters
+    battle_cls : The CountingBattle subclass to play.
+    player     : The player's roster.
+    enemy      : The enemy's roster.
+    battles    : The number of battles to play.
+    """
+    return time_battles(battle_cls, player, enemy, battles)[1]
+
+
+def bench_enact_turn(scale: float = 1.0) -> List[Measurement]:
+    """Measures the turns per second of the engine, with and without copying each enacted action."""
+    import data
+
+    battles = int(200 * scale) or 1
+    current = time_turns(CountingBattle, data.ash, data.brock, battles)
+    copying = time_turns(DeepcopyBattle, data.ash, data.brock, battles)
+    return [Measurement('enact_turn.turns', current, 'turns/s'),
+            Measurement('enact_turn.deepcopy_turns', copying, 'turns/s')]
+
+
+def bench_is_over(scale: float = 1.0) -> List[Measurement]:
+    """Measures Battle.is_over with the trainers' alive counts and by scanning the rosters, and the turns per second of each."""
+    import data
+
+    iterations = int(100000 * scale)
+    counted = CountingBattle(copy.deepcopy(data.ash), copy.deepcopy(data.brock), True)
+    scanning = ScanningBattle(copy.deepcopy(data.ash), copy.deepcopy(data.brock), True)
+    battles = int(200 * scale) or 1
+    return [Measurement('is_over.calls', best_rate(counted.is_over, iterations), 'calls/s'),
+            Measurement('is_over.scan_calls', best_rate(scanning.is_over, iterations), 'calls/s'),
+            Measurement('is_over.turns', time_turns(CountingBattle, data.ash, data.brock, battles), 'turns/s'),
+            Measurement('is_over.scan_turns', time_turns(ScanningBattle, data.ash, data.brock, battles), 'turns/s')]
+
+
+def endless_trainer(name: str) -> Trainer:
+    """Return a trainer whose pokemon can trade blows for as long as the benchmark needs without fainting."""
+    trainer = Trainer(name)
+    moves = [Attack('Scratch', 'normal', 10 ** 9, 50, 1, 1.0)]
+    trainer.add_pokemon(Pokemon('Snorlax', PokemonStats((1, 10 ** 9, 1, 100)), 'normal', moves, 5))
+    return trainer
+
+
+def time_rounds(battle_cls: type, iterations: int) -> float:
+    """
+    Return the number of round trips per second of queueing both sides' actions and enacting the resulting round.
+
+    Parameters
+    battle_cls : The Battle subclass to play.
+    iterations : The number of rounds in each repeat.
+    """
+    battle = battle_cls(endless_trainer('Red'), endless_trainer('Blue'), True)
+    battle.set_random(BattleRandom(BENCHMARK_SEED))
+    player_move = battle.get_trainer(True).get_current_pokemon().get_move_info()[0][0]
+    enemy_move = battle.get_trainer(False).get_current_pokemon().get_move_info()[0][0]
+
+    def play_round():
+        battle.queue_action(player_move, True)
+        battle.queue_action(enemy_move, False)
+        battle.enact_turn()
+        battle.enact_turn()
+
+    return best_rate(play_round, iterations)
+
+
+def bench_queue_and_enact(scale: float = 1.0) -> List[Measurement]:
+    """Measures round trips of queueing both sides' actions and enacting the resulting round, with and without the stored round state."""
+    iterations = int(5000 * scale)
+    return [Measurement('queue_and_enact.rounds', time_rounds(Battle, iterations), 'rounds/s'),
+            Measurement('queue_and_enact.recomputed_rounds', time_rounds(RecomputingBattle, iterations), 'rounds/s')]
+
+
+def stacked_pokemon() -> Pokemon:
+    """Return a pokemon with a deep stack of long-lasting stat modifiers."""
+    pokemon = Pokemon('Ditto', PokemonStats((1, 100, 100, 100)), 'normal', [], 5)
+    for depth in range(MODIFIER_DEPTH):
+        pokemon.add_stat_modifier((-0.001, 1, 1 - depth % 3, 1), 10 ** 9)
+    return pokemon
+
+
+def bench_get_stats(scale: float = 1.0) -> List[Measurement]:
+    """Measures the stats of a pokemon with a deep stack of modifiers, and the cost of maintaining the stack."""
+    iterations = int(20000 * scale)
+    pokemon = stacked_pokemon()
+    calls = best_rate(pokemon.get_stats, iterations * 10)
+
+    pokemon = stacked_pokemon()
+    adding = best_rate(lambda: pokemon.add_stat_modifier((0, 0, 0, 0), 10 ** 9), iterations)
+
+    pokemon = stacked_pokemon()
+
+    def expire_modifier():
+        pokemon.add_stat_modifier((0, 0, 5, 0), 1)
+        pokemon.post_round_actions()
+
+    expiring = best_rate(expire_modifier, iterations // 10)
+    return [Measurement('get_stats.calls', calls, 'calls/s'),
+            Measurement('get_stats.add_modifier', adding, 'calls/s'),
+            Measurement('get_stats.expire_modifier', expiring, 'rounds/s')]
+
+
+def bench_calculate_damage(scale: float = 1.0) -> List[Measurement]:
+    """Measures the damage calculation of an attack between two pokemon."""
+    import data
+
+    attack = Attack('Water Gun', 'water', 25, 60, 40, 1.0)
+    pokemon = data.ash.get_all_pokemon()[0]
+    enemy_pokemon = data.brock.get_all_pokemon()[0]
+    rate = best_rate(lambda: attack.calculate_damage(pokemon, enemy_pokemon), int(100000 * scale))
+    return [Measurement('calculate_damage.calls', rate, 'calls/s')]
+
+
+def bench_inventory(scale: float = 1.0) -> List[Measurement]:
+    """Measures adding, using and finding the best items in a trainer's inventory holding many distinct items of each kind."""
+    trainer = Trainer('Collector')
+    kinds = {'food': [Food(f'Berry {index}', index) for index in range(INVENTORY_SIZE)],
+             'pokeball': [Pokeball(f'Ball {index}', index / INVENTORY_SIZE) for index in range(INVENTORY_SIZE)]}
+    for items in kinds.values():
+        for item in items:
+            trainer.add_item(item, 1)
+
+    measurements = []
+    iterations = int(2000 * scale)
+    for kind, items in kinds.items():
+        cycle = iter(items * (DEFAULT_REPEATS * iterations // len(items) + 1))
+
+        def add_and_use():
+            item = next(cycle)
+            trainer.add_item(item, 1)
+            trainer.use_item(item)
+
+        measurements.append(Measurement(f'inventory.{kind}_add_and_use', best_rate(add_and_use, iterations), 'calls/s'))
+
+    inventory = trainer.get_inventory()
+    measurements.append(Measurement('inventory.best_pokeball', best_rate(inventory.get_best_pokeball, iterations * 10),
+                                    'calls/s'))
+    return measurements
+
+
+def bench_strategy_battles(scale: float = 1.0) -> List[Measurement]:
+    """Measures full battles between the supplied rosters when both sides are played by the enemy AI or TeamRocket."""
+    import data
+    from game import DefaultAIStrategy
+
+    battles = int(200 * scale) or 1
+    measurements = []
+    for name, strategy in (('default_ai', DefaultAIStrategy()), ('team_rocket', TeamRocket())):
+        battle_rate, turn_rate = time_battles(CountingBattle, data.ash, data.brock, battles, strategy)
+        measurements.append(Measurement(f'battles.{name}', battle_rate, 'battles/s'))
+        measurements.append(Measurement(f'battles.{name}_turns', turn_rate, 'turns/s'))
+    return measurements
+
+
+def bench_fork(scale: float = 1.0) -> List[Measurement]:
+    """Measures copying a battle between the supplied rosters with Battle.fork, and with copy.deepcopy."""
+    import data
+
+    battle = Battle(data.ash, data.brock, True)
+    iterations = int(2000 * scale)
+    return [Measurement('fork.battle', best_rate(battle.fork, iterations), 'copies/s'),
+            Measurement('fork.deepcopy', best_rate(lambda: copy.deepcopy(battle), iterations // 10), 'copies/s')]
+
+
+def filter_candidates(battle: Battle, is_player: bool) -> List[Action]:
+    """Return the trainer's legal actions by checking every candidate action's is_valid, as strategies did by hand."""
+    trainer = battle.get_trainer(is_player)
+    candidates = list(trainer._current_pokemon._moves)
+    candidates.extend(SwitchPokemon(index) for index in range(len(trainer._pokemon)))
+    candidates.extend(trainer.get_inventory())
+    candidates.append(Flee())
+    return [action for action in candidates if action.is_valid(battle, is_player)]
+
+
+def bench_legal_actions(scale: float = 1.0) -> List[Measurement]:
+    """Measures finding a trainer's legal actions by filtering candidates, with Battle.get_legal_actions, and from its cache."""
+    import data
+
+    battle = Battle(data.ash, data.brock, True)
+    iterations = int(20000 * scale)
+
+    def uncached():
+        battle.invalidate_legal_actions()
+        return battle.get_legal_actions(True)
+
+    return [Measurement('legal_actions.filter', best_rate(lambda: filter_candidates(battle, True), iterations), 'calls/s'),
+            Measurement('legal_actions.uncached', best_rate(uncached, iterations), 'calls/s'),
+            Measurement('legal_actions.cached', best_rate(lambda: battle.get_legal_actions(True), iterations * 10), 'calls/s')]
+
+
+def bench_mcts(scale: float = 1.0) -> List[Measurement]:
+    """Measures the playout rate of MCTSStrategy, and its win rate with each of the data.py trainers against TeamRocket."""
+    import data
+    from mcts import MCTSStrategy
+    from simulator import BattleSimulator
+
+    iterations = 100
+    strategy = MCTSStrategy(iterations=int(iterations * 4 * scale) or 1, seed=BENCHMARK_SEED)
+    strategy.get_next_action(Battle(copy.deepcopy(data.ash), copy.deepcopy(data.brock), True), True)
+    measurements = [Measurement('mcts.playouts', strategy.playouts_per_second(), 'playouts/s')]
+
+    battles = int(4 * scale) or 1
+    strategy = MCTSStrategy(iterations=iterations, seed=BENCHMARK_SEED)
+    for trainer, opponent in ((data.ash, data.brock), (data.brock, data.ash)):
+        simulator = BattleSimulator(trainer, opponent, strategy, TeamRocket(), seed=BENCHMARK_SEED)
+        win_rate = simulator.run(battles).get_statistics().win_rate(True)
+        measurements.append(Measurement(f'mcts.win_rate_{trainer.get_name().lower()}', win_rate, 'fraction'))
+    return measurements
+
+
+class DictBacked(object):
+    """An object holding its attributes in a per-instance __dict__, as the a2 classes did before they declared __slots__."""
+    def __init__(self, attributes: Dict[str, object]) -> None:
+        """
+        Creates a DictBacked instance.
+
+        Parameters
+        attributes : The attributes to hold.
+        """
+        self.__dict__.update(attributes)
+
+
+def slot_attributes(instance: object) -> Dict[str, object]:
+    """Return the values of every slot declared by the instance's class and its ancestors."""
+    names = [name for cls in type(instance).__mro__ for name in getattr(cls, '__slots__', ())]
+    return {name: getattr(instance, name) for name in names}
+
+
+def dict_backed_pokemon(pokemon: Pokemon) -> DictBacked:
+    """Return a dict-backed copy of a pokemon and its stats, laid out as a Pokemon instance used to be."""
+    attributes = slot_attributes(pokemon)
+    attributes['_stats_unmod'] = DictBacked(slot_attributes(pokemon._stats_unmod))
+    attributes['_stats'] = attributes['_stats_unmod']
+    return DictBacked(attributes)
+
+
+def measure_bytes(factory: Callable[[], object], population: int) -> float:
+    """
+    Return the mean number of bytes allocated and kept alive by each object made by the factory.
+
+    Parameters
+    factory    : Creates one object.
+    population : The number of objects to create.
+    """
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        objects = [factory() for _ in range(population)]
+        allocated = tracemalloc.get_traced_memory()[0] - before
+    finally:
+        tracemalloc.stop()
+    del objects
+    return allocated / population
+
+
+def bench_pokemon_memory(scale: float = 1.0) -> List[Measurement]:
+    """Measures the bytes used per pokemon, including its stats, move uses and modifiers, with and without __slots__."""
+    population = int(DEFAULT_POPULATION * scale) or 1
+    moves = [Attack('Tackle', 'normal', 35, 100, 40, 0.95), Buff('Meditation', 'psychic', 5, 80, (0, 100, 50, 50), 7)]
+    create = lambda: Pokemon('Eevee', PokemonStats((1, 100, 100, 100)), 'normal', moves, 5)
+
+    slotted = measure_bytes(create, population)
+    dict_backed = measure_bytes(lambda: dict_backed_pokemon(create()), population)
+    return [Measurement('pokemon_memory.slots', slotted, 'bytes', False),
+            Measurement('pokemon_memory.dict', dict_backed, 'bytes', False)]
+
+
+# Every benchmark in the suite, by name. Each takes a scale for its workload and returns its measurements.
+BENCHMARKS: Dict[str, Callable[[float], List[Measurement]]] = {
+    'enact_turn': bench_enact_turn,
+    'queue_and_enact': bench_queue_and_enact,
+    'is_over': bench_is_over,
+    'get_stats': bench_get_stats,
+    'calculate_damage': bench_calculate_damage,
+    'inventory': bench_inventory,
+    'battles': bench_strategy_battles,
+    'fork': bench_fork,
+    'legal_actions': bench_legal_actions,
+    'mcts': bench_mcts,
+    'pokemon_memory': bench_pokemon_memory,
+}
+
+
+def run_benchmarks(names: List[str], scale: float = 1.0) -> List[Measurement]:
+    """
+    Runs the named benchmarks in order and returns all of their measurements.
+
+    Parameters
+    names : The names of the benchmarks to run, from BENCHMARKS.
+    scale : The factor applied to the workload of every benchmark.
+    """
+    measurements = []
+    for name in names:
+        measurements.extend(BENCHMARKS[name](scale))
+    return measurements
+
+
+def to_json(measurements: List[Measurement]) -> Dict[str, object]:
+    """Return the measurements in the machine-readable form written to and read from results files."""
+    return {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'measurements': {measurement.name: {'value': measurement.value, 'unit': measurement.unit,
+                                            'higher_is_better': measurement.higher_is_better}
+                         for measurement in measurements},
+    }
+
+
+def load_baseline(path: str) -> Dict[str, Measurement]:
+    """Return the measurements stored in the results file at the supplied path, by name."""
+    with open(path) as file:
+        results = json.load(file)
+    return {name: Measurement(name, entry['value'], entry['unit'], entry['higher_is_better'])
+            for name, entry in results['measurements'].items()}
+
+
+def compare(measurements: List[Measurement], baseline: Dict[str, Measurement]) -> List[Comparison]:
+    """
+    Compares each measurement which is also present in the baseline.
+
+    Parameters
+    measurements : The current measurements.
+    baseline     : The baseline measurements, by name.
+    """
+    comparisons = []
+    for measurement in measurements:
+        previous = baseline.get(measurement.name)
+        if previous is None or previous.value <= 0 or measurement.value <= 0:
+            continue
+        speedup = measurement.value / previous.value
+        if not measurement.higher_is_better:
+            speedup = 1 / speedup
+        comparisons.append(Comparison(measurement.name, previous.value, measurement.value, speedup))
+    return comparisons
+
+
+def write_json(results: Dict[str, object], path: str) -> None:
+    """Writes the results as JSON to the supplied path, or to standard output if the path is '-'."""
+    if path == '-':
+        json.dump(results, sys.stdout, indent=2)
+        print()
+        return
+    with open(path, 'w') as file:
+        json.dump(results, file, indent=2)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the battle engine hot paths.')
+    parser.add_argument('benchmarks', nargs='*', metavar='BENCHMARK',
+                        help=f'the benchmarks to run, from {", ".join(BENCHMARKS)} (default: all)')
+    parser.add_argument('--scale', type=float, default=1.0, help='factor applied to every workload')
+    parser.add_argument('--output', help="write the results as JSON to this path, or '-' for standard output")
+    parser.add_argument('--save-baseline', metavar='PATH', help='write the results as JSON to use as a baseline')
+    parser.add_argument('--baseline', metavar='PATH', help='compare the results against a saved baseline')
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE,
+                        help='relative slowdown reported as a regression (default: %(default)s)')
+    args = parser.parse_args()
+    unknown = [name for name in args.benchmarks if name not in BENCHMARKS]
+    if unknown:
+        parser.error(f'unknown benchmarks: {", ".join(unknown)}')
+
+    measurements = run_benchmarks(args.benchmarks or list(BENCHMARKS), args.scale)
+    for measurement in measurements:
+        print(f'{measurement.name:36} {measurement.value:14.1f} {measurement.unit}', file=sys.stderr)
+
+    results = to_json(measurements)
+    if args.output:
+        write_json(results, args.output)
+    if args.save_baseline:
+        write_json(results, args.save_baseline)
+
+    if args.baseline:
+        regressions = 0
+        for comparison in compare(measurements, load_baseline(args.baseline)):
+            regressed = comparison.is_regression(args.tolerance)
+            regressions += regressed
+            print(f'{comparison.name:36} {comparison.baseline:14.1f} -> {comparison.current:14.1f} '
+                  f'({comparison.speedup:.2f}x){"  REGRESSION" if regressed else ""}', file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
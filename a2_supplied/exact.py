@@ -0,0 +1,330 @@
+"""
+Exact outcome distributions of battles played by fixed strategies.
+
+Every chance roll in a battle is a did_succeed call, and everything else, like damage, is deterministic.
+So, as long as the strategies are deterministic too, the outcome distribution can be computed exactly by following
+every combination of roll outcomes in each round, and memoizing the result for each distinct battle state.
+"""
+import sys
+import time
+from typing import Callable, Dict, Hashable, List, NamedTuple, Optional, Tuple
+
+from a2 import *
+from simulator import finish_round, play_round
+
+# The outcome of a round: its probability, the key of the resulting state if the battle isn't over,
+# and the resulting battle or terminal outcome.
+Branch = Tuple[float, Optional[Hashable], object]
+
+# The most distinct battle states solved before giving up.
+DEFAULT_MAX_STATES = 500000
+
+
+class OutcomeDistribution(NamedTuple):
+    """
+    The exact distribution of the outcomes of a battle.
+
+    Fields
+    player_win      : The probability that the player wins.
+    enemy_win       : The probability that the enemy wins.
+    ended_early     : The probability that the battle is ended early, by fleeing or catching the wild pokemon.
+    stalled         : The probability that the battle reaches a state where a strategy chooses an action it can't queue,
+                      or a state which every round leads back to.
+    expected_rounds : The expected number of rounds played, which is infinite if the battle may never leave a state.
+    states          : The number of distinct battle states solved.
+    """
+    player_win: float
+    enemy_win: float
+    ended_early: float
+    stalled: float
+    expected_rounds: float
+    states: int = 0
+
+    def __str__(self) -> str:
+        """Return a short summary of the distribution."""
+        return (f'player {self.player_win:.4%}, enemy {self.enemy_win:.4%}, ended early {self.ended_early:.4%}, '
+                f'stalled {self.stalled:.4%}, {self.expected_rounds:.2f} rounds expected ({self.states} states)')
+
+
+# The terminal outcomes of a battle, as (player_win, enemy_win, ended_early, stalled, expected_rounds).
+PLAYER_WON = (1.0, 0.0, 0.0, 0.0, 0.0)
+ENEMY_WON = (0.0, 1.0, 0.0, 0.0, 0.0)
+ENDED_EARLY = (0.0, 0.0, 1.0, 0.0, 0.0)
+STALLED = (0.0, 0.0, 0.0, 1.0, 0.0)
+
+# The outcome of a state which every round leads back to, so the battle never ends.
+NEVER_ENDS = (0.0, 0.0, 0.0, 1.0, float('inf'))
+
+
+class ScriptedRandom(BattleRandom):
+    """
+    A stream which, rather than rolling, follows a script of outcomes, and records the chance of every roll made.
+    Rolls past the end of the script succeed if they have any chance of success.
+    """
+    def __init__(self, script: Tuple[bool, ...] = ()) -> None:
+        """
+        Creates a ScriptedRandom.
+
+        Parameters
+        script : The outcomes of the first rolls.
+        """
+        super().__init__()
+        self._script = script
+        self._rolls: List[Tuple[float, bool]] = []
+
+    def get_rolls(self) -> List[Tuple[float, bool]]:
+        """Return the chance and outcome of every roll made, in order."""
+        return self._rolls
+
+    def did_succeed(self, chance: float) -> bool:
+        """
+        Return the scripted outcome of the next roll.
+
+        Parameters
+        chance : The probability in the range [0, 1] that the roll succeeds.
+        """
+        index = len(self._rolls)
+        outcome = self._script[index] if index < len(self._script) else chance > 0
+        self._rolls.append((chance, outcome))
+        return outcome
+
+    def random(self) -> float:
+        """Raises a ValueError, as a number drawn directly can't be followed exactly."""
+        raise ValueError('Exact outcomes can only be computed for battles which roll with did_succeed')
+
+    def fork(self) -> 'ScriptedRandom':
+        """Return a new stream with an empty script."""
+        return ScriptedRandom()
+
+
+def pokemon_key(pokemon: Pokemon) -> Hashable:
+    """Return a key identifying everything about the pokemon which can change during a battle."""
+    stats = pokemon._stats_unmod
+    return (pokemon._name, pokemon.get_health(), pokemon._level, pokemon._experience,
+            (stats.get_hit_chance(), stats.get_max_health(), stats.get_attack(), stats.get_defense()),
+            tuple(pokemon._moves), tuple(pokemon.get_remaining_move_uses(move) for move in pokemon._moves),
+            tuple((tuple(modifier), rounds) for modifier, rounds in pokemon._modifier))
+
+
+def trainer_key(trainer: Trainer) -> Hashable:
+    """Return a key identifying everything about the trainer which can change during a battle."""
+    current = next((index for index, pokemon in enumerate(trainer._pokemon)
+                    if pokemon is trainer._current_pokemon), None)
+    # The inventory is keyed as a set, so inventories which only differ in the order items were added are equal.
+    return (current, tuple(pokemon_key(pokemon) for pokemon in trainer._pokemon), frozenset(trainer._item.items()))
+
+
+def battle_key(battle: Battle) -> Hashable:
+    """Return a canonical key for the state of a battle between rounds. Battles with equal keys play out identically."""
+    return trainer_key(battle._player), trainer_key(battle._enemy), battle._end_early
+
+
+def terminal_outcome(battle: Battle) -> Tuple[float, ...]:
+    """Return the terminal outcome of a battle which is over."""
+    if battle._enemy.all_pokemon_fainted():
+        return PLAYER_WON
+    if battle._player.all_pokemon_fainted():
+        return ENEMY_WON
+    return ENDED_EARLY
+
+
+def roll_probability(rolls: List[Tuple[float, bool]]) -> float:
+    """Return the probability of the supplied roll outcomes happening together."""
+    probability = 1.0
+    for chance, outcome in rolls:
+        chance = min(1.0, max(0.0, chance))
+        probability *= chance if outcome else 1 - chance
+    return probability
+
+
+def enumerate_rolls(battle: Battle, play: Callable[[Battle], bool]) -> List[Tuple[float, Battle, bool]]:
+    """
+    Return every outcome of playing part of the battle, by replaying it from a fork with each combination of roll outcomes.
+    Each outcome is returned as its probability, the resulting battle, and whether it stalled.
+    Outcomes which can't happen are left out.
+
+    Parameters
+    battle : The battle to play on from. It is forked for each outcome, so it is never modified.
+    play   : Plays the battle forward, returning false iff it stalled.
+    """
+    outcomes = []
+    scripts = [()]
+    while scripts:
+        script = scripts.pop()
+        rng = ScriptedRandom(script)
+        outcome = battle.fork()
+        outcome.set_random(rng)
+        stalled = not play(outcome)
+
+        rolls = rng.get_rolls()
+        for index in range(len(script), len(rolls)):
+            chance, rolled = rolls[index]
+            if 0 < chance < 1:
+                scripts.append(tuple(roll for _, roll in rolls[:index]) + (not rolled,))
+
+        probability = roll_probability(rolls)
+        if probability > 0:
+            outcomes.append((probability, outcome, stalled))
+    return outcomes
+
+
+class ExactSolver(object):
+    """
+    Computes the exact outcome distribution of battles played by two deterministic strategies.
+    Results are memoized per battle state, so solving several battles that reach the same states shares the work.
+    A round which may leave the battle in the same state is solved in closed form, but longer cycles of states
+    raise a ValueError, as their outcome would need a system of equations to be solved. A state which every round
+    leads back to never ends, so it stalls after infinitely many rounds.
+
+    The number of states grows quickly with the size of the rosters, as every unlikely run of misses leads to
+    states with different health, move uses and modifiers, so this is only practical for small rosters.
+    """
+    def __init__(self, player_strategy: Strategy, enemy_strategy: Strategy,
+                 max_states: int = DEFAULT_MAX_STATES) -> None:
+        """
+        Creates an ExactSolver.
+
+        Parameters
+        player_strategy : The strategy choosing the player's actions. It must be deterministic.
+        enemy_strategy  : The strategy choosing the enemy's actions. It must be deterministic.
+        max_states      : The most distinct battle states to solve before raising a ValueError.
+        """
+        self._player_strategy = player_strategy
+        self._enemy_strategy = enemy_strategy
+        self._max_states = max_states
+        self._values: Dict[Hashable, Tuple[float, ...]] = {}
+
+    def get_states(self) -> int:
+        """Return the number of distinct battle states solved so far."""
+        return len(self._values)
+
+    def _branch(self, battle: Battle, play: Callable[[Battle], bool]) -> List[Branch]:
+        """
+        Return every outcome of playing part of the battle, with the key of each resulting state.
+
+        Parameters
+        battle : The battle to play on from. It is never modified.
+        play   : Plays the battle forward, returning false iff it stalled.
+        """
+        branches = []
+        for probability, outcome, stalled in enumerate_rolls(battle, play):
+            if stalled:
+                branches.append((probability, None, STALLED))
+            elif outcome.is_over():
+                branches.append((probability, None, terminal_outcome(outcome)))
+            else:
+                branches.append((probability, battle_key(outcome), outcome))
+        return branches
+
+    def _play_round(self, battle: Battle) -> bool:
+        """Plays a round chosen by the strategies, returning false iff they couldn't queue their actions."""
+        return play_round(battle, self._player_strategy, self._enemy_strategy)
+
+    def solve(self, battle: Battle) -> OutcomeDistribution:
+        """
+        Computes the exact outcome distribution of the battle from its current state.
+        If a round is underway, the actions already queued are enacted first, as play_battle does,
+        without counting as a round.
+
+        Parameters
+        battle : The battle to solve. It is never modified.
+        """
+        if battle.is_over():
+            return OutcomeDistribution(*terminal_outcome(battle), self.get_states())
+        if battle.is_action_queue_empty():
+            return OutcomeDistribution(*self._solve_state(battle_key(battle), battle), self.get_states())
+        if not battle.is_ready():
+            raise ValueError('The battle is waiting for an action to be queued, so its outcome cannot be solved')
+
+        totals = [0.0] * 5
+        for probability, key, state in self._branch(battle, self._finish_round):
+            value = state if key is None else self._solve_state(key, state)
+            for index in range(5):
+                totals[index] += probability * value[index]
+        return OutcomeDistribution(*totals, self.get_states())
+
+    @staticmethod
+    def _finish_round(battle: Battle) -> bool:
+        """Enacts the actions already queued for the round. The round can't stall, so this always returns true."""
+        finish_round(battle)
+        return True
+
+    def _solve_state(self, root_key: Hashable, root: Battle) -> Tuple[float, ...]:
+        """
+        Return the outcome of the battle state between rounds, solving every state reachable from it.
+        The search is iterative, so long battles don't exhaust the recursion limit.
+
+        Parameters
+        root_key : The key of the battle state.
+        root     : The battle in that state.
+        """
+        branches: Dict[Hashable, List[Branch]] = {}
+        stack = [(root_key, root)]
+        while stack:
+            key, battle = stack[-1]
+            if key in self._values:
+                stack.pop()
+                continue
+
+            if key not in branches:
+                if len(self._values) + len(branches) >= self._max_states:
+                    raise ValueError(f'The battle has more than {self._max_states} states, so it is too big to solve exactly')
+                branches[key] = self._branch(battle, self._play_round)
+                pending = [(child_key, child) for _, child_key, child in branches[key]
+                           if child_key is not None and child_key != key and child_key not in self._values]
+                for child_key, child in pending:
+                    if child_key in branches:
+                        raise ValueError('The battle can cycle between states, so its outcome cannot be solved exactly')
+                    stack.append((child_key, child))
+                if pending:
+                    continue
+
+            stack.pop()
+            self._values[key] = self._combine(key, branches.pop(key))
+        return self._values[root_key]
+
+    def _combine(self, key: Hashable, branches: List[Branch]) -> Tuple[float, ...]:
+        """
+        Return the outcome of a state from the outcomes of the states each of its rounds lead to.
+        Rounds which lead back to the same state are repeated until they don't, so their probability is divided out.
+        If every round leads back to the same state, the battle never ends.
+
+        Parameters
+        key      : The key of the state.
+        branches : The outcomes of a round played from the state.
+        """
+        repeat = sum(probability for probability, child_key, _ in branches if child_key == key)
+        if repeat >= 1:
+            return NEVER_ENDS
+        totals = [0.0] * 5
+        for probability, child_key, child in branches:
+            if child_key == key:
+                continue
+            value = child if child_key is None else self._values[child_key]
+            for index in range(5):
+                totals[index] += probability * value[index]
+        totals[4] += 1
+        return tuple(total / (1 - repeat) for total in totals)
+
+
+def main():
+    from montecarlo import WinProbabilityEstimator
+
+    rollouts = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    player = Trainer('Red')
+    enemy = Trainer('Blue')
+    player.add_pokemon(Pokemon('Pikachu', PokemonStats((0.9, 60, 45, 30)), 'electric',
+                               [Attack('Thunder Shock', 'electric', 30, 30, 40, 0.8)], 5))
+    enemy.add_pokemon(Pokemon('Squirtle', PokemonStats((0.8, 70, 40, 40)), 'water',
+                              [Attack('Water Gun', 'water', 25, 30, 40, 0.9)], 5))
+    battle = Battle(player, enemy, True)
+
+    start = time.perf_counter()
+    distribution = ExactSolver(TeamRocket(), TeamRocket()).solve(battle)
+    print(f'exact in {time.perf_counter() - start:.3f}s: {distribution}')
+    with WinProbabilityEstimator(TeamRocket(), TeamRocket(), rollouts, tolerance=0, seed=0) as estimator:
+        print(f'monte carlo: {estimator.estimate(battle)}')
+
+
+if __name__ == "__main__":
+    main()
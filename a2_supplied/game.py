@@ -107,7 +107,8 @@ def main():
 
     player = battle.get_trainer(True)
     enemy_pokemon = battle.get_trainer(False).get_current_pokemon()
-    view = GUIBattleView(root, player, enemy_pokemon)
+    view = GUIBattleView(root, player, enemy_pokemon,
+                         enemy=battle.get_trainer(False))
 
     controller = PokemonBattle(battle, DefaultAIStrategy(), view)
     controller.play()
@@ -0,0 +1,80 @@
+"""Vectorised versions of the attack formulas, for resolving an attack across many battle states at once."""
+from typing import Optional, Tuple
+
+import numpy as np
+
+from a2_support import ElementType
+
+
+def effectiveness_array() -> np.ndarray:
+    """Return the compiled type effectiveness matrix as an array indexed by [attacking type, defending type]."""
+    matrix = ElementType.get_effectiveness_matrix()
+    return np.array(matrix, dtype=np.float64).reshape(len(matrix), len(matrix))
+
+
+def batch_did_hit(move_hit_chance: np.ndarray, pokemon_hit_chance: np.ndarray,
+                  rng: Optional[np.random.Generator] = None) -> np.ndarray:
+    """
+    Determines which attacks hit, as Attack.did_hit does for a single attack: an attack hits iff a roll against the
+    move's hit chance and a roll against the attacking pokemon's hit chance both succeed.
+    Both rolls are drawn for every attack, so the random stream is consumed differently to the scalar version,
+    which skips the second roll when the first fails.
+
+    Parameters
+    move_hit_chance    : The base hit chance of the move for each attack.
+    pokemon_hit_chance : The current hit chance of the attacking pokemon for each attack.
+    rng                : The generator to draw rolls from. A new unseeded generator is used if omitted.
+    """
+    if rng is None:
+        rng = np.random.default_rng()
+    move_hit_chance, pokemon_hit_chance = np.broadcast_arrays(move_hit_chance, pokemon_hit_chance)
+    rolls = rng.random((2,) + move_hit_chance.shape)
+    return (rolls[0] < move_hit_chance) & (rolls[1] < pokemon_hit_chance)
+
+
+def batch_calculate_damage(base_damage: np.ndarray, move_type: np.ndarray, attack: np.ndarray,
+                           defense: np.ndarray, defending_type: np.ndarray,
+                           effectiveness: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    Calculates the damage of each attack assuming it hits, with the formula used by Attack.calculate_damage:
+    d * e * a / (D + 1), rounded down. The operations are performed in the same order and precision,
+    so the results are identical to the scalar version.
+
+    Parameters
+    base_damage    : The base damage of the move for each attack.
+    move_type      : The interned element type index of the move for each attack.
+    attack         : The attack stat of the attacking pokemon for each attack.
+    defense        : The defense stat of the defending pokemon for each attack.
+    defending_type : The interned element type index of the defending pokemon for each attack.
+    effectiveness  : The effectiveness matrix to use. It is compiled from the registered types if omitted.
+    """
+    if effectiveness is None:
+        effectiveness = effectiveness_array()
+    multiplier = effectiveness[move_type, defending_type]
+    damage = np.asarray(base_damage, dtype=np.float64) * multiplier * attack / (np.asarray(defense, dtype=np.float64) + 1)
+    return np.floor(damage).astype(np.int64)
+
+
+def batch_attack(base_damage: np.ndarray, move_hit_chance: np.ndarray, move_type: np.ndarray,
+                 attack: np.ndarray, pokemon_hit_chance: np.ndarray, defense: np.ndarray,
+                 defending_type: np.ndarray, rng: Optional[np.random.Generator] = None,
+                 effectiveness: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Resolves a batch of attacks, returning a mask of which attacks hit and the damage each one dealt.
+    Attacks which missed deal no damage. Scalar move parameters are broadcast across the batch.
+
+    Parameters
+    base_damage        : The base damage of the move for each attack.
+    move_hit_chance    : The base hit chance of the move for each attack.
+    move_type          : The interned element type index of the move for each attack.
+    attack             : The attack stat of the attacking pokemon for each attack.
+    pokemon_hit_chance : The current hit chance of the attacking pokemon for each attack.
+    defense            : The defense stat of the defending pokemon for each attack.
+    defending_type     : The interned element type index of the defending pokemon for each attack.
+    rng                : The generator to draw rolls from. A new unseeded generator is used if omitted.
+    effectiveness      : The effectiveness matrix to use. It is compiled from the registered types if omitted.
+    """
+    hit = batch_did_hit(move_hit_chance, pokemon_hit_chance, rng)
+    damage = batch_calculate_damage(base_damage, move_type, attack, defense, defending_type, effectiveness)
+    damage = np.broadcast_to(damage, hit.shape)
+    return hit, np.where(hit, damage, 0)
@@ -0,0 +1,334 @@
+"""A Monte Carlo Tree Search strategy, which plans by playing out many randomised continuations of the battle."""
+import sys
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor
+from math import log, sqrt
+from typing import Dict, Hashable, List, Optional, Tuple
+
+from a2 import *
+from parallel import get_type_chart, install_type_chart
+from simulator import DEFAULT_MAX_ROUNDS, finish_round, play_battle
+
+# The number of playouts used to choose each action when no time budget is given.
+DEFAULT_ITERATIONS = 400
+
+# The weight of the exploration term in UCT selection.
+DEFAULT_EXPLORATION = sqrt(2)
+
+# The number of playouts selected before their results are backed up, when rollouts run in a worker pool.
+DEFAULT_BATCH_SIZE = 16
+
+# The number of losses temporarily recorded along a path while its playout is pending,
+# so that the other playouts in the batch are steered towards different paths.
+DEFAULT_VIRTUAL_LOSS = 1
+
+# The rewards of a playout for the searching side.
+WIN_REWARD = 1.0
+LOSS_REWARD = 0.0
+DRAW_REWARD = 0.5
+
+
+class RandomStrategy(Strategy):
+    """
+    A rollout policy which chooses uniformly between the trainer's legal actions.
+    Choices are drawn from the battle's random stream, so playouts given their own stream are reproducible.
+
+    Ancestors : Strategy
+    """
+    def get_next_action(self, battle: Battle, is_player: bool) -> Optional[Action]:
+        """
+        Returns a random legal action for the trainer, or None if they have none.
+
+        Parameters
+        battle    : The ongoing pokemon battle.
+        is_player : True iff the action is for the player.
+        """
+        actions = battle.get_legal_actions(is_player)
+        if not actions:
+            return None
+        return actions[min(len(actions) - 1, int(battle.get_random().random() * len(actions)))]
+
+
+class GreedyDamageStrategy(Strategy):
+    """
+    A rollout policy which uses the move with the highest expected damage against the enemy's current pokemon,
+    switching to the first pokemon able to battle if the current one faints.
+
+    Ancestors : Strategy
+    """
+    def get_next_action(self, battle: Battle, is_player: bool) -> Optional[Action]:
+        """
+        Returns the legal action with the highest expected damage, or the first legal action if none of them deal damage.
+
+        Parameters
+        battle    : The ongoing pokemon battle.
+        is_player : True iff the action is for the player.
+        """
+        actions = battle.get_legal_actions(is_player)
+        if not actions:
+            return None
+        pokemon = battle.get_trainer(is_player)._current_pokemon
+        enemy_pokemon = battle.get_trainer(not is_player)._current_pokemon
+        best_action = actions[0]
+        best_damage = 0.0
+        for action in actions:
+            if isinstance(action, Attack):
+                damage = (action.calculate_damage(pokemon, enemy_pokemon)
+                          * action._hit_chance * pokemon.get_stats().get_hit_chance())
+                if damage > best_damage:
+                    best_action = action
+                    best_damage = damage
+        return best_action
+
+
+def playout_reward(battle: Battle, is_player: bool) -> float:
+    """Return the reward for the trainer of a finished or abandoned playout."""
+    if battle.get_trainer(not is_player).all_pokemon_fainted():
+        return WIN_REWARD
+    if battle.get_trainer(is_player).all_pokemon_fainted():
+        return LOSS_REWARD
+    return DRAW_REWARD
+
+
+def rollout(battle: Battle, is_player: bool, policy: Strategy, opponent_policy: Strategy,
+            max_rounds: int = DEFAULT_MAX_ROUNDS) -> float:
+    """
+    Plays the battle out with the rollout policies and returns the reward for the trainer.
+
+    Parameters
+    battle          : The battle to play out. It will be modified.
+    is_player       : True iff the reward is for the player.
+    policy          : The strategy choosing the trainer's actions.
+    opponent_policy : The strategy choosing the opponent's actions.
+    max_rounds      : The maximum number of rounds to play.
+    """
+    if is_player:
+        play_battle(battle, policy, opponent_policy, max_rounds)
+    else:
+        play_battle(battle, opponent_policy, policy, max_rounds)
+    return playout_reward(battle, is_player)
+
+
+class SearchNode(object):
+    """
+    A node of the search tree: the position reached by a sequence of the searching trainer's actions.
+    The opponent's replies and the chance rolls are sampled afresh in each playout, so a node stands for
+    every battle state the sequence can lead to.
+    """
+    __slots__ = ('action', 'children', 'visits', 'total')
+
+    def __init__(self, action: Optional[Action] = None) -> None:
+        """
+        Creates a SearchNode.
+
+        Parameters
+        action   : The action leading to this node, or None for the root.
+        children : The nodes reached by each action tried from here, by action key.
+        visits   : The number of playouts through this node, including pending ones.
+        total    : The sum of the rewards of the playouts through this node.
+        """
+        self.action = action
+        self.children: Dict[Hashable, SearchNode] = {}
+        self.visits = 0
+        self.total = 0.0
+
+    def uct(self, parent_visits: int, exploration: float) -> float:
+        """
+        Return the upper confidence bound of this node's value, used to choose which child of its parent to explore.
+
+        Parameters
+        parent_visits : The number of playouts through the parent.
+        exploration   : The weight of the exploration term.
+        """
+        if self.visits == 0:
+            return float('inf')
+        return self.total / self.visits + exploration * sqrt(log(max(1, parent_visits)) / self.visits)
+
+
+class MCTSStrategy(Strategy):
+    """
+    A strategy which builds a search tree over the trainer's actions with UCT selection, evaluating positions by
+    playing them out with a rollout policy, and chooses the most explored action.
+
+    With more than one worker, playouts are selected in batches and played out in a process pool.
+    Virtual losses are recorded along each pending path, so a batch spreads across the tree instead of
+    repeating the same path.
+
+    Ancestors : Strategy
+    """
+    def __init__(self, iterations: int = DEFAULT_ITERATIONS, time_budget: Optional[float] = None,
+                 rollout_policy: Optional[Strategy] = None, opponent_policy: Optional[Strategy] = None,
+                 exploration: float = DEFAULT_EXPLORATION, workers: int = 1, batch_size: int = DEFAULT_BATCH_SIZE,
+                 virtual_loss: int = DEFAULT_VIRTUAL_LOSS, max_rounds: int = DEFAULT_MAX_ROUNDS,
+                 seed: Optional[int] = None) -> None:
+        """
+        Creates an MCTSStrategy.
+
+        Parameters
+        iterations      : The number of playouts used to choose each action. There must be at least one.
+        time_budget     : The time allowed for choosing each action in seconds. If given, playouts continue until
+                          it runs out instead of stopping after the set number of iterations. The first batch of
+                          playouts is always played, so there is an informed choice however small the budget is.
+        rollout_policy  : The strategy playing the trainer's side in playouts. TeamRocket by default.
+        opponent_policy : The strategy playing the opponent in the tree and in playouts. The rollout policy by default.
+        exploration     : The weight of the exploration term in UCT selection.
+        workers         : The number of worker processes playing out positions. A single worker plays in-process.
+        batch_size      : The number of playouts selected at a time when using a worker pool.
+        virtual_loss    : The number of losses recorded along the path of each pending playout.
+        max_rounds      : The maximum number of rounds to play in each playout.
+        seed            : The seed of the strategy's random stream, or None to fork from the module-wide generator.
+        """
+        if iterations < 1:
+            raise ValueError(f'MCTSStrategy needs at least one playout per action, not {iterations}')
+        self._iterations = iterations
+        self._time_budget = time_budget
+        self._rollout_policy = rollout_policy or TeamRocket()
+        self._opponent_policy = opponent_policy or self._rollout_policy
+        self._exploration = exploration
+        self._workers = workers
+        self._batch_size = batch_size if workers > 1 else 1
+        self._virtual_loss = virtual_loss
+        self._max_rounds = max_rounds
+        self._rng = BattleRandom(seed)
+        self._executor: Optional[Executor] = None
+        self._playouts = 0
+        self._elapsed = 0.0
+
+    def get_playouts(self) -> int:
+        """Return the number of playouts used to choose the previous action."""
+        return self._playouts
+
+    def playouts_per_second(self) -> float:
+        """Return the rate of playouts when choosing the previous action."""
+        if self._elapsed <= 0:
+            return float('inf')
+        return self._playouts / self._elapsed
+
+    def close(self) -> None:
+        """Shuts down the worker pool, if it was started."""
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+    def _get_executor(self) -> Executor:
+        """Return the worker pool, starting it if it isn't running."""
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(self._workers, initializer=install_type_chart,
+                                                 initargs=(get_type_chart(),))
+        return self._executor
+
+    def get_next_action(self, battle: Battle, is_player: bool) -> Optional[Action]:
+        """
+        Searches the battle and returns the most explored action for the trainer, or None if they have no legal actions.
+
+        Parameters
+        battle    : The ongoing pokemon battle.
+        is_player : True iff the action is for the player.
+        """
+        actions = battle.get_legal_actions(is_player)
+        if len(actions) <= 1:
+            return actions[0] if actions else None
+
+        root = SearchNode()
+        start = time.perf_counter()
+        deadline = None if self._time_budget is None else start + self._time_budget
+        self._playouts = 0
+        while (self._playouts < self._iterations if deadline is None
+               else not self._playouts or time.perf_counter() < deadline):
+            size = self._batch_size if deadline is not None else min(self._batch_size, self._iterations - self._playouts)
+            selections = [self._select(root, battle, is_player) for _ in range(size)]
+            for (path, _), reward in zip(selections, self._play_out(selections, is_player)):
+                self._backup(path, reward)
+            self._playouts += size
+        self._elapsed = time.perf_counter() - start
+
+        best = max(root.children.values(), key=lambda child: child.visits)
+        return best.action
+
+    def _play_round(self, battle: Battle, action: Action, is_player: bool) -> bool:
+        """
+        Plays a round in which the trainer takes the supplied action and the opponent follows the opponent policy.
+        Returns false iff the round couldn't be played.
+
+        Parameters
+        battle    : The battle to play the round in. It will be modified.
+        action    : The trainer's action.
+        is_player : True iff the trainer is the player.
+        """
+        battle.queue_action(action, is_player)
+        if not battle.trainer_has_action_queued(not is_player):
+            reply = self._opponent_policy.get_next_action(battle, not is_player)
+            if reply is not None:
+                battle.queue_action(reply, not is_player)
+        if not battle.is_action_queue_full():
+            return False
+        finish_round(battle)
+        return True
+
+    def _select(self, root: SearchNode, battle: Battle, is_player: bool) -> Tuple[List[SearchNode], Battle]:
+        """
+        Descends the tree from the root by UCT, playing the chosen actions on a fork of the battle, and expands one
+        untried action. Returns the path taken, with a virtual loss recorded along it, and the battle reached.
+
+        Parameters
+        root      : The root of the search tree.
+        battle    : The battle at the root. It is never modified.
+        is_player : True iff the search is for the player.
+        """
+        state = battle.fork()
+        state.set_random(self._rng.fork())
+        node = root
+        path = [root]
+        while not state.is_over():
+            actions = state.get_legal_actions(is_player)
+            if not actions:
+                break
+            untried = [action for action in actions if action_key(action) not in node.children]
+            if untried:
+                action = untried[min(len(untried) - 1, int(state.get_random().random() * len(untried)))]
+                node = node.children.setdefault(action_key(action), SearchNode(action))
+                path.append(node)
+                self._play_round(state, action, is_player)
+                break
+
+            parent_visits = node.visits
+            node = max((node.children[action_key(action)] for action in actions),
+                       key=lambda child: child.uct(parent_visits, self._exploration))
+            path.append(node)
+            if not self._play_round(state, node.action, is_player):
+                break
+
+        for visited in path:
+            visited.visits += self._virtual_loss
+        return path, state
+
+    def _play_out(self, selections: List[Tuple[List[SearchNode], Battle]], is_player: bool) -> List[float]:
+        """Plays out the battles reached by the selected paths, in the worker pool if there is one, and returns their rewards."""
+        states = [state for _, state in selections]
+        count = len(states)
+        arguments = (states, [is_player] * count, [self._rollout_policy] * count, [self._opponent_policy] * count,
+                     [self._max_rounds] * count)
+        if self._workers == 1:
+            return list(map(rollout, *arguments))
+        return list(self._get_executor().map(rollout, *arguments))
+
+    def _backup(self, path: List[SearchNode], reward: float) -> None:
+        """Replaces the virtual loss along the path with the playout's reward."""
+        for node in path:
+            node.visits += 1 - self._virtual_loss
+            node.total += reward
+
+
+def main():
+    import data
+    from simulator import BattleSimulator
+
+    battles = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+    strategy = MCTSStrategy(iterations=200, seed=0)
+    report = BattleSimulator(data.brock, data.ash, strategy, TeamRocket(), seed=0).run(battles)
+    print(report)
+    print(report.get_statistics())
+
+
+if __name__ == "__main__":
+    main()
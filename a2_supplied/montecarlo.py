@@ -0,0 +1,223 @@
+"""Monte Carlo estimates of each side's chance of winning a battle, from any point in the battle."""
+import sys
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor
+from math import sqrt
+from typing import List, NamedTuple, Optional, Tuple
+
+from a2 import *
+from parallel import get_type_chart, install_type_chart
+from simulator import DEFAULT_MAX_ROUNDS, play_battle
+
+# The most continuations played for a single estimate.
+DEFAULT_MAX_ROLLOUTS = 2000
+
+# The number of continuations played between checks of whether the estimate is tight enough.
+DEFAULT_BATCH_SIZE = 100
+
+# The half-width of the confidence interval at which the estimate stops early.
+DEFAULT_TOLERANCE = 0.02
+
+# The z-score of the confidence level of the intervals, 1.96 for 95% confidence.
+DEFAULT_Z = 1.96
+
+
+def wilson_interval(successes: int, trials: int, z: float = DEFAULT_Z) -> Tuple[float, float]:
+    """
+    Return the Wilson score interval for a probability, given the number of successes in some trials.
+    Unlike the normal approximation, the interval stays within [0, 1] and is sensible when successes are 0 or trials.
+
+    Parameters
+    successes : The number of successful trials.
+    trials    : The total number of trials.
+    z         : The z-score of the confidence level.
+    """
+    if trials == 0:
+        return 0.0, 1.0
+    proportion = successes / trials
+    denominator = 1 + z * z / trials
+    centre = (proportion + z * z / (2 * trials)) / denominator
+    margin = z * sqrt(proportion * (1 - proportion) / trials + z * z / (4 * trials * trials)) / denominator
+    return max(0.0, centre - margin), min(1.0, centre + margin)
+
+
+class WinEstimate(NamedTuple):
+    """
+    The outcome of playing many continuations of a battle.
+    Continuations which were abandoned or ended early count as wins for neither side.
+
+    Fields
+    rollouts    : The number of continuations played.
+    player_wins : The number of continuations won by the player.
+    enemy_wins  : The number of continuations won by the enemy.
+    elapsed     : The wall-clock time spent playing the continuations, in seconds.
+    z           : The z-score of the confidence level of the intervals.
+    """
+    rollouts: int
+    player_wins: int
+    enemy_wins: int
+    elapsed: float
+    z: float = DEFAULT_Z
+
+    def win_probability(self, is_player: bool) -> float:
+        """Return the estimated probability that the player wins if is_player is true, otherwise that the enemy wins."""
+        wins = self.player_wins if is_player else self.enemy_wins
+        return wins / self.rollouts if self.rollouts else 0.0
+
+    def interval(self, is_player: bool) -> Tuple[float, float]:
+        """Return the confidence interval of the player's win probability if is_player is true, otherwise the enemy's."""
+        return wilson_interval(self.player_wins if is_player else self.enemy_wins, self.rollouts, self.z)
+
+    def half_width(self) -> float:
+        """Return the larger of the half-widths of the two sides' confidence intervals."""
+        return max((high - low) / 2 for low, high in (self.interval(True), self.interval(False)))
+
+    def rollouts_per_second(self) -> float:
+        """Return the number of continuations played per second."""
+        if self.elapsed <= 0:
+            return float('inf')
+        return self.rollouts / self.elapsed
+
+    def __str__(self) -> str:
+        """Return a short summary of the estimate."""
+        player_low, player_high = self.interval(True)
+        enemy_low, enemy_high = self.interval(False)
+        return (f'player {self.win_probability(True):.1%} [{player_low:.1%}, {player_high:.1%}], '
+                f'enemy {self.win_probability(False):.1%} [{enemy_low:.1%}, {enemy_high:.1%}] '
+                f'from {self.rollouts} rollouts ({self.rollouts_per_second():.0f} rollouts/s)')
+
+
+def play_rollouts(battle: Battle, player_strategy: Strategy, enemy_strategy: Strategy, count: int,
+                  rng: BattleRandom, max_rounds: int = DEFAULT_MAX_ROUNDS) -> Tuple[int, int]:
+    """
+    Plays count continuations of the battle to completion, and returns the number won by the player and the enemy.
+
+    Parameters
+    battle          : The battle to continue. It is forked for each continuation, so it is never modified.
+    player_strategy : The strategy choosing the player's actions.
+    enemy_strategy  : The strategy choosing the enemy's actions.
+    count           : The number of continuations to play.
+    rng             : The stream which each continuation's stream is forked from.
+    max_rounds      : The maximum number of rounds to play in each continuation.
+    """
+    player_wins = enemy_wins = 0
+    for _ in range(count):
+        continuation = battle.fork()
+        continuation.set_random(rng.fork())
+        winner = play_battle(continuation, player_strategy, enemy_strategy, max_rounds).winner
+        if winner is True:
+            player_wins += 1
+        elif winner is False:
+            enemy_wins += 1
+    return player_wins, enemy_wins
+
+
+class WinProbabilityEstimator(object):
+    """
+    Estimates each side's chance of winning a battle by playing randomised continuations of its current state.
+    Continuations are played in batches until both sides' confidence intervals are tight enough, or the rollout budget runs out.
+    With more than one worker, batches are spread across a process pool, which is kept until the estimator is closed.
+    """
+    def __init__(self, player_strategy: Strategy, enemy_strategy: Strategy,
+                 max_rollouts: int = DEFAULT_MAX_ROLLOUTS, batch_size: int = DEFAULT_BATCH_SIZE,
+                 tolerance: float = DEFAULT_TOLERANCE, z: float = DEFAULT_Z,
+                 max_rounds: int = DEFAULT_MAX_ROUNDS, workers: int = 1, seed: Optional[int] = None) -> None:
+        """
+        Creates a WinProbabilityEstimator.
+
+        Parameters
+        player_strategy : The strategy choosing the player's actions in each continuation.
+        enemy_strategy  : The strategy choosing the enemy's actions in each continuation.
+        max_rollouts    : The most continuations played for a single estimate.
+        batch_size      : The number of continuations played between checks of the intervals.
+        tolerance       : The confidence interval half-width at which to stop early, or 0 to always play max_rollouts.
+        z               : The z-score of the confidence level of the intervals.
+        max_rounds      : The maximum number of rounds to play in each continuation.
+        workers         : The number of worker processes. A single worker plays in-process.
+        seed            : The seed of the estimator's random stream, or None to fork from the module-wide generator.
+        """
+        self._player_strategy = player_strategy
+        self._enemy_strategy = enemy_strategy
+        self._max_rollouts = max_rollouts
+        self._batch_size = batch_size
+        self._tolerance = tolerance
+        self._z = z
+        self._max_rounds = max_rounds
+        self._workers = workers
+        self._rng = BattleRandom(seed)
+        self._executor: Optional[Executor] = None
+
+    def _get_executor(self) -> Executor:
+        """Return the process pool, starting it if it isn't running."""
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(self._workers, initializer=install_type_chart,
+                                                 initargs=(get_type_chart(),))
+        return self._executor
+
+    def close(self) -> None:
+        """Shuts down the process pool, if it was started."""
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+    def __enter__(self) -> 'WinProbabilityEstimator':
+        """Return this estimator, which is closed on leaving the with block."""
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        """Closes the estimator."""
+        self.close()
+
+    def _batch_sizes(self, played: int) -> List[int]:
+        """Return the sizes of the batches to play next, one for each worker, given the continuations played so far."""
+        sizes = []
+        for _ in range(self._workers):
+            size = min(self._batch_size, self._max_rollouts - played - sum(sizes))
+            if size <= 0:
+                break
+            sizes.append(size)
+        return sizes
+
+    def estimate(self, battle: Battle) -> WinEstimate:
+        """
+        Estimates each side's chance of winning the battle from its current state.
+        Any actions already queued are enacted first in every continuation.
+
+        Parameters
+        battle : The battle to estimate. It is never modified.
+        """
+        player_wins = enemy_wins = played = 0
+        start = time.perf_counter()
+        while played < self._max_rollouts:
+            sizes = self._batch_sizes(played)
+            rngs = [self._rng.fork() for _ in sizes]
+            if self._workers == 1:
+                batches = [play_rollouts(battle, self._player_strategy, self._enemy_strategy, sizes[0], rngs[0],
+                                         self._max_rounds)]
+            else:
+                count = len(sizes)
+                batches = self._get_executor().map(play_rollouts, [battle] * count, [self._player_strategy] * count,
+                                                   [self._enemy_strategy] * count, sizes, rngs,
+                                                   [self._max_rounds] * count)
+            for batch_player_wins, batch_enemy_wins in batches:
+                player_wins += batch_player_wins
+                enemy_wins += batch_enemy_wins
+            played += sum(sizes)
+
+            estimate = WinEstimate(played, player_wins, enemy_wins, time.perf_counter() - start, self._z)
+            if estimate.half_width() <= self._tolerance:
+                break
+        return WinEstimate(played, player_wins, enemy_wins, time.perf_counter() - start, self._z)
+
+
+def main():
+    import data
+
+    rollouts = int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_MAX_ROLLOUTS
+    battle = Battle(data.ash, data.brock, True)
+    with WinProbabilityEstimator(TeamRocket(), TeamRocket(), rollouts, tolerance=0) as estimator:
+        print(estimator.estimate(battle))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,335 @@
+"""Battles between any number of trainers with any number of pokemon out at once, e.g. double battles and free-for-alls."""
+import copy
+import sys
+from heapq import heappop, heappush
+from typing import Dict, Hashable, List, NamedTuple, Optional, Sequence, Tuple
+
+from a2 import *
+
+
+class ActionScheduler(object):
+    """
+    A priority queue of the actions queued by the participants of a round.
+    Actions are enacted in order of priority, lowest first, and ties go to the participant seated first.
+    With the player seated before the enemy, this orders a round exactly as Battle does.
+    Queueing k actions and enacting them all takes O(k log k).
+    """
+    def __init__(self, participants: Sequence[Hashable]) -> None:
+        """
+        Creates an empty ActionScheduler.
+
+        Parameters
+        participants : Everyone who may queue actions, in seating order.
+        """
+        self._seats = {participant: seat for seat, participant in enumerate(participants)}
+        self._heap: List[Tuple[int, int, Hashable, Action]] = []
+        self._queued: Dict[Hashable, Action] = {}
+
+    def queue(self, participant: Hashable, action: Action) -> None:
+        """
+        Queues the participant's action, assuming they don't already have one queued.
+
+        Parameters
+        participant : The participant performing the action.
+        action      : The action to queue.
+        """
+        self._queued[participant] = action
+        # Seats are unique, so entries never tie and the participants and actions are never compared.
+        heappush(self._heap, (action.get_priority(), self._seats[participant], participant, action))
+
+    def has_queued(self, participant: Hashable) -> bool:
+        """Returns true iff the participant has an action queued."""
+        return participant in self._queued
+
+    def get_queued(self, participant: Hashable) -> Optional[Action]:
+        """Returns the participant's queued action, or None if they don't have one."""
+        return self._queued.get(participant)
+
+    def peek(self) -> Optional[Hashable]:
+        """Returns the participant whose action is enacted next, or None if the queue is empty."""
+        return self._heap[0][2] if self._heap else None
+
+    def pop(self) -> Tuple[Hashable, Action]:
+        """Removes and returns the next participant and their action, assuming the queue isn't empty."""
+        _, _, participant, action = heappop(self._heap)
+        del self._queued[participant]
+        return participant, action
+
+    def clear(self) -> None:
+        """Removes every queued action."""
+        self._heap.clear()
+        self._queued.clear()
+
+    def __len__(self) -> int:
+        """Returns the number of queued actions."""
+        return len(self._heap)
+
+
+class Participant(NamedTuple):
+    """
+    A pokemon out in a multi-battle.
+
+    Fields
+    trainer : The index of the pokemon's trainer, in seating order.
+    slot    : The index of the pokemon among those its trainer has out.
+    """
+    trainer: int
+    slot: int
+
+
+class MultiBattle(object):
+    """
+    A battle between sides of one or more trainers, where each trainer has one or more pokemon out at once.
+    Each round every participant, i.e. every pokemon out, queues an action and a target on another side.
+    Once they all have, the actions are enacted in priority order by an ActionScheduler.
+    A battle between two trainers with one pokemon out each plays exactly like a Battle.
+
+    Actions work on a two-trainer Battle, so each one is enacted on an engagement: a Battle between the participant's trainer,
+    as the player, and their target's trainer, with each trainer's current pokemon set to the engaged pokemon.
+    """
+    def __init__(self, sides: List[List[Trainer]], active: int = 1, is_trainer_battle: bool = True) -> None:
+        """
+        Creates a MultiBattle.
+
+        Parameters
+        sides             : The trainers on each side. Trainers are seated in order, from the first trainer on the first side.
+        active            : The number of pokemon each trainer has out, starting with their current pokemon.
+        is_trainer_battle : True iff the battle takes place between trainers.
+        """
+        self._trainers = [trainer for side in sides for trainer in side]
+        self._sides = [index for index, side in enumerate(sides) for _ in side]
+        self._active: List[List[Pokemon]] = []
+        for trainer in self._trainers:
+            reserves = [pokemon for pokemon in trainer._pokemon
+                        if pokemon is not trainer._current_pokemon and not pokemon.has_fainted()]
+            self._active.append(([trainer._current_pokemon] + reserves)[:active])
+        self._participants = [Participant(index, slot) for index, out in enumerate(self._active) for slot in range(len(out))]
+        self._scheduler = ActionScheduler(self._participants)
+        self._targets: Dict[Participant, Participant] = {}
+        self._ready = False
+        self._end_early = False
+        self._engagement = Battle(self._trainers[0], self._trainers[-1], is_trainer_battle)
+
+    def get_participants(self) -> List[Participant]:
+        """Returns every participant, in seating order."""
+        return list(self._participants)
+
+    def get_trainer(self, participant: Participant) -> Trainer:
+        """Returns the participant's trainer."""
+        return self._trainers[participant.trainer]
+
+    def get_pokemon(self, participant: Participant) -> Pokemon:
+        """Returns the participant's pokemon."""
+        return self._active[participant.trainer][participant.slot]
+
+    def get_random(self) -> BattleRandom:
+        """Return the stream of random numbers used for the chance rolls of this battle."""
+        return self._engagement.get_random()
+
+    def set_random(self, rng: BattleRandom) -> None:
+        """Sets the stream of random numbers used for the chance rolls of this battle."""
+        self._engagement.set_random(rng)
+
+    def is_opponent(self, participant: Participant, other: Participant) -> bool:
+        """Returns true iff the two participants are on different sides."""
+        return self._sides[participant.trainer] != self._sides[other.trainer]
+
+    def get_default_target(self, participant: Participant) -> Optional[Participant]:
+        """Returns the first opponent of the participant whose pokemon hasn't fainted, or else their first opponent, or None if there are none."""
+        opponents = [other for other in self._participants if self.is_opponent(participant, other)]
+        for other in opponents:
+            if not(self.get_pokemon(other).has_fainted()):
+                return other
+        return opponents[0] if opponents else None
+
+    def engage(self, participant: Participant, target: Optional[Participant] = None) -> Battle:
+        """
+        Returns the engagement between a participant and their target, e.g. to validate or choose the participant's action.
+        The participant's trainer is the player. The engagement is reused, so it is only current until the next call.
+
+        Parameters
+        participant : The participant acting.
+        target      : The opponent they act against, or None for their default target.
+        """
+        if target is None:
+            target = self.get_default_target(participant)
+        trainer = self.get_trainer(participant)
+        enemy = self.get_trainer(target)
+        trainer._current_pokemon = self.get_pokemon(participant)
+        enemy._current_pokemon = self.get_pokemon(target)
+
+        battle = self._engagement
+        battle._player = trainer
+        battle._enemy = enemy
+        battle._end_early = self._end_early
+        battle.invalidate_legal_actions()
+        return battle
+
+    def needs_action(self, participant: Participant) -> bool:
+        """
+        Returns true iff the participant must queue an action before the round is ready:
+        their pokemon hasn't fainted, or it has and their trainer has a reserve pokemon they can switch to.
+        """
+        if not(self.get_pokemon(participant).has_fainted()):
+            return True
+        return any(self._is_reserve(participant, index) for index in range(len(self.get_trainer(participant)._pokemon)))
+
+    def _is_reserve(self, participant: Participant, index: int) -> bool:
+        """
+        Returns true iff the pokemon at the index of the participant's trainer's roster hasn't fainted, isn't out,
+        and no other participant of the same trainer has already queued a switch to it this round.
+        """
+        pokemon = self.get_trainer(participant)._pokemon[index]
+        if pokemon.has_fainted() or any(pokemon is out for out in self._active[participant.trainer]):
+            return False
+        for other in self._participants:
+            action = self._scheduler.get_queued(other)
+            if (other.trainer == participant.trainer and other != participant and isinstance(action, SwitchPokemon)
+                    and action._next_pokemon_index == index):
+                return False
+        return True
+
+    def is_valid(self, participant: Participant, action: Action, target: Optional[Participant] = None) -> bool:
+        """
+        Returns true iff the action would be valid for the participant against the target.
+        In addition to the action's own checks, a participant can't switch to a pokemon that their trainer already has out,
+        or that another of their trainer's participants has already queued a switch to.
+
+        Parameters
+        participant : The participant acting.
+        action      : The action to check.
+        target      : The opponent they act against, or None for their default target.
+        """
+        if target is None:
+            target = self.get_default_target(participant)
+        if target is None or not(self.is_opponent(participant, target)):
+            return False
+        if not(action.is_valid(self.engage(participant, target), True)):
+            return False
+        if isinstance(action, SwitchPokemon):
+            return self._is_reserve(participant, action._next_pokemon_index)
+        return True
+
+    def get_legal_actions(self, participant: Participant, target: Optional[Participant] = None) -> List[Action]:
+        """
+        Returns every action the participant could queue against the target.
+
+        Parameters
+        participant : The participant acting.
+        target      : The opponent they act against, or None for their default target.
+        """
+        battle = self.engage(participant, target)
+        return [action for action in battle.get_legal_actions(True)
+                if not(isinstance(action, SwitchPokemon)) or self._is_reserve(participant, action._next_pokemon_index)]
+
+    def is_ready(self) -> bool:
+        """Returns true iff every participant who needs an action has queued one, and they have not all been enacted."""
+        return self._ready
+
+    def is_over(self) -> bool:
+        """Returns true iff the battle ended early, or at most one side has pokemon which haven't fainted."""
+        if self._end_early:
+            return True
+        sides = {self._sides[index] for index, trainer in enumerate(self._trainers) if not(trainer.all_pokemon_fainted())}
+        return len(sides) <= 1
+
+    def trainer_has_action_queued(self, participant: Participant) -> bool:
+        """Returns true iff the participant has an action queued."""
+        return self._scheduler.has_queued(participant)
+
+    def queue_action(self, participant: Participant, action: Action, target: Optional[Participant] = None) -> None:
+        """
+        Attempts to queue the participant's action against the target.
+        As in Battle, the action isn't queued if the participant already has one queued, the round is ready, or the action is invalid.
+        The round is ready once every participant who needs an action has queued one.
+
+        Parameters
+        participant : The participant acting.
+        action      : The action to queue.
+        target      : The opponent they act against, or None for their default target.
+        """
+        if self._ready or self.is_over() or self._scheduler.has_queued(participant):
+            return
+        if target is None:
+            target = self.get_default_target(participant)
+        if not(self.is_valid(participant, action, target)):
+            return
+
+        self._targets[participant] = target
+        self._scheduler.queue(participant, action)
+        self._ready = all(self._scheduler.has_queued(other) for other in self._participants if self.needs_action(other))
+
+    def get_turn(self) -> Optional[Participant]:
+        """Returns the participant whose action is enacted next, or None if the round isn't ready or the battle is over."""
+        if not(self._ready) or self.is_over():
+            return None
+        return self._scheduler.peek()
+
+    def enact_turn(self) -> ActionSummary:
+        """
+        Performs the next action in the queue, and returns a summary of its effects.
+        If the target's pokemon has fainted, the action is redirected to the first opponent whose pokemon hasn't.
+        As in Battle, the post round actions of every pokemon out are performed just before the last action of the round.
+        """
+        if self.get_turn() is None:
+            return ActionSummary("The round is not ready!")
+
+        participant, action = self._scheduler.pop()
+        target = self._targets.pop(participant)
+        if self.get_pokemon(target).has_fainted():
+            target = self.get_default_target(participant)
+        if not(len(self._scheduler)):
+            for out in self._active:
+                for pokemon in out:
+                    pokemon.post_round_actions()
+            self._ready = False
+
+        battle = self.engage(participant, target)
+        summary = action.apply(battle, True)
+        self._active[participant.trainer][participant.slot] = battle._player._current_pokemon
+        self._end_early = bool(battle._end_early)
+        return summary
+
+    def play_round(self, strategy: Strategy) -> List[ActionSummary]:
+        """
+        Queues an action for every participant who needs one, then enacts the round and returns the summaries of each action.
+        The strategy chooses each action on the participant's engagement with their default target.
+        If it chooses an invalid action, e.g. switching to a pokemon which is already out, the first legal action is used instead.
+
+        Parameters
+        strategy : The strategy choosing every participant's actions.
+        """
+        for participant in self._participants:
+            if not(self.needs_action(participant)) or self._scheduler.has_queued(participant):
+                continue
+            action = strategy.get_next_action(self.engage(participant), True)
+            if action is None or not(self.is_valid(participant, action)):
+                legal = self.get_legal_actions(participant)
+                action = legal[0] if legal else None
+            if action is not None:
+                self.queue_action(participant, action)
+
+        summaries = []
+        while self.get_turn() is not None:
+            summaries.append(self.enact_turn())
+        return summaries
+
+
+def main():
+    import data
+
+    rounds = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+    battle = MultiBattle([[copy.deepcopy(data.ash)], [copy.deepcopy(data.brock)]], active=2)
+    battle.set_random(BattleRandom(0))
+    strategy = TeamRocket()
+    for round_number in range(1, rounds + 1):
+        if battle.is_over():
+            break
+        print(f'Round {round_number}')
+        for summary in battle.play_round(strategy):
+            for message in summary.get_messages():
+                print(f'  {message}')
+
+
+if __name__ == "__main__":
+    main()
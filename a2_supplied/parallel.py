@@ -0,0 +1,219 @@
+"""Runs independent headless battles across a pool of worker processes."""
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from random import Random
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from a2 import *
+from simulator import DEFAULT_MAX_ROUNDS, BattleStatistics, SimulationReport, play_battle
+
+# The number of battles each worker plays between reporting back.
+DEFAULT_CHUNK_SIZE = 64
+
+# Picklable descriptions of the battle participants.
+# A move or item is described by its class name and constructor arguments,
+# a pokemon by (name, stats, element_type, moves, level),
+# and a trainer by (name, pokemon, items) where items are (item, count) pairs.
+ActionSpec = Tuple[str, tuple]
+PokemonSpec = Tuple[str, Tuple[float, int, int, int], str, List[ActionSpec], int]
+TrainerSpec = Tuple[str, List[PokemonSpec], List[Tuple[ActionSpec, int]]]
+TypeChart = Dict[str, Dict[str, float]]
+
+_SPEC_CLASSES = {cls.__name__: cls for cls in (Attack, Buff, Debuff, Food, Pokeball)}
+
+
+def action_to_spec(action: Action) -> ActionSpec:
+    """
+    Describes a move or item by its class name and constructor arguments.
+
+    Parameters
+    action : The move or item to describe.
+    """
+    if isinstance(action, Attack):
+        args = (action._name, action._element_type, action._max_uses, action._speed,
+                action._base_damage, action._hit_chance)
+    elif isinstance(action, StatusModifier):
+        args = (action._name, action._element_type, action._max_uses, action._speed,
+                action._modification, action._rounds)
+    elif isinstance(action, Food):
+        args = (action._item_name, action._health_restored)
+    elif isinstance(action, Pokeball):
+        args = (action._item_name, action._catch_chance)
+    else:
+        raise ValueError(f'{action} cannot be described by a spec')
+    return type(action).__name__, args
+
+
+def action_from_spec(spec: ActionSpec) -> Action:
+    """Return the shared instance of the move or item described by the spec."""
+    cls_name, args = spec
+    return _SPEC_CLASSES[cls_name].of(*args)
+
+
+def trainer_to_spec(trainer: Trainer) -> TrainerSpec:
+    """
+    Describes a trainer's roster and inventory as they would be before a battle.
+    Pokemon are described by their unmodified stats, so health and stat modifiers are not preserved.
+
+    Parameters
+    trainer : The trainer to describe.
+    """
+    pokemon_specs = []
+    for pokemon in trainer.get_all_pokemon():
+        stats = pokemon._stats_unmod
+        pokemon_specs.append((pokemon.get_name(),
+                              (stats.get_hit_chance(), stats.get_max_health(), stats.get_attack(), stats.get_defense()),
+                              pokemon.get_element_type(),
+                              [action_to_spec(move) for move in pokemon._moves],
+                              pokemon.get_level()))
+    item_specs = [(action_to_spec(item), count) for item, count in trainer.get_inventory().items()]
+    return trainer.get_name(), pokemon_specs, item_specs
+
+
+def trainer_from_spec(spec: TrainerSpec) -> Trainer:
+    """Builds a new trainer from the supplied spec."""
+    name, pokemon_specs, item_specs = spec
+    trainer = Trainer(name)
+    for pokemon_name, stats, element_type, move_specs, level in pokemon_specs:
+        moves = [action_from_spec(move_spec) for move_spec in move_specs]
+        trainer.add_pokemon(Pokemon(pokemon_name, PokemonStats(stats), element_type, moves, level))
+    for item_spec, count in item_specs:
+        trainer.add_item(action_from_spec(item_spec), count)
+    return trainer
+
+
+def get_type_chart() -> TypeChart:
+    """Return a picklable copy of the type effectiveness registered with ElementType."""
+    return {name: dict(element._effectiveness) for name, element in ElementType._elements.items()}
+
+
+def install_type_chart(chart: TypeChart) -> None:
+    """
+    Registers the supplied type effectiveness with ElementType.
+    Used to initialise worker processes, which don't share the registry of the parent process.
+
+    Parameters
+    chart : A mapping from attacking type to a mapping of defending type to effectiveness.
+    """
+    for name, effectiveness in chart.items():
+        element = ElementType.of(name)
+        for defending_type, multiplier in effectiveness.items():
+            element.add_type_effectiveness(defending_type, multiplier)
+
+
+class BattleJob(NamedTuple):
+    """
+    A picklable description of the battles to play.
+
+    Fields
+    player            : The player's roster spec.
+    enemy             : The enemy's roster spec.
+    player_strategy   : The strategy choosing the player's actions.
+    enemy_strategy    : The strategy choosing the enemy's actions.
+    is_trainer_battle : True iff the battles take place between trainers.
+    max_rounds        : The maximum number of rounds to play in each battle.
+    """
+    player: TrainerSpec
+    enemy: TrainerSpec
+    player_strategy: Strategy
+    enemy_strategy: Strategy
+    is_trainer_battle: bool = True
+    max_rounds: int = DEFAULT_MAX_ROUNDS
+
+
+def chunk_seed(seed: int, chunk_index: int) -> int:
+    """Return the seed for the chunk at the supplied index, so that every chunk has its own reproducible stream."""
+    return Random(f'{seed}:{chunk_index}').getrandbits(64)
+
+
+def run_chunk(job: BattleJob, seed: int, count: int) -> BattleStatistics:
+    """
+    Plays count battles described by the job, each with its own stream forked from the chunk's seed.
+
+    Parameters
+    job   : The battles to play.
+    seed  : The seed for this chunk.
+    count : The number of battles to play.
+    """
+    rng = BattleRandom(seed)
+    statistics = BattleStatistics()
+    for _ in range(count):
+        battle = Battle(trainer_from_spec(job.player), trainer_from_spec(job.enemy), job.is_trainer_battle)
+        battle.set_random(rng.fork())
+        statistics.add_result(play_battle(battle, job.player_strategy, job.enemy_strategy, job.max_rounds))
+    return statistics
+
+
+class ParallelBattleRunner(object):
+    """
+    Spreads independent battles across a pool of worker processes and merges their statistics.
+    Battles are split into fixed-size chunks which are each seeded from the base seed and their index,
+    so the merged statistics only depend on the seed and chunk size, not on the number of workers.
+    """
+    def __init__(self, job: BattleJob, workers: Optional[int] = None,
+                 chunk_size: int = DEFAULT_CHUNK_SIZE) -> None:
+        """
+        Creates a ParallelBattleRunner.
+
+        Parameters
+        job        : The battles to play.
+        workers    : The number of worker processes, defaulting to the number of cores. A single worker plays in-process.
+        chunk_size : The number of battles in each unit of work.
+        """
+        self._job = job
+        self._workers = workers or os.cpu_count() or 1
+        self._chunk_size = chunk_size
+
+    def get_workers(self) -> int:
+        """Return the number of worker processes used."""
+        return self._workers
+
+    def _chunks(self, count: int, seed: int) -> List[Tuple[int, int]]:
+        """Return the seed and size of each chunk needed to play count battles."""
+        chunks = []
+        for index, start in enumerate(range(0, count, self._chunk_size)):
+            chunks.append((chunk_seed(seed, index), min(self._chunk_size, count - start)))
+        return chunks
+
+    def run(self, count: int, seed: int = 0) -> SimulationReport:
+        """
+        Plays count battles and returns their merged statistics and throughput.
+
+        Parameters
+        count : The number of battles to play.
+        seed  : The base seed for the chunks.
+        """
+        chunks = self._chunks(count, seed)
+        jobs = [self._job] * len(chunks)
+        seeds = [chunk[0] for chunk in chunks]
+        sizes = [chunk[1] for chunk in chunks]
+        statistics = BattleStatistics()
+
+        start = time.perf_counter()
+        if self._workers == 1:
+            for chunk_statistics in map(run_chunk, jobs, seeds, sizes):
+                statistics.merge(chunk_statistics)
+        else:
+            with ProcessPoolExecutor(self._workers, initializer=install_type_chart,
+                                     initargs=(get_type_chart(),)) as executor:
+                for chunk_statistics in executor.map(run_chunk, jobs, seeds, sizes):
+                    statistics.merge(chunk_statistics)
+
+        return SimulationReport(statistics, time.perf_counter() - start)
+
+
+def main():
+    import data
+
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    job = BattleJob(trainer_to_spec(data.ash), trainer_to_spec(data.brock), TeamRocket(), TeamRocket())
+    for workers in sorted({1, os.cpu_count() or 1}):
+        report = ParallelBattleRunner(job, workers).run(count)
+        print(f'{workers} worker(s): {report}')
+        print(report.get_statistics())
+
+
+if __name__ == "__main__":
+    main()
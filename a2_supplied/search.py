@@ -0,0 +1,337 @@
+"""A search-based strategy, which looks ahead with depth-limited expectiminimax over each side's legal actions."""
+import sys
+import time
+from collections import OrderedDict
+from random import Random
+from typing import Dict, Hashable, List, NamedTuple, Optional
+
+from a2 import *
+from exact import enumerate_rolls
+from simulator import finish_round
+
+# The deepest search, in rounds, tried by iterative deepening.
+DEFAULT_MAX_DEPTH = 3
+
+# The time allowed for choosing each action, in seconds. The first round of lookahead is always completed.
+DEFAULT_TIME_BUDGET = 0.1
+
+# The number of positions kept in the transposition table.
+DEFAULT_TABLE_SIZE = 100000
+
+# The number of feature keys generated before the hasher and the transposition table are started afresh.
+DEFAULT_KEY_LIMIT = 100000
+
+# The weight of the health difference in the evaluation of an unfinished battle.
+# It keeps evaluations strictly between the values of a loss (-1) and a win (1).
+HEALTH_WEIGHT = 0.5
+
+
+def health_fraction(trainer: Trainer) -> float:
+    """Return the trainer's remaining health over all their pokemon, as a fraction of their maximum health."""
+    health = maximum = 0
+    for pokemon in trainer._pokemon:
+        health += pokemon.get_health()
+        maximum += pokemon.get_max_health()
+    return health / maximum if maximum else 0.0
+
+
+def evaluate(battle: Battle, is_player: bool) -> float:
+    """
+    Return the value of the battle for a trainer: 1 for a win, -1 for a loss, 0 if it ended early,
+    and otherwise a score in between based on the difference in the two sides' remaining health.
+
+    Parameters
+    battle    : The battle to evaluate.
+    is_player : True iff the value is for the player.
+    """
+    own = battle.get_trainer(is_player)
+    other = battle.get_trainer(not is_player)
+    if other.all_pokemon_fainted():
+        return 1.0
+    if own.all_pokemon_fainted():
+        return -1.0
+    if battle.is_over():
+        return 0.0
+    return HEALTH_WEIGHT * (health_fraction(own) - health_fraction(other))
+
+
+class ZobristHasher(object):
+    """
+    Hashes battle states by XOR-ing a random 64 bit key for each feature of the state, e.g. a pokemon's health or a move's uses.
+    Keys are generated the first time a feature is seen, so features with unbounded values need no fixed table.
+    Keys are never forgotten, so ExpectiminimaxStrategy starts a new hasher once it has generated too many.
+    """
+    def __init__(self, seed: int = 0) -> None:
+        """
+        Creates a ZobristHasher.
+
+        Parameters
+        seed : The seed for generating feature keys.
+        """
+        self._random = Random(seed)
+        self._keys: Dict[Hashable, int] = {}
+
+    def key(self, feature: Hashable) -> int:
+        """Return the random key of the feature, generating it if it hasn't been seen before."""
+        key = self._keys.get(feature)
+        if key is None:
+            key = self._keys[feature] = self._random.getrandbits(64)
+        return key
+
+    def __len__(self) -> int:
+        """Return the number of feature keys generated so far."""
+        return len(self._keys)
+
+    def hash_trainer(self, trainer: Trainer, side: bool) -> int:
+        """
+        Return the hash of a trainer: their pokemon, including their stats, element types and everything which can change during a battle, and their inventory.
+
+        Parameters
+        trainer : The trainer to hash.
+        side    : True iff the trainer is the player.
+        """
+        key = self.key
+        value = 0
+        for slot, pokemon in enumerate(trainer._pokemon):
+            if pokemon is trainer._current_pokemon:
+                value ^= key((side, 'current', slot))
+            stats = pokemon._stats_unmod
+            value ^= key((side, slot, 'pokemon', pokemon._name, pokemon._element_type, pokemon._level, pokemon._experience,
+                          stats.get_hit_chance(), stats.get_max_health(), stats.get_attack(), stats.get_defense()))
+            value ^= key((side, slot, 'health', pokemon.get_health()))
+            for index, move in enumerate(pokemon._moves):
+                value ^= key((side, slot, 'move', index, move, pokemon.get_remaining_move_uses(move)))
+            for index, (modifier, rounds) in enumerate(pokemon._modifier):
+                value ^= key((side, slot, 'modifier', index, tuple(modifier), rounds))
+        for item, count in trainer.get_inventory().items():
+            value ^= key((side, 'item', item, count))
+        return value
+
+    def hash_battle(self, battle: Battle, is_player: bool) -> int:
+        """
+        Return the hash of a battle state as seen by one side, including the kind of battle, any actions already queued and the order of the round.
+
+        Parameters
+        battle    : The battle to hash.
+        is_player : True iff the state is seen by the player.
+        """
+        value = (self.hash_trainer(battle._player, True) ^ self.hash_trainer(battle._enemy, False)
+                 ^ self.key(('trainer battle', battle._is_trainer_battle)) ^ self.key(('end early', battle._end_early))
+                 ^ self.key(('order', battle._order)) ^ self.key(('perspective', is_player)))
+        for side, action in ((True, battle._trainer_action), (False, battle._enemy_action)):
+            if battle.trainer_has_action_queued(side):
+                value ^= self.key((side, 'queued', action_key(action)))
+        return value
+
+
+class TableEntry(NamedTuple):
+    """
+    A searched position.
+
+    Fields
+    depth      : The number of rounds the position was searched to.
+    value      : The value of the position for the searching side.
+    best_index : The index of the best action among the searching side's legal actions, or -1 if there were none.
+    """
+    depth: int
+    value: float
+    best_index: int
+
+
+class TranspositionTable(object):
+    """A bounded map from position hashes to search results, which evicts the least recently used entry when full."""
+    def __init__(self, capacity: int = DEFAULT_TABLE_SIZE) -> None:
+        """
+        Creates an empty TranspositionTable.
+
+        Parameters
+        capacity : The most entries kept.
+        """
+        self._capacity = capacity
+        self._entries: OrderedDict = OrderedDict()
+
+    def get(self, position: int) -> Optional[TableEntry]:
+        """Return the entry for the position and mark it as recently used, or None if there isn't one."""
+        entry = self._entries.get(position)
+        if entry is not None:
+            self._entries.move_to_end(position)
+        return entry
+
+    def put(self, position: int, entry: TableEntry) -> None:
+        """Stores the entry for the position, evicting the least recently used entry if the table is full."""
+        self._entries[position] = entry
+        self._entries.move_to_end(position)
+        if len(self._entries) > self._capacity:
+            self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        """Removes every entry."""
+        self._entries.clear()
+
+    def __len__(self) -> int:
+        """Return the number of entries in the table."""
+        return len(self._entries)
+
+
+class SearchTimeout(Exception):
+    """Raised to abandon a search which has run out of time."""
+    pass
+
+
+class ExpectiminimaxStrategy(Strategy):
+    """
+    A strategy which searches the rounds ahead and chooses the action with the best expected outcome,
+    assuming the opponent answers with the action which is worst for it.
+    Each round's chance rolls are followed exactly, weighted by their probabilities.
+
+    Searches are iteratively deepened until the maximum depth or the time budget is reached,
+    and positions are cached in a transposition table which is kept between turns.
+
+    Ancestors : Strategy
+    """
+    def __init__(self, max_depth: int = DEFAULT_MAX_DEPTH, time_budget: Optional[float] = DEFAULT_TIME_BUDGET,
+                 table_size: int = DEFAULT_TABLE_SIZE, key_limit: int = DEFAULT_KEY_LIMIT) -> None:
+        """
+        Creates an ExpectiminimaxStrategy.
+
+        Parameters
+        max_depth   : The deepest search, in rounds.
+        time_budget : The time allowed for choosing each action in seconds, or None to always search to max_depth.
+        table_size  : The number of positions kept in the transposition table.
+        key_limit   : The number of feature keys generated before the hasher and the transposition table are started afresh.
+        """
+        self._max_depth = max_depth
+        self._time_budget = time_budget
+        self._key_limit = key_limit
+        self._hasher = ZobristHasher()
+        self._table = TranspositionTable(table_size)
+        self._deadline = float('inf')
+        self._completed_depth = 0
+
+    def get_completed_depth(self) -> int:
+        """Return the depth of the last search which was completed when choosing the previous action."""
+        return self._completed_depth
+
+    def get_next_action(self, battle: Battle, is_player: bool) -> Optional[Action]:
+        """
+        Searches the battle and returns the best action for the trainer, or None if they have no legal actions.
+
+        Parameters
+        battle    : The ongoing pokemon battle.
+        is_player : True iff the action is for the player.
+        """
+        actions = battle.get_legal_actions(is_player)
+        if len(actions) <= 1:
+            return actions[0] if actions else None
+
+        if len(self._hasher) > self._key_limit:
+            # A new hasher generates different keys, so the entries keyed by the old hashes are dropped too.
+            self._hasher = ZobristHasher()
+            self._table.clear()
+
+        start = time.perf_counter()
+        best_index = 0
+        self._completed_depth = 0
+        for depth in range(1, self._max_depth + 1):
+            # The first round is always searched, so there is an informed choice however small the budget is.
+            self._deadline = float('inf') if depth == 1 or self._time_budget is None else start + self._time_budget
+            try:
+                self._search(battle, is_player, depth)
+            except SearchTimeout:
+                break
+            entry = self._table.get(self._hasher.hash_battle(battle, is_player))
+            if entry is not None and 0 <= entry.best_index < len(actions):
+                best_index = entry.best_index
+            self._completed_depth = depth
+        return actions[best_index]
+
+    def _search(self, battle: Battle, is_player: bool, depth: int) -> float:
+        """
+        Return the value of the battle for the trainer when searched the supplied number of rounds ahead,
+        storing the result in the transposition table.
+
+        Parameters
+        battle    : The battle to search. It is never modified.
+        is_player : True iff the value is for the player.
+        depth     : The number of rounds to search.
+        """
+        if time.perf_counter() > self._deadline:
+            raise SearchTimeout()
+        if depth == 0 or battle.is_over():
+            return evaluate(battle, is_player)
+
+        position = self._hasher.hash_battle(battle, is_player)
+        entry = self._table.get(position)
+        if entry is not None and entry.depth >= depth:
+            return entry.value
+
+        actions = battle.get_legal_actions(is_player)
+        if not actions:
+            return evaluate(battle, is_player)
+        # An opponent who already has an action queued has no legal actions, and the round is played with their queued one.
+        replies = battle.get_legal_actions(not is_player) or [None]
+
+        # Try the best action from a shallower search first, so the opponent's replies are cut off sooner.
+        order = list(range(len(actions)))
+        if entry is not None and 0 <= entry.best_index < len(actions):
+            order.insert(0, order.pop(entry.best_index))
+
+        best_value = float('-inf')
+        best_index = order[0]
+        for index in order:
+            worst_value = float('inf')
+            for reply in replies:
+                worst_value = min(worst_value, self._expected_value(battle, is_player, actions[index], reply, depth))
+                if worst_value <= best_value:
+                    break
+            if worst_value > best_value:
+                best_value = worst_value
+                best_index = index
+
+        self._table.put(position, TableEntry(depth, best_value, best_index))
+        return best_value
+
+    def _expected_value(self, battle: Battle, is_player: bool, action: Action, reply: Optional[Action],
+                        depth: int) -> float:
+        """
+        Return the expected value for the trainer of playing a round with the supplied actions, over every outcome of its chance rolls.
+
+        Parameters
+        battle    : The battle being searched. It is never modified.
+        is_player : True iff the value is for the player.
+        action    : The trainer's action.
+        reply     : The opponent's action, or None if they have no legal actions, e.g. because they already have an action queued.
+        depth     : The number of rounds left to search, including this one.
+        """
+        def play(outcome: Battle) -> bool:
+            outcome.queue_action(action, is_player)
+            if reply is not None:
+                outcome.queue_action(reply, not is_player)
+            if not outcome.is_action_queue_full():
+                return False
+            finish_round(outcome)
+            return True
+
+        value = 0.0
+        for probability, outcome, stalled in enumerate_rolls(battle, play):
+            if stalled:
+                value += probability * evaluate(outcome, is_player)
+            else:
+                value += probability * self._search(outcome, is_player, depth - 1)
+        return value
+
+
+def main():
+    from simulator import BattleSimulator
+
+    battles = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    import data
+
+    simulator = BattleSimulator(data.ash, data.brock, ExpectiminimaxStrategy(), TeamRocket(), seed=0)
+    report = simulator.run(battles)
+    print(report)
+    print(report.get_statistics())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,318 @@
+"""Headless battle simulation, used to play out a2.Battle games without the GUI."""
+from __future__ import annotations
+import sys
+import time
+from typing import List, NamedTuple, Optional
+
+from a2 import *
+
+# The number of rounds after which a simulated battle is abandoned.
+DEFAULT_MAX_ROUNDS = 1000
+
+
+class BattleResult(NamedTuple):
+    """
+    A compact record of the outcome of a single simulated battle.
+
+    Fields
+    winner         : True if the player won, False if the enemy won, None if neither side was wiped out.
+    rounds         : The number of rounds that were started.
+    player_fainted : The number of the player's pokemon that fainted.
+    enemy_fainted  : The number of the enemy's pokemon that fainted.
+    ended_early    : True iff the battle was ended early by fleeing or catching the wild pokemon.
+    """
+    winner: Optional[bool]
+    rounds: int
+    player_fainted: int
+    enemy_fainted: int
+    ended_early: bool
+
+
+def count_fainted(trainer: Trainer) -> int:
+    """Return the number of pokemon in the trainer's roster that have fainted."""
+    return sum(1 for pokemon in trainer.get_all_pokemon() if pokemon.has_fainted())
+
+
+def finish_round(battle: Battle) -> None:
+    """
+    Enacts every queued action that is ready to be performed, stopping early if the battle ends.
+
+    Parameters
+    battle : The battle whose queued actions should be enacted.
+    """
+    while battle.is_ready() and not battle.is_over():
+        battle.enact_turn()
+
+
+def play_round(battle: Battle, player_strategy: Strategy, enemy_strategy: Strategy) -> bool:
+    """
+    Queues an action from each strategy and enacts the resulting round.
+    Returns false iff one of the strategies chose an action which could not be queued, in which case nothing is enacted.
+
+    Parameters
+    battle          : The ongoing pokemon battle, with an empty action queue.
+    player_strategy : The strategy choosing the player's actions.
+    enemy_strategy  : The strategy choosing the enemy's actions.
+    """
+    for is_player, strategy in ((True, player_strategy), (False, enemy_strategy)):
+        action = strategy.get_next_action(battle, is_player)
+        if action is not None:
+            battle.queue_action(action, is_player)
+
+    if not battle.is_action_queue_full():
+        return False
+
+    finish_round(battle)
+    return True
+
+
+def summarise_battle(battle: Battle, rounds: int) -> BattleResult:
+    """
+    Builds the result record for a battle.
+
+    Parameters
+    battle : The battle to summarise.
+    rounds : The number of rounds which were played.
+    """
+    player = battle.get_trainer(True)
+    enemy = battle.get_trainer(False)
+    winner = None
+    if enemy.all_pokemon_fainted():
+        winner = True
+    elif player.all_pokemon_fainted():
+        winner = False
+
+    return BattleResult(winner, rounds, count_fainted(player), count_fainted(enemy),
+                        winner is None and battle.is_over())
+
+
+def play_battle(battle: Battle, player_strategy: Strategy, enemy_strategy: Strategy,
+                max_rounds: int = DEFAULT_MAX_ROUNDS) -> BattleResult:
+    """
+    Plays the battle until it is over and returns a record of its outcome.
+    Any actions already in the queue are enacted first, so a battle can be resumed mid-round.
+    The battle is abandoned if it lasts for more than max_rounds rounds, or if a strategy chooses an invalid action.
+
+    Parameters
+    battle          : The battle to play out. It will be modified.
+    player_strategy : The strategy choosing the player's actions.
+    enemy_strategy  : The strategy choosing the enemy's actions.
+    max_rounds      : The maximum number of rounds to play.
+    """
+    finish_round(battle)
+
+    rounds = 0
+    while not battle.is_over() and rounds < max_rounds:
+        rounds += 1
+        if not play_round(battle, player_strategy, enemy_strategy):
+            break
+
+    return summarise_battle(battle, rounds)
+
+
+class BattleStatistics(object):
+    """
+    Aggregate statistics over a number of battle results.
+    Statistics gathered separately, e.g. by different worker processes, can be merged together.
+    """
+    def __init__(self) -> None:
+        """
+        Creates an empty set of statistics.
+
+        Parameters
+        battles        : The number of battles recorded.
+        player_wins    : The number of battles won by the player.
+        enemy_wins     : The number of battles won by the enemy.
+        ended_early    : The number of battles which ended early by fleeing or catching.
+        rounds         : The total number of rounds over all battles.
+        player_fainted : The total number of the player's pokemon that fainted.
+        enemy_fainted  : The total number of the enemy's pokemon that fainted.
+        """
+        self._battles = 0
+        self._player_wins = 0
+        self._enemy_wins = 0
+        self._ended_early = 0
+        self._rounds = 0
+        self._player_fainted = 0
+        self._enemy_fainted = 0
+
+    def add_result(self, result: BattleResult) -> None:
+        """
+        Records the result of a single battle.
+
+        Parameters
+        result : The result to record.
+        """
+        self._battles += 1
+        if result.winner is True:
+            self._player_wins += 1
+        elif result.winner is False:
+            self._enemy_wins += 1
+        if result.ended_early:
+            self._ended_early += 1
+        self._rounds += result.rounds
+        self._player_fainted += result.player_fainted
+        self._enemy_fainted += result.enemy_fainted
+
+    def merge(self, other: BattleStatistics) -> None:
+        """
+        Adds the statistics recorded by another instance to this one.
+
+        Parameters
+        other : The statistics to merge into this instance.
+        """
+        self._battles += other._battles
+        self._player_wins += other._player_wins
+        self._enemy_wins += other._enemy_wins
+        self._ended_early += other._ended_early
+        self._rounds += other._rounds
+        self._player_fainted += other._player_fainted
+        self._enemy_fainted += other._enemy_fainted
+
+    def get_battles(self) -> int:
+        """Return the number of battles recorded."""
+        return self._battles
+
+    def get_wins(self, is_player: bool) -> int:
+        """Return the number of battles won by the player if is_player is true, otherwise by the enemy."""
+        return self._player_wins if is_player else self._enemy_wins
+
+    def get_ended_early(self) -> int:
+        """Return the number of battles which ended early."""
+        return self._ended_early
+
+    def win_rate(self, is_player: bool) -> float:
+        """Return the fraction of battles won by the player if is_player is true, otherwise by the enemy."""
+        return self.get_wins(is_player) / self._battles if self._battles else 0.0
+
+    def mean_rounds(self) -> float:
+        """Return the mean number of rounds per battle."""
+        return self._rounds / self._battles if self._battles else 0.0
+
+    def mean_fainted(self, is_player: bool) -> float:
+        """Return the mean number of the player's (or enemy's) pokemon which fainted per battle."""
+        fainted = self._player_fainted if is_player else self._enemy_fainted
+        return fainted / self._battles if self._battles else 0.0
+
+    def __str__(self) -> str:
+        """Return a short summary of the statistics."""
+        return (f'{self._battles} battles: player won {self.win_rate(True):.1%}, enemy won {self.win_rate(False):.1%}, '
+                f'{self.mean_rounds():.1f} rounds on average')
+
+    def __repr__(self) -> str:
+        """Return a short summary of the statistics."""
+        return str(self)
+
+
+class SimulationReport(object):
+    """The aggregate statistics of several simulated battles, along with the time it took to play them."""
+    def __init__(self, statistics: BattleStatistics, elapsed: float,
+                 results: Optional[List[BattleResult]] = None) -> None:
+        """
+        Creates a SimulationReport.
+
+        Parameters
+        statistics : The aggregate statistics of the simulated battles.
+        elapsed    : The wall-clock time spent playing the battles, in seconds.
+        results    : The individual results of the battles in the order they were played, if they were kept.
+        """
+        self._statistics = statistics
+        self._elapsed = elapsed
+        self._results = results if results is not None else []
+
+    def get_statistics(self) -> BattleStatistics:
+        """Return the aggregate statistics of the simulated battles."""
+        return self._statistics
+
+    def get_results(self) -> List[BattleResult]:
+        """Return the individual results of the simulated battles, or an empty list if they weren't kept."""
+        return self._results
+
+    def get_elapsed(self) -> float:
+        """Return the time spent playing the battles, in seconds."""
+        return self._elapsed
+
+    def battles_per_second(self) -> float:
+        """Return the simulation throughput in battles per second."""
+        if self._elapsed <= 0:
+            return float('inf')
+        return self._statistics.get_battles() / self._elapsed
+
+    def __str__(self) -> str:
+        """Return a short description of the throughput."""
+        return (f'{self._statistics.get_battles()} battles in {self._elapsed:.3f}s '
+                f'({self.battles_per_second():.1f} battles/s)')
+
+    def __repr__(self) -> str:
+        """Return a short description of the throughput."""
+        return str(self)
+
+
+class BattleSimulator(object):
+    """
+    Plays headless battles between two rosters.
+    Every battle is played with fresh clones of the rosters, so the supplied trainers are never modified,
+    and with its own random stream forked from the simulator's.
+    """
+    def __init__(self, player: Trainer, enemy: Trainer, player_strategy: Strategy, enemy_strategy: Strategy,
+                 is_trainer_battle: bool = True, max_rounds: int = DEFAULT_MAX_ROUNDS,
+                 seed: Optional[int] = None) -> None:
+        """
+        Creates a BattleSimulator.
+
+        Parameters
+        player            : The player's trainer and roster.
+        enemy             : The enemy's trainer and roster.
+        player_strategy   : The strategy choosing the player's actions.
+        enemy_strategy    : The strategy choosing the enemy's actions.
+        is_trainer_battle : True iff the battles take place between trainers.
+        max_rounds        : The maximum number of rounds to play in each battle.
+        seed              : The seed of the simulator's random stream, or None to fork from the module-wide generator.
+        """
+        self._player = player
+        self._enemy = enemy
+        self._player_strategy = player_strategy
+        self._enemy_strategy = enemy_strategy
+        self._is_trainer_battle = is_trainer_battle
+        self._max_rounds = max_rounds
+        self._rng = BattleRandom(seed)
+
+    def create_battle(self) -> Battle:
+        """Return a new battle between fresh clones of both rosters."""
+        battle = Battle(self._player.fork(), self._enemy.fork(), self._is_trainer_battle)
+        battle.set_random(self._rng.fork())
+        return battle
+
+    def simulate(self) -> BattleResult:
+        """Plays a single battle to completion and returns its result."""
+        return play_battle(self.create_battle(), self._player_strategy, self._enemy_strategy, self._max_rounds)
+
+    def run(self, count: int) -> SimulationReport:
+        """
+        Plays count battles back-to-back and reports their results and throughput.
+
+        Parameters
+        count : The number of battles to play.
+        """
+        start = time.perf_counter()
+        statistics = BattleStatistics()
+        results = []
+        for _ in range(count):
+            result = self.simulate()
+            statistics.add_result(result)
+            results.append(result)
+        return SimulationReport(statistics, time.perf_counter() - start, results)
+
+
+def main():
+    import data
+
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+    simulator = BattleSimulator(data.ash, data.brock, TeamRocket(), TeamRocket())
+    report = simulator.run(count)
+    print(report)
+    print(report.get_statistics())
+
+
+if __name__ == "__main__":
+    main()
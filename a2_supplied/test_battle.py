@@ -0,0 +1,272 @@
+"""Checks the bookkeeping Battle, Trainer and Pokemon keep to make the engine fast against the behaviour it replaces."""
+import copy
+import gc
+import pickle
+import unittest
+from random import Random
+
+import data
+from a2 import *
+from mcts import RandomStrategy
+
+BATTLES = 30
+ROUNDS = 40
+
+
+class ShinyPokemon(Pokemon):
+    """A pokemon subclass without __slots__, whose instances carry extra attributes."""
+
+
+class LuckyBall(Pokeball):
+    """An item subclass without __slots__, whose instances carry extra attributes."""
+
+
+class SignatureAttack(Attack):
+    """A move subclass without __slots__, whose instances carry extra attributes."""
+
+
+def create_battles():
+    """Return seeded trainer battles and wild encounters between copies of the data.py rosters."""
+    battles = []
+    for seed in range(BATTLES):
+        if seed % 2:
+            battle = Battle(copy.deepcopy(data.ash), copy.deepcopy(data.brock), True)
+        else:
+            battle = create_encounter(copy.deepcopy(data.ash), copy.deepcopy(data.rattata))
+        battle.set_random(BattleRandom(seed))
+        battles.append(battle)
+    return battles
+
+
+def play_states(battle):
+    """
+    Plays the battle with random actions, yielding it in every state a trainer could be asked to act in:
+    before either trainer has queued an action, and after each one has.
+    """
+    rollout = RandomStrategy()
+    for _ in range(ROUNDS):
+        if battle.is_over():
+            return
+        yield battle
+        for is_player in (True, False):
+            action = rollout.get_next_action(battle, is_player)
+            if action is not None:
+                battle.queue_action(action, is_player)
+            yield battle
+        while battle.is_ready() and not battle.is_over():
+            battle.enact_turn()
+
+
+def accepted_actions(battle, is_player):
+    """Return the keys of every candidate action which queue_action accepts for the trainer."""
+    trainer = battle.get_trainer(is_player)
+    candidates = list(trainer.get_current_pokemon()._moves)
+    candidates.extend(SwitchPokemon(index) for index in range(len(trainer.get_all_pokemon())))
+    candidates.extend(trainer.get_inventory())
+    candidates.append(Flee())
+    accepted = []
+    for action in candidates:
+        if battle.trainer_has_action_queued(is_player):
+            break
+        clone = battle.fork()
+        clone.queue_action(action, is_player)
+        if clone.trainer_has_action_queued(is_player):
+            accepted.append(action_key(action))
+    return accepted
+
+
+class TestLegalActions(unittest.TestCase):
+    def test_matches_queue_action(self):
+        """get_legal_actions returns exactly the actions queue_action accepts, in every state random play reaches."""
+        for battle in create_battles():
+            for state in play_states(battle):
+                for is_player in (True, False):
+                    legal = [action_key(action) for action in state.get_legal_actions(is_player)]
+                    self.assertEqual(legal, accepted_actions(state, is_player))
+
+    def test_cache_follows_queue(self):
+        """The cached actions of a trainer are dropped as soon as they queue an action, before the queue is full."""
+        battle = create_battles()[1]
+        actions = battle.get_legal_actions(True)
+        self.assertTrue(actions)
+        battle.queue_action(actions[0], True)
+        self.assertEqual(battle.get_legal_actions(True), [])
+        self.assertTrue(battle.get_legal_actions(False))
+        battle.queue_action(battle.get_legal_actions(False)[0], False)
+        self.assertEqual(battle.get_legal_actions(False), [])
+
+
+class TestAliveCount(unittest.TestCase):
+    def assert_counts(self, battle):
+        """Asserts that each trainer's alive count, and so is_over, agrees with scanning their roster."""
+        for is_player in (True, False):
+            trainer = battle.get_trainer(is_player)
+            alive = sum(1 for pokemon in trainer.get_all_pokemon() if pokemon.get_health() > 0)
+            self.assertEqual(trainer._alive, alive)
+            self.assertEqual(trainer.all_pokemon_fainted(), alive == 0)
+
+    def test_matches_scan(self):
+        """The alive counts agree with scanning the rosters in every state random play reaches, and in copies of it."""
+        for battle in create_battles():
+            for state in play_states(battle):
+                self.assert_counts(state)
+                self.assert_counts(state.fork())
+            self.assert_counts(battle)
+            self.assert_counts(copy.deepcopy(battle))
+
+    def test_follows_health_changes(self):
+        """The alive count follows fainting, healing, resting and new pokemon, including pokemon shared by trainers."""
+        pokemon = [Pokemon(f'Ditto {index}', PokemonStats((1, 100, 100, 100)), 'normal', [], 5) for index in range(3)]
+        trainers = [Trainer('Ash'), Trainer('Gary')]
+        for trainer in trainers:
+            trainer.add_pokemon(pokemon[0])
+        trainers[0].add_pokemon(pokemon[1])
+        battle = Battle(trainers[0], trainers[1], True)
+
+        pokemon[0].modify_health(-1000)
+        self.assert_counts(battle)
+        self.assertEqual(trainers[0]._alive, 1)
+        self.assertTrue(battle.is_over())
+        pokemon[0].modify_health(10)
+        self.assert_counts(battle)
+        self.assertFalse(battle.is_over())
+        pokemon[1].modify_health(-1000)
+        pokemon[0].modify_health(-1000)
+        self.assertEqual(trainers[0]._alive, 0)
+        pokemon[1].rest()
+        trainers[1].add_pokemon(pokemon[2])
+        self.assert_counts(battle)
+        self.assertFalse(battle.is_over())
+
+
+def expected_turn(battle, acted):
+    """
+    Return whose turn it is by the rules the stored round order replaces, given whether an action was enacted this round.
+    With both actions queued the faster goes first, ties going to the player; after one is enacted, the other goes.
+    """
+    queued = [battle.trainer_has_action_queued(is_player) for is_player in (True, False)]
+    if battle.is_over() or not(any(queued)) or not(all(queued) or acted):
+        return None
+    if all(queued):
+        return battle._trainer_action.get_priority() <= battle._enemy_action.get_priority()
+    return queued[0]
+
+
+class TestTurnOrder(unittest.TestCase):
+    def test_matches_queue(self):
+        """The stored order agrees with the queue in every state random play reaches, and is kept by forks."""
+        rollout = RandomStrategy()
+        for battle in create_battles():
+            for _ in range(ROUNDS):
+                if battle.is_over():
+                    break
+                acted = False
+                for is_player in (True, False):
+                    self.assertEqual(battle.get_turn(), expected_turn(battle, acted))
+                    action = rollout.get_next_action(battle, is_player)
+                    if action is not None:
+                        battle.queue_action(action, is_player)
+                while True:
+                    turn = expected_turn(battle, acted)
+                    for state in (battle, battle.fork()):
+                        self.assertEqual(state.get_turn(), turn)
+                        if not(battle.is_over()):
+                            self.assertEqual(state.is_ready(), turn is not None)
+                    if turn is None:
+                        break
+                    battle.enact_turn()
+                    acted = True
+                self.assertTrue(battle.is_over() or battle.is_action_queue_empty())
+
+    def test_rejects_queueing_while_ready(self):
+        """No action can be queued once the round is ready, until both queued actions have been enacted."""
+        battle = create_battles()[1]
+        battle.queue_action(battle.get_legal_actions(True)[0], True)
+        battle.queue_action(battle.get_legal_actions(False)[0], False)
+        first = battle.get_turn()
+        battle.enact_turn()
+        self.assertEqual(battle.get_turn(), not(first))
+        move = battle.get_trainer(first).get_current_pokemon()._moves[0]
+        battle.queue_action(move, first)
+        self.assertFalse(battle.trainer_has_action_queued(first))
+        battle.enact_turn()
+        self.assertIsNone(battle.get_turn())
+        self.assertFalse(battle.is_ready())
+
+
+class TestInventory(unittest.TestCase):
+    def test_indexes_match_scans(self):
+        """The category indexes agree with scanning the inventory, through random additions, uses and removals."""
+        rng = Random(0)
+        items = [Pokeball(f'Ball {index}', rng.choice((0.2, 0.5, 0.8))) for index in range(5)]
+        items += [Food(f'Food {index}', rng.choice((20, 50, 100))) for index in range(5)]
+        trainer = Trainer('Ash')
+        inventory = trainer.get_inventory()
+        for _ in range(2000):
+            item = rng.choice(items)
+            operation = rng.random()
+            if operation < 0.5:
+                trainer.add_item(item, rng.randint(1, 3))
+            elif operation < 0.9:
+                item.decrement_item_count(trainer)
+            else:
+                inventory.pop(item, None)
+
+            for cls, category, rank in ((Pokeball, 'Pokeball', '_catch_chance'), (Food, 'Food', '_health_restored')):
+                members = [item for item in inventory if isinstance(item, cls)]
+                self.assertEqual(inventory.get_items(category), members)
+                self.assertEqual(inventory.get_first(category), members[0] if members else None)
+                self.assertEqual(inventory.get_total(category), sum(inventory[item] for item in members))
+                ranks = [getattr(item, rank) for item in members if inventory[item] > 0]
+                best = inventory.get_best(category)
+                if ranks:
+                    self.assertGreater(inventory[best], 0)
+                    self.assertEqual(getattr(best, rank), max(ranks))
+                else:
+                    self.assertIsNone(best)
+
+    def test_team_rocket_throws_first_pokeball(self):
+        """TeamRocket throws the first pokeball in its inventory at a Pikachu, not the best one."""
+        rocket = Trainer('Jessie')
+        rocket.add_pokemon(Pokemon('Ekans', PokemonStats((1, 100, 100, 100)), 'normal', [], 5))
+        rocket.add_item(Pokeball('Poke Ball', 0.3), 1)
+        rocket.add_item(Pokeball('Master Ball', 1), 1)
+        ash = Trainer('Ash')
+        ash.add_pokemon(Pokemon('Pikachu', PokemonStats((1, 100, 100, 100)), 'electric', [], 5))
+        action = TeamRocket().get_next_action(Battle(rocket, ash, True), True)
+        self.assertEqual(action, Pokeball('Poke Ball', 0.3))
+
+
+class TestInterning(unittest.TestCase):
+    def test_released_when_unused(self):
+        """Items and moves made by of are shared while in use, and dropped from the registry once nothing uses them."""
+        for cls, args in ((Attack, ('Tackle', 'normal', 30, 100, 40, 1)), (Pokeball, ('Great Ball', 0.6))):
+            base = Move if issubclass(cls, Move) else Item
+            first = cls.of(*args)
+            self.assertIs(cls.of(*args), first)
+            key = first._key
+            del first
+            gc.collect()
+            self.assertNotIn(key, base._interned)
+
+
+class TestCopying(unittest.TestCase):
+    def test_subclass_attributes_survive(self):
+        """Subclasses without __slots__ keep their own attributes, as well as their slots, when copied or pickled."""
+        move = SignatureAttack('Volt Tackle', 'electric', 15, 90, 120, 0.9)
+        objects = [ShinyPokemon('Pikachu', PokemonStats((1, 100, 100, 100)), 'electric', [move], 5),
+                   LuckyBall('Lucky Ball', 0.7), move]
+        for value in objects:
+            value.nickname = 'Sparky'
+        for value in objects:
+            clones = [copy.deepcopy(value), pickle.loads(pickle.dumps(value))]
+            if isinstance(value, Pokemon):
+                clones.append(value.fork())
+            for clone in clones:
+                self.assertIs(type(clone), type(value))
+                self.assertEqual(clone.nickname, 'Sparky')
+                self.assertEqual(clone.get_name(), value.get_name())
+
+
+if __name__ == "__main__":
+    unittest.main()
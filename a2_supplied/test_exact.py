@@ -0,0 +1,56 @@
+"""Checks ExactSolver against Monte Carlo estimates and its own bookkeeping."""
+import unittest
+
+from a2 import *
+from exact import ExactSolver, battle_key
+from montecarlo import WinProbabilityEstimator
+
+ROLLOUTS = 2000
+
+
+def create_battle():
+    """Return a small battle which can be solved exactly, as in exact.main."""
+    player = Trainer('Red')
+    enemy = Trainer('Blue')
+    player.add_pokemon(Pokemon('Pikachu', PokemonStats((0.9, 60, 45, 30)), 'electric',
+                               [Attack('Thunder Shock', 'electric', 30, 30, 40, 0.8)], 5))
+    enemy.add_pokemon(Pokemon('Squirtle', PokemonStats((0.8, 70, 40, 40)), 'water',
+                              [Attack('Water Gun', 'water', 25, 30, 40, 0.9)], 5))
+    return Battle(player, enemy, True)
+
+
+class TestExactSolver(unittest.TestCase):
+    def test_within_monte_carlo_interval(self):
+        """The exact win probabilities lie within the confidence intervals of a seeded Monte Carlo estimate."""
+        battle = create_battle()
+        distribution = ExactSolver(TeamRocket(), TeamRocket()).solve(battle)
+        with WinProbabilityEstimator(TeamRocket(), TeamRocket(), ROLLOUTS, tolerance=0, seed=0) as estimator:
+            estimate = estimator.estimate(battle)
+        for is_player, probability in ((True, distribution.player_win), (False, distribution.enemy_win)):
+            low, high = estimate.interval(is_player)
+            self.assertTrue(low <= probability <= high, f'{probability} is outside [{low}, {high}]')
+        self.assertAlmostEqual(distribution.player_win + distribution.enemy_win + distribution.ended_early
+                               + distribution.stalled, 1)
+
+    def test_inventory_order_ignored(self):
+        """Inventories holding the same items have the same key, whatever order the items were added in."""
+        battles = [create_battle(), create_battle()]
+        food, ball = Food('Whopper', 69), Pokeball('Great Ball', 0.6)
+        for battle, items in zip(battles, ((food, ball), (ball, food))):
+            for item in items:
+                battle.get_trainer(True).add_item(item, 2)
+        self.assertEqual(battle_key(battles[0]), battle_key(battles[1]))
+
+    def test_certain_self_loop_never_ends(self):
+        """A state which every round leads back to stalls after infinitely many rounds, rather than straight away."""
+        battle = create_battle()
+        for pokemon in (battle.get_trainer(True).get_current_pokemon(), battle.get_trainer(False).get_current_pokemon()):
+            for move in pokemon._moves:
+                pokemon._move_uses[move] = 0
+        distribution = ExactSolver(TeamRocket(), TeamRocket()).solve(battle)
+        self.assertEqual(distribution.stalled, 1)
+        self.assertEqual(distribution.expected_rounds, float('inf'))
+
+
+if __name__ == "__main__":
+    unittest.main()
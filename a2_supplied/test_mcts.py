@@ -0,0 +1,53 @@
+"""Checks MCTSStrategy and its rollout policies."""
+import copy
+import unittest
+
+import data
+from a2 import *
+from mcts import GreedyDamageStrategy, MCTSStrategy, RandomStrategy
+
+
+def create_battle():
+    """Return a seeded battle between copies of the data.py rosters."""
+    battle = Battle(copy.deepcopy(data.ash), copy.deepcopy(data.brock), True)
+    battle.set_random(BattleRandom(0))
+    return battle
+
+
+class TestMCTSStrategy(unittest.TestCase):
+    def test_needs_a_playout(self):
+        """A strategy which could never play out a position is rejected."""
+        with self.assertRaises(ValueError):
+            MCTSStrategy(iterations=0)
+
+    def test_expired_budget(self):
+        """A budget which runs out before the first batch still chooses a legal action from one playout."""
+        battle = create_battle()
+        strategy = MCTSStrategy(time_budget=0, seed=0)
+        action = strategy.get_next_action(battle, True)
+        self.assertIn(action_key(action), [action_key(legal) for legal in battle.get_legal_actions(True)])
+        self.assertEqual(strategy.get_playouts(), 1)
+
+    def test_seeded_choices_repeat(self):
+        """Strategies with the same seed choose the same action, and leave the battle untouched."""
+        battle = create_battle()
+        before = battle.fork()
+        choices = [MCTSStrategy(iterations=50, seed=1).get_next_action(battle, True) for _ in range(2)]
+        self.assertEqual(action_key(choices[0]), action_key(choices[1]))
+        self.assertEqual([pokemon.get_health() for pokemon in battle.get_trainer(False).get_all_pokemon()],
+                         [pokemon.get_health() for pokemon in before.get_trainer(False).get_all_pokemon()])
+        self.assertTrue(battle.is_action_queue_empty())
+
+
+class TestRolloutPolicies(unittest.TestCase):
+    def test_choose_legal_actions(self):
+        """The rollout policies only choose legal actions."""
+        battle = create_battle()
+        for strategy in (RandomStrategy(), GreedyDamageStrategy()):
+            for is_player in (True, False):
+                action = strategy.get_next_action(battle, is_player)
+                self.assertIn(action_key(action), [action_key(legal) for legal in battle.get_legal_actions(is_player)])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,129 @@
+"""Checks WinProbabilityEstimator, and the forking and random streams it is built on."""
+import copy
+import unittest
+
+import data
+from a2 import *
+from mcts import RandomStrategy
+from montecarlo import WinProbabilityEstimator, wilson_interval
+
+ROLLOUTS = 400
+ROUNDS = 40
+
+
+def create_battle():
+    """Return a seeded battle between copies of the data.py rosters."""
+    battle = Battle(copy.deepcopy(data.ash), copy.deepcopy(data.brock), True)
+    battle.set_random(BattleRandom(0))
+    return battle
+
+
+def describe(battle):
+    """Return the state of a battle which playing it could change."""
+    trainers = []
+    for is_player in (True, False):
+        trainer = battle.get_trainer(is_player)
+        trainers.append((trainer.get_all_pokemon().index(trainer.get_current_pokemon()), dict(trainer.get_inventory()),
+                         [(pokemon.get_health(), pokemon.get_experience(), list(pokemon._modifier),
+                           [uses for _, uses in pokemon.get_move_info()]) for pokemon in trainer.get_all_pokemon()]))
+    return battle.is_over(), battle.is_action_queue_empty(), trainers
+
+
+def play(battle, rounds=ROUNDS):
+    """Plays up to the supplied number of rounds of the battle with random actions."""
+    rollout = RandomStrategy()
+    for _ in range(rounds):
+        if battle.is_over():
+            return
+        for is_player in (True, False):
+            action = rollout.get_next_action(battle, is_player)
+            if action is not None:
+                battle.queue_action(action, is_player)
+        while battle.is_ready() and not battle.is_over():
+            battle.enact_turn()
+
+
+class TestBattleRandom(unittest.TestCase):
+    def test_seeded_streams_repeat(self):
+        """Streams with the same seed draw the same numbers, however many they pre-draw at a time."""
+        draws = [[stream.random() for _ in range(100)]
+                 for stream in (BattleRandom(3), BattleRandom(3, block_size=7), BattleRandom(3, block_size=1))]
+        self.assertEqual(draws[0], draws[1])
+        self.assertEqual(draws[0], draws[2])
+        self.assertTrue(all(0 <= draw < 1 for draw in draws[0]))
+
+    def test_forks_repeat_and_differ(self):
+        """Forks of equally seeded streams repeat each other, while sibling forks and their parent all differ."""
+        parents = [BattleRandom(5), BattleRandom(5)]
+        children = [[parent.fork() for _ in range(2)] for parent in parents]
+        draws = [[[child.random() for _ in range(10)] for child in forks] for forks in children]
+        self.assertEqual(draws[0], draws[1])
+        self.assertNotEqual(draws[0][0], draws[0][1])
+        self.assertNotEqual([parents[0].random() for _ in range(10)], draws[0][0])
+        self.assertTrue(BattleRandom().fork().is_seeded())
+
+    def test_did_succeed(self):
+        """Rolls always succeed at chance 1, never at chance 0, and otherwise at about the supplied rate."""
+        stream = BattleRandom(0)
+        self.assertTrue(all(did_succeed(1, stream) for _ in range(1000)))
+        self.assertFalse(any(stream.did_succeed(0) for _ in range(1000)))
+        successes = sum(did_succeed(0.3, stream) for _ in range(10000))
+        low, high = wilson_interval(successes, 10000, 4)
+        self.assertTrue(low <= 0.3 <= high)
+
+
+class TestFork(unittest.TestCase):
+    def test_fork_is_independent(self):
+        """Playing a fork to the end leaves the original untouched, and the original can still be played."""
+        battle = create_battle()
+        play(battle, 3)
+        before = describe(battle)
+        legal = [action_key(action) for is_player in (True, False) for action in battle.get_legal_actions(is_player)]
+        clone = battle.fork()
+        self.assertEqual(describe(clone), before)
+        play(clone)
+        self.assertNotEqual(describe(clone), before)
+        self.assertEqual(describe(battle), before)
+        self.assertEqual([action_key(action) for is_player in (True, False)
+                          for action in battle.get_legal_actions(is_player)], legal)
+        play(battle)
+        self.assertNotEqual(describe(battle), before)
+
+    def test_fork_keeps_queued_actions(self):
+        """A fork taken with an action queued enacts the same action."""
+        battle = create_battle()
+        action = battle.get_legal_actions(True)[0]
+        battle.queue_action(action, True)
+        clone = battle.fork()
+        self.assertTrue(clone.trainer_has_action_queued(True))
+        self.assertFalse(clone.trainer_has_action_queued(False))
+        clone.queue_action(clone.get_legal_actions(False)[0], False)
+        self.assertFalse(battle.trainer_has_action_queued(False))
+
+
+class TestWinProbabilityEstimator(unittest.TestCase):
+    def test_workers_do_not_change_estimate(self):
+        """The same seed gives the same estimate whether batches are played in-process or across workers."""
+        battle = create_battle()
+        before = describe(battle)
+        counts = []
+        for workers in (1, 2):
+            with WinProbabilityEstimator(RandomStrategy(), RandomStrategy(), ROLLOUTS, tolerance=0, workers=workers,
+                                         seed=1) as estimator:
+                estimate = estimator.estimate(battle)
+            counts.append((estimate.rollouts, estimate.player_wins, estimate.enemy_wins))
+        self.assertEqual(counts[0][0], ROLLOUTS)
+        self.assertEqual(counts[0], counts[1])
+        self.assertEqual(describe(battle), before)
+
+    def test_stops_early(self):
+        """An estimate stops once its intervals are tight enough, and always plays at least one batch."""
+        battle = create_battle()
+        estimate = WinProbabilityEstimator(TeamRocket(), TeamRocket(), ROLLOUTS, batch_size=50, tolerance=0.5,
+                                           seed=0).estimate(battle)
+        self.assertEqual(estimate.rollouts, 50)
+        self.assertLessEqual(estimate.half_width(), 0.5)
+
+
+if __name__ == "__main__":
+    unittest.main()
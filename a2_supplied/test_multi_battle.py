@@ -0,0 +1,119 @@
+"""Checks ActionScheduler and MultiBattle against the two-trainer Battle they generalise."""
+import copy
+import unittest
+from random import Random
+
+import data
+from a2 import *
+from mcts import RandomStrategy
+from multi_battle import ActionScheduler, MultiBattle, Participant
+
+BATTLES = 20
+ROUNDS = 40
+
+
+def describe(trainers):
+    """Return the state of the trainers which a battle could change."""
+    return [(trainer.get_all_pokemon().index(trainer.get_current_pokemon()), dict(trainer.get_inventory()),
+             [(pokemon.get_health(), pokemon.get_level(), pokemon.get_experience(), list(pokemon._modifier),
+               [uses for _, uses in pokemon.get_move_info()]) for pokemon in trainer.get_all_pokemon()])
+            for trainer in trainers]
+
+
+def create_trainer(name, size):
+    """Return a trainer with a roster of the supplied size, who all know the same move."""
+    trainer = Trainer(name)
+    for index in range(size):
+        trainer.add_pokemon(Pokemon(f'{name} {index}', PokemonStats((1, 100, 100, 100)), 'normal',
+                                    [Attack('Tackle', 'normal', 30, 100, 40, 1)], 5))
+    return trainer
+
+
+class TestActionScheduler(unittest.TestCase):
+    def test_orders_by_priority_then_seat(self):
+        """Actions are enacted lowest priority first, with ties going to the participant seated first."""
+        rng = Random(0)
+        actions = [Attack(f'Move {speed}', 'normal', 10, speed, 40, 1) for speed in (10, 20, 20, 30)]
+        actions += [SwitchPokemon(0), Flee(), Food('Whopper', 69)]
+        for _ in range(50):
+            participants = list(range(20))
+            scheduler = ActionScheduler(participants)
+            queued = [(participant, rng.choice(actions)) for participant in participants]
+            rng.shuffle(queued)
+            for participant, action in queued:
+                scheduler.queue(participant, action)
+            self.assertEqual(len(scheduler), len(participants))
+
+            order = []
+            while len(scheduler):
+                participant = scheduler.peek()
+                self.assertEqual(scheduler.pop()[0], participant)
+                self.assertFalse(scheduler.has_queued(participant))
+                order.append(participant)
+            expected = sorted(queued, key=lambda entry: (entry[1].get_priority(), entry[0]))
+            self.assertEqual(order, [participant for participant, _ in expected])
+            self.assertIsNone(scheduler.peek())
+
+    def test_tracks_queued_actions(self):
+        """The scheduler reports each participant's queued action until it is popped or cleared."""
+        scheduler = ActionScheduler(['Ash', 'Brock'])
+        flee = Flee()
+        scheduler.queue('Brock', flee)
+        self.assertTrue(scheduler.has_queued('Brock'))
+        self.assertFalse(scheduler.has_queued('Ash'))
+        self.assertIs(scheduler.get_queued('Brock'), flee)
+        self.assertIsNone(scheduler.get_queued('Ash'))
+        scheduler.clear()
+        self.assertEqual(len(scheduler), 0)
+        self.assertFalse(scheduler.has_queued('Brock'))
+
+
+class TestMultiBattle(unittest.TestCase):
+    def test_matches_battle(self):
+        """A multi-battle between two trainers with one pokemon out each plays exactly like a Battle."""
+        strategy = RandomStrategy()
+        for seed in range(BATTLES):
+            battle = Battle(copy.deepcopy(data.ash), copy.deepcopy(data.brock), True)
+            battle.set_random(BattleRandom(seed))
+            trainers = [copy.deepcopy(data.ash), copy.deepcopy(data.brock)]
+            multi = MultiBattle([[trainers[0]], [trainers[1]]])
+            multi.set_random(BattleRandom(seed))
+            for _ in range(ROUNDS):
+                self.assertEqual(multi.is_over(), battle.is_over())
+                if battle.is_over():
+                    break
+                for is_player in (True, False):
+                    action = strategy.get_next_action(battle, is_player)
+                    if action is not None:
+                        battle.queue_action(action, is_player)
+                while battle.is_ready() and not battle.is_over():
+                    battle.enact_turn()
+                multi.play_round(strategy)
+                self.assertEqual(describe(trainers), describe((battle.get_trainer(True), battle.get_trainer(False))))
+
+    def test_no_duplicate_switches(self):
+        """Two participants of the same trainer can't both switch to the same reserve pokemon in one round."""
+        multi = MultiBattle([[create_trainer('Ash', 4)], [create_trainer('Gary', 2)]], active=2)
+        first, second = Participant(0, 0), Participant(0, 1)
+        multi.queue_action(first, SwitchPokemon(2))
+        self.assertTrue(multi.trainer_has_action_queued(first))
+        self.assertFalse(multi.is_valid(second, SwitchPokemon(2)))
+        multi.queue_action(second, SwitchPokemon(2))
+        self.assertFalse(multi.trainer_has_action_queued(second))
+        switches = [action._next_pokemon_index for action in multi.get_legal_actions(second)
+                    if isinstance(action, SwitchPokemon)]
+        self.assertEqual(switches, [3])
+
+        multi.queue_action(second, SwitchPokemon(3))
+        for participant in (Participant(1, 0), Participant(1, 1)):
+            multi.queue_action(participant, multi.get_legal_actions(participant)[0])
+        self.assertTrue(multi.is_ready())
+        while multi.get_turn() is not None:
+            multi.enact_turn()
+        ash = multi.get_trainer(first)
+        self.assertEqual([ash.get_all_pokemon().index(multi.get_pokemon(participant)) for participant in (first, second)],
+                         [2, 3])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,49 @@
+"""Checks ParallelBattleRunner and the specs it sends to its workers."""
+import unittest
+
+import data
+from a2 import *
+from mcts import RandomStrategy
+from parallel import BattleJob, ParallelBattleRunner, trainer_from_spec, trainer_to_spec
+
+BATTLES = 200
+CHUNK_SIZE = 16
+
+
+def describe(statistics):
+    """Return every total the statistics record."""
+    return (statistics.get_battles(), statistics.get_wins(True), statistics.get_wins(False),
+            statistics.get_ended_early(), statistics.mean_rounds(), statistics.mean_fainted(True),
+            statistics.mean_fainted(False))
+
+
+def create_job():
+    """Return a job of random play between the data.py rosters."""
+    return BattleJob(trainer_to_spec(data.ash), trainer_to_spec(data.brock), RandomStrategy(), RandomStrategy())
+
+
+class TestParallelBattleRunner(unittest.TestCase):
+    def test_workers_do_not_change_results(self):
+        """The same seed gives the same statistics whether the chunks are played in-process or across workers."""
+        job = create_job()
+        reports = [ParallelBattleRunner(job, workers, CHUNK_SIZE).run(BATTLES, seed=7) for workers in (1, 2, 3)]
+        self.assertEqual(reports[0].get_statistics().get_battles(), BATTLES)
+        for report in reports[1:]:
+            self.assertEqual(describe(report.get_statistics()), describe(reports[0].get_statistics()))
+
+    def test_seeds_change_results(self):
+        """Different seeds play different battles."""
+        runner = ParallelBattleRunner(create_job(), 1, CHUNK_SIZE)
+        self.assertNotEqual(describe(runner.run(BATTLES, seed=0).get_statistics()),
+                            describe(runner.run(BATTLES, seed=1).get_statistics()))
+
+
+class TestSpecs(unittest.TestCase):
+    def test_round_trip(self):
+        """A trainer rebuilt from its spec describes the same roster and inventory."""
+        for trainer in (data.ash, data.brock):
+            self.assertEqual(trainer_to_spec(trainer_from_spec(trainer_to_spec(trainer))), trainer_to_spec(trainer))
+
+
+if __name__ == "__main__":
+    unittest.main()
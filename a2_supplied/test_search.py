@@ -0,0 +1,75 @@
+"""Checks the hashing and transposition table of ExpectiminimaxStrategy."""
+import copy
+import unittest
+
+import data
+from a2 import *
+from search import ExpectiminimaxStrategy, TableEntry, ZobristHasher
+
+
+def create_battle(is_trainer_battle=True):
+    """Return a seeded battle between copies of the data.py rosters."""
+    battle = Battle(copy.deepcopy(data.ash), copy.deepcopy(data.brock), is_trainer_battle)
+    battle.set_random(BattleRandom(0))
+    return battle
+
+
+class TestZobristHasher(unittest.TestCase):
+    def test_equal_states_hash_equally(self):
+        """A fork, and a battle built the same way, hash the same as the original."""
+        hasher = ZobristHasher()
+        battle = create_battle()
+        self.assertEqual(hasher.hash_battle(battle.fork(), True), hasher.hash_battle(battle, True))
+        self.assertEqual(hasher.hash_battle(create_battle(), True), hasher.hash_battle(battle, True))
+
+    def test_different_states_hash_differently(self):
+        """Every feature which changes how the battle plays out changes the hash."""
+        hasher = ZobristHasher()
+        battle = create_battle()
+        changed = []
+
+        changed.append(create_battle(is_trainer_battle=False))
+        clone = battle.fork()
+        clone.get_trainer(False).get_current_pokemon()._stats_unmod = PokemonStats((1, 100, 100, 101))
+        changed.append(clone)
+        clone = battle.fork()
+        clone.get_trainer(False).get_current_pokemon()._element_type = 'fire'
+        changed.append(clone)
+        for action in battle.get_legal_actions(False):
+            clone = battle.fork()
+            clone.queue_action(action, False)
+            changed.append(clone)
+        for order in (True, False):
+            clone = battle.fork()
+            clone._order = order
+            changed.append(clone)
+
+        hashes = {hasher.hash_battle(battle, True)}
+        hashes.update(hasher.hash_battle(other, True) for other in changed)
+        self.assertEqual(len(hashes), len(changed) + 1)
+        self.assertNotEqual(hasher.hash_battle(battle, False), hasher.hash_battle(battle, True))
+
+
+class TestExpectiminimaxStrategy(unittest.TestCase):
+    def test_ignores_out_of_range_entries(self):
+        """A table entry whose best action doesn't exist in this position, e.g. after a collision, is ignored."""
+        battle = create_battle()
+        strategy = ExpectiminimaxStrategy(max_depth=1, time_budget=None)
+        position = strategy._hasher.hash_battle(battle, True)
+        strategy._table.put(position, TableEntry(10, 0.0, 99))
+        self.assertIn(strategy.get_next_action(battle, True), battle.get_legal_actions(True))
+
+    def test_answers_queued_actions(self):
+        """The action chosen against a queued action is the one found by a fresh search, whatever was searched before."""
+        battle = create_battle()
+        for action in battle.get_legal_actions(False):
+            clone = battle.fork()
+            clone.queue_action(action, False)
+            expected = ExpectiminimaxStrategy(max_depth=1, time_budget=None).get_next_action(clone.fork(), True)
+            shared = ExpectiminimaxStrategy(max_depth=1, time_budget=None)
+            shared.get_next_action(battle.fork(), True)
+            self.assertIs(shared.get_next_action(clone.fork(), True), expected)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,46 @@
+"""Checks BattleSimulator against the rosters it is given and its own seed."""
+import copy
+import unittest
+
+import data
+from a2 import *
+from mcts import RandomStrategy
+from simulator import BattleSimulator
+
+BATTLES = 20
+
+
+def describe(trainer):
+    """Return the state of a trainer's roster which a battle could change."""
+    return [(pokemon.get_health(), pokemon.get_level(), pokemon.get_experience(), list(pokemon._modifier),
+             [uses for _, uses in pokemon.get_move_info()]) for pokemon in trainer.get_all_pokemon()]
+
+
+def create_simulator(seed):
+    """Return a seeded simulator of random play between copies of the data.py rosters."""
+    return BattleSimulator(copy.deepcopy(data.ash), copy.deepcopy(data.brock), RandomStrategy(), RandomStrategy(),
+                           seed=seed)
+
+
+class TestBattleSimulator(unittest.TestCase):
+    def test_rosters_untouched(self):
+        """Every battle is played between fresh clones, so the rosters given to the simulator never change."""
+        simulator = create_simulator(0)
+        before = [describe(simulator._player), describe(simulator._enemy)]
+        battle = simulator.create_battle()
+        for is_player, trainer in ((True, simulator._player), (False, simulator._enemy)):
+            clone = battle.get_trainer(is_player)
+            self.assertIsNot(clone, trainer)
+            for pokemon in clone.get_all_pokemon():
+                self.assertNotIn(pokemon, trainer.get_all_pokemon())
+        simulator.run(BATTLES)
+        self.assertEqual([describe(simulator._player), describe(simulator._enemy)], before)
+
+    def test_seeded_results_repeat(self):
+        """Simulators with the same seed play the same battles."""
+        results = [create_simulator(1).run(BATTLES).get_results() for _ in range(2)]
+        self.assertEqual(results[0], results[1])
+
+
+if __name__ == "__main__":
+    unittest.main()
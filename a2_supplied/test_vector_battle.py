@@ -0,0 +1,125 @@
+"""Checks VectorBattleState against the object engine in a2."""
+import copy
+import unittest
+
+import numpy as np
+
+import data
+from a2 import *
+from game import DefaultAIStrategy
+from mcts import RandomStrategy
+from vector_battle import ENEMY, PLAYER, VectorBattleState
+
+BATTLES = 50
+ROUNDS = 60
+
+# Moves which always hit, so the hit rolls of the two engines never matter.
+SURE_MOVES = [
+    Attack("Tackle", "normal", 30, 100, 40, 1),
+    Attack("Aqua Jet", "water", 10, 90, 30, 1),
+    Buff("Meditation", "psychic", 5, 80, (0, 100, 50, 50), 3),
+    Debuff("Growl", "normal", 10, 80, (0, -20, -20, -10), 1),
+    Debuff("Screech", "normal", 5, 110, (0, -40, 0, -30), 2),
+]
+
+
+def create_battles():
+    """Return seeded trainer battles and wild encounters between copies of the data.py rosters."""
+    battles = []
+    for seed in range(BATTLES):
+        if seed % 2:
+            battle = Battle(copy.deepcopy(data.ash), copy.deepcopy(data.brock), True)
+        else:
+            battle = create_encounter(copy.deepcopy(data.ash), copy.deepcopy(data.rattata))
+        battle.set_random(BattleRandom(seed))
+        battles.append(battle)
+    return battles
+
+
+def create_sure_battles():
+    """Return seeded trainer battles and wild encounters in which every pokemon knows SURE_MOVES."""
+    battles = []
+    for seed in range(BATTLES):
+        trainers = []
+        for name, levels in (("Ash", (2, 4, 3)), ("Brock", (5, 6))):
+            trainer = Trainer(name)
+            for level in levels:
+                trainer.add_pokemon(Pokemon(f'{name} {level}', PokemonStats((1, 100, 100, 100)), 'normal',
+                                            SURE_MOVES, level))
+            trainers.append(trainer)
+        if seed % 2:
+            battle = Battle(trainers[0], trainers[1], True)
+        else:
+            battle = create_encounter(trainers[0], trainers[1].get_current_pokemon())
+        battle.set_random(BattleRandom(seed))
+        battles.append(battle)
+    return battles
+
+
+def describe(battle):
+    """Return the state of a battle which both engines represent."""
+    trainers = []
+    for is_player in (True, False):
+        trainer = battle.get_trainer(is_player)
+        roster = []
+        for pokemon in trainer.get_all_pokemon():
+            stats = pokemon.get_stats()
+            roster.append((pokemon.get_name(), pokemon.get_health(), pokemon.get_level(), pokemon.get_experience(),
+                           (stats.get_hit_chance(), stats.get_max_health(), stats.get_attack(), stats.get_defense()),
+                           [(tuple(modifier), rounds) for modifier, rounds in pokemon._modifier],
+                           [uses for _, uses in pokemon.get_move_info()]))
+        trainers.append((trainer.get_all_pokemon().index(trainer.get_current_pokemon()), roster))
+    return battle.is_over(), trainers
+
+
+class TestStep(unittest.TestCase):
+    def test_matches_object_engine(self):
+        """Stepping a converted battle leaves it in the same state as enacting the round in the object engine."""
+        rollout = RandomStrategy()
+        for battle in create_sure_battles():
+            rng = np.random.default_rng(0)
+            for _ in range(ROUNDS):
+                if battle.is_over():
+                    break
+                for is_player in (True, False):
+                    action = rollout.get_next_action(battle, is_player)
+                    if action is not None:
+                        battle.queue_action(action, is_player)
+                if not battle.is_ready():
+                    break
+
+                state = VectorBattleState.from_battles([battle])
+                while battle.is_ready() and not battle.is_over():
+                    battle.enact_turn()
+                self.assertTrue(state.step(rng)[0])
+                self.assertEqual(describe(state.to_battle(0)), describe(battle))
+
+
+class TestDefaultActions(unittest.TestCase):
+    def test_matches_default_ai(self):
+        """queue_default_actions chooses what DefaultAIStrategy does, in every state random play reaches."""
+        strategy = DefaultAIStrategy()
+        rollout = RandomStrategy()
+        for battle in create_battles():
+            for _ in range(ROUNDS):
+                if battle.is_over():
+                    break
+                state = VectorBattleState.from_battles([battle])
+                state.queue_default_actions(PLAYER)
+                state.queue_default_actions(ENEMY)
+                converted = state.to_battle(0)
+                for side, is_player in ((PLAYER, True), (ENEMY, False)):
+                    expected = strategy.get_next_action(battle, is_player)
+                    actual = state._get_action(0, side, converted.get_trainer(is_player))
+                    self.assertEqual(action_key(actual), action_key(expected))
+
+                for is_player in (True, False):
+                    action = rollout.get_next_action(battle, is_player)
+                    if action is not None:
+                        battle.queue_action(action, is_player)
+                while battle.is_ready() and not battle.is_over():
+                    battle.enact_turn()
+
+
+if __name__ == "__main__":
+    unittest.main()
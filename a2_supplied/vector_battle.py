@@ -0,0 +1,494 @@
+"""Struct-of-arrays battle state, for simulating many battles at once with NumPy."""
+from __future__ import annotations
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+from a2 import *
+from kernels import batch_attack
+
+# Action kinds stored in the action_kind column.
+NO_ACTION = 0
+MOVE_ACTION = 1
+SWITCH_ACTION = 2
+FLEE_ACTION = 3
+
+# Move kinds stored in the move table.
+ATTACK_MOVE = 1
+BUFF_MOVE = 2
+DEBUFF_MOVE = 3
+
+PLAYER = 0
+ENEMY = 1
+
+
+def _as_stats(values: np.ndarray) -> Tuple[float, int, int, int]:
+    """Converts a row of stats or modifiers back into the tuple format used by the object engine."""
+    hit_chance, *rest = (float(value) for value in values)
+    return (hit_chance, *(int(value) if value.is_integer() else value for value in rest))
+
+
+class VectorBattleState(object):
+    """
+    The state of many two-trainer battles, held column-wise in NumPy arrays.
+
+    Pokemon columns are indexed by [battle, side, roster index], where side 0 is the player and side 1 is the enemy.
+    Moves are interned into a shared move table, and each pokemon's move slots hold indices into that table along with
+    the remaining uses. Stat modifiers are held in per-pokemon slots in the order they were added, and the table grows
+    when a pokemon needs more slots.
+
+    Each round, both trainers queue an action in the action_kind and action_arg columns: a move slot for MOVE_ACTION,
+    a roster index for SWITCH_ACTION, and nothing for FLEE_ACTION. step then resolves the round for every battle in
+    the same order as Battle.enact_turn. Items are not supported.
+
+    Health is clamped to the effective max health whenever the max health changes, as it is in the object engine.
+    """
+    _COLUMNS = ('is_trainer_battle', 'ended_early', 'rounds', 'trainer_name', 'roster_size', 'current',
+                'action_kind', 'action_arg', 'name', 'element', 'level', 'experience', 'health', 'stats',
+                'effective', 'move_id', 'move_uses', 'mod_count', 'mod_values', 'mod_rounds')
+
+    def __init__(self, battles: int, roster_slots: int, move_slots: int, modifier_slots: int = 1) -> None:
+        """
+        Creates the state for the supplied number of battles, with every roster empty.
+
+        Parameters
+        battles        : The number of battles.
+        roster_slots   : The maximum number of pokemon in a roster.
+        move_slots     : The maximum number of moves a pokemon knows.
+        modifier_slots : The initial number of stat modifier slots for each pokemon.
+        """
+        shape = (battles, 2, roster_slots)
+        self.is_trainer_battle = np.ones(battles, dtype=bool)
+        self.ended_early = np.zeros(battles, dtype=bool)
+        self.rounds = np.zeros(battles, dtype=np.int64)
+        self.trainer_name = np.zeros((battles, 2), dtype=np.int32)
+        self.roster_size = np.zeros((battles, 2), dtype=np.int64)
+        self.current = np.zeros((battles, 2), dtype=np.int64)
+        self.action_kind = np.zeros((battles, 2), dtype=np.int8)
+        self.action_arg = np.zeros((battles, 2), dtype=np.int64)
+
+        self.name = np.zeros(shape, dtype=np.int32)
+        self.element = np.zeros(shape, dtype=np.int64)
+        self.level = np.zeros(shape, dtype=np.int64)
+        self.experience = np.zeros(shape, dtype=np.int64)
+        self.health = np.zeros(shape, dtype=np.int64)
+        self.stats = np.zeros(shape + (4,), dtype=np.float64)
+        self.effective = np.zeros(shape + (4,), dtype=np.float64)
+
+        self.move_id = np.full(shape + (move_slots,), -1, dtype=np.int32)
+        self.move_uses = np.zeros(shape + (move_slots,), dtype=np.int64)
+
+        self.mod_count = np.zeros(shape, dtype=np.int64)
+        self.mod_values = np.zeros(shape + (modifier_slots, 4), dtype=np.float64)
+        self.mod_rounds = np.zeros(shape + (modifier_slots,), dtype=np.int64)
+
+        self._names = []
+        self._name_ids = {}
+        self._moves = []
+        self._move_ids = {}
+        self._build_move_table()
+
+    def get_battle_count(self) -> int:
+        """Return the number of battles held in this state."""
+        return len(self.rounds)
+
+    def _intern_name(self, name: str) -> int:
+        """Return the index of the supplied trainer or pokemon name, adding it if necessary."""
+        if name not in self._name_ids:
+            self._name_ids[name] = len(self._names)
+            self._names.append(name)
+        return self._name_ids[name]
+
+    def _intern_move(self, move: Move) -> int:
+        """Return the index of the supplied move in the move table, adding it if necessary."""
+        if move not in self._move_ids:
+            self._move_ids[move] = len(self._moves)
+            self._moves.append(move)
+        return self._move_ids[move]
+
+    def _build_move_table(self) -> None:
+        """Rebuilds the move table columns from the interned moves."""
+        count = len(self._moves)
+        self.move_kind = np.zeros(count, dtype=np.int8)
+        self.move_priority = np.zeros(count, dtype=np.int64)
+        self.move_element = np.zeros(count, dtype=np.int64)
+        self.move_damage = np.zeros(count, dtype=np.float64)
+        self.move_hit_chance = np.zeros(count, dtype=np.float64)
+        self.move_modifier = np.zeros((count, 4), dtype=np.float64)
+        self.move_rounds = np.zeros(count, dtype=np.int64)
+        # Moves with the same name share a rank, so ties keep the order the moves were learned in.
+        names = sorted({move.get_name() for move in self._moves})
+        self.move_name_rank = np.array([names.index(move.get_name()) for move in self._moves], dtype=np.int64)
+        for index, move in enumerate(self._moves):
+            self.move_priority[index] = move.get_priority()
+            self.move_element[index] = move._element_index
+            if isinstance(move, Attack):
+                self.move_kind[index] = ATTACK_MOVE
+                self.move_damage[index] = move._base_damage
+                self.move_hit_chance[index] = move._hit_chance
+            elif isinstance(move, StatusModifier):
+                self.move_kind[index] = BUFF_MOVE if isinstance(move, Buff) else DEBUFF_MOVE
+                self.move_modifier[index] = move._modification
+                self.move_rounds[index] = move._rounds
+
+    @classmethod
+    def from_battles(cls, battles: List[Battle]) -> VectorBattleState:
+        """
+        Builds the state of the supplied battles, including any queued actions.
+
+        Parameters
+        battles : The battles to convert. They are not modified.
+        """
+        trainers = [battle.get_trainer(is_player) for battle in battles for is_player in (True, False)]
+        roster_slots = max(len(trainer.get_all_pokemon()) for trainer in trainers)
+        move_slots = max(len(pokemon._moves) for trainer in trainers for pokemon in trainer.get_all_pokemon())
+        modifier_slots = max([len(pokemon._modifier) for trainer in trainers
+                              for pokemon in trainer.get_all_pokemon()] + [1])
+        state = cls(len(battles), roster_slots, max(move_slots, 1), modifier_slots)
+
+        for b, battle in enumerate(battles):
+            state.is_trainer_battle[b] = battle.is_trainer_battle()
+            state.ended_early[b] = bool(battle._end_early)
+            for side, is_player in ((PLAYER, True), (ENEMY, False)):
+                trainer = battle.get_trainer(is_player)
+                state.trainer_name[b, side] = state._intern_name(trainer.get_name())
+                state.roster_size[b, side] = len(trainer.get_all_pokemon())
+                for p, pokemon in enumerate(trainer.get_all_pokemon()):
+                    if pokemon is trainer.get_current_pokemon():
+                        state.current[b, side] = p
+                    state._set_pokemon(b, side, p, pokemon)
+                if battle.trainer_has_action_queued(is_player):
+                    action = battle._trainer_action if is_player else battle._enemy_action
+                    state._set_action(b, side, action, trainer)
+
+        state._build_move_table()
+        return state
+
+    def _set_pokemon(self, b: int, side: int, p: int, pokemon: Pokemon) -> None:
+        """Copies a pokemon's state into its slot."""
+        self.name[b, side, p] = self._intern_name(pokemon.get_name())
+        self.element[b, side, p] = pokemon._element_index
+        self.level[b, side, p] = pokemon.get_level()
+        self.experience[b, side, p] = pokemon.get_experience()
+        self.health[b, side, p] = pokemon.get_health()
+        unmod = pokemon._stats_unmod
+        self.stats[b, side, p] = (unmod.get_hit_chance(), unmod.get_max_health(), unmod.get_attack(),
+                                  unmod.get_defense())
+        stats = pokemon.get_stats()
+        self.effective[b, side, p] = (stats.get_hit_chance(), stats.get_max_health(), stats.get_attack(),
+                                      stats.get_defense())
+        for slot, move in enumerate(pokemon._moves):
+            self.move_id[b, side, p, slot] = self._intern_move(move)
+            self.move_uses[b, side, p, slot] = pokemon.get_remaining_move_uses(move)
+        self.mod_count[b, side, p] = len(pokemon._modifier)
+        for slot, (modifier, rounds) in enumerate(pokemon._modifier):
+            self.mod_values[b, side, p, slot] = modifier
+            self.mod_rounds[b, side, p, slot] = rounds
+
+    def _set_action(self, b: int, side: int, action: Action, trainer: Trainer) -> None:
+        """Encodes a queued action into the action columns."""
+        if isinstance(action, Move):
+            kind, arg = MOVE_ACTION, trainer.get_current_pokemon()._moves.index(action)
+        elif isinstance(action, SwitchPokemon):
+            kind, arg = SWITCH_ACTION, action._next_pokemon_index
+        elif isinstance(action, Flee):
+            kind, arg = FLEE_ACTION, 0
+        else:
+            raise ValueError(f'{action} cannot be represented in a VectorBattleState')
+        self.action_kind[b, side] = kind
+        self.action_arg[b, side] = arg
+
+    @classmethod
+    def repeat(cls, battle: Battle, count: int) -> VectorBattleState:
+        """
+        Builds the state of count identical copies of the supplied battle, e.g. many wild encounters from create_encounter.
+
+        Parameters
+        battle : The battle to copy. It is not modified.
+        count  : The number of copies.
+        """
+        state = cls.from_battles([battle])
+        for column in cls._COLUMNS:
+            setattr(state, column, np.repeat(getattr(state, column), count, axis=0))
+        return state
+
+    def to_battle(self, b: int) -> Battle:
+        """
+        Builds an a2.Battle with the state of the battle at the supplied index, including any queued actions.
+
+        Parameters
+        b : The index of the battle.
+        """
+        trainers = []
+        for side in (PLAYER, ENEMY):
+            trainer = Trainer(self._names[self.trainer_name[b, side]])
+            for p in range(self.roster_size[b, side]):
+                trainer.add_pokemon(self._get_pokemon(b, side, p))
+            trainer.switch_pokemon(int(self.current[b, side]))
+            trainers.append(trainer)
+
+        battle = Battle(trainers[PLAYER], trainers[ENEMY], bool(self.is_trainer_battle[b]))
+        battle._end_early = bool(self.ended_early[b])
+        for side, is_player in ((PLAYER, True), (ENEMY, False)):
+            action = self._get_action(b, side, trainers[side])
+            if action is not None:
+                battle.queue_action(action, is_player)
+        return battle
+
+    def _get_pokemon(self, b: int, side: int, p: int) -> Pokemon:
+        """Builds a pokemon from the state in its slot."""
+        moves = [self._moves[move_id] for move_id in self.move_id[b, side, p] if move_id >= 0]
+        pokemon = Pokemon(self._names[self.name[b, side, p]], PokemonStats(_as_stats(self.stats[b, side, p])),
+                          ElementType._names[self.element[b, side, p]], moves, int(self.level[b, side, p]))
+        pokemon._experience = int(self.experience[b, side, p])
+        for slot, move in enumerate(moves):
+            pokemon._move_uses[move] = int(self.move_uses[b, side, p, slot])
+        for slot in range(self.mod_count[b, side, p]):
+            pokemon.add_stat_modifier(_as_stats(self.mod_values[b, side, p, slot]), int(self.mod_rounds[b, side, p, slot]))
+        pokemon._current_health = int(self.health[b, side, p])
+        return pokemon
+
+    def _get_action(self, b: int, side: int, trainer: Trainer) -> Optional[Action]:
+        """Decodes the queued action of a trainer, or returns None if they have none queued."""
+        kind = self.action_kind[b, side]
+        arg = int(self.action_arg[b, side])
+        if kind == MOVE_ACTION:
+            return trainer.get_current_pokemon()._moves[arg]
+        if kind == SWITCH_ACTION:
+            return SwitchPokemon(arg)
+        if kind == FLEE_ACTION:
+            return Flee()
+        return None
+
+    def is_over(self) -> np.ndarray:
+        """Return a mask of the battles which are over, because either roster has fainted or they ended early."""
+        return self.ended_early | self.all_pokemon_fainted(PLAYER) | self.all_pokemon_fainted(ENEMY)
+
+    def all_pokemon_fainted(self, side: int) -> np.ndarray:
+        """Return a mask of the battles in which all of the pokemon on the supplied side have fainted."""
+        in_roster = np.arange(self.health.shape[2]) < self.roster_size[:, side, None]
+        return ~np.any(in_roster & (self.health[:, side] > 0), axis=1)
+
+    def current_has_fainted(self, side: int) -> np.ndarray:
+        """Return a mask of the battles in which the current pokemon on the supplied side has fainted."""
+        return self.health[np.arange(self.get_battle_count()), side, self.current[:, side]] == 0
+
+    def queue_default_actions(self, side: int) -> None:
+        """
+        Queues an action for the supplied side in every battle, as DefaultAIStrategy chooses:
+        switch to the first pokemon that hasn't fainted if the current one has, otherwise use the first move
+        with uses in the order of Pokemon.get_move_info, i.e. sorted by name, otherwise flee.
+
+        Parameters
+        side : PLAYER or ENEMY.
+        """
+        battles = np.arange(self.get_battle_count())
+        current = self.current[:, side]
+        fainted = self.current_has_fainted(side)
+        in_roster = np.arange(self.health.shape[2]) < self.roster_size[:, side, None]
+        alive = in_roster & (self.health[:, side] > 0)
+        move_id = self.move_id[battles, side, current]
+        usable = (move_id >= 0) & (self.move_uses[battles, side, current] > 0)
+        rank = np.full(move_id.shape, np.iinfo(np.int64).max, dtype=np.int64)
+        slots = np.broadcast_to(np.arange(move_id.shape[1]), move_id.shape)
+        rank[usable] = self.move_name_rank[move_id[usable]] * move_id.shape[1] + slots[usable]
+
+        kind = np.full(len(battles), FLEE_ACTION, dtype=np.int8)
+        arg = np.zeros(len(battles), dtype=np.int64)
+        has_move = usable.any(axis=1)
+        kind[has_move] = MOVE_ACTION
+        arg[has_move] = rank.argmin(axis=1)[has_move]
+        can_switch = fainted & alive.any(axis=1)
+        kind[can_switch] = SWITCH_ACTION
+        arg[can_switch] = alive.argmax(axis=1)[can_switch]
+        self.action_kind[:, side] = kind
+        self.action_arg[:, side] = arg
+
+    def _valid_actions(self, side: int) -> np.ndarray:
+        """Return a mask of the battles in which the supplied side has a valid action queued."""
+        battles = np.arange(self.get_battle_count())
+        kind = self.action_kind[:, side]
+        arg = self.action_arg[:, side]
+        current = self.current[:, side]
+        fainted = self.current_has_fainted(side)
+
+        slot = np.clip(arg, 0, self.move_id.shape[3] - 1)
+        known = (arg >= 0) & (arg < self.move_id.shape[3]) & (self.move_id[battles, side, current, slot] >= 0)
+        move_valid = known & (self.move_uses[battles, side, current, slot] > 0) & ~fainted
+
+        index = np.clip(arg, 0, self.health.shape[2] - 1)
+        switch_valid = ((arg >= 0) & (arg < self.roster_size[:, side]) & (arg != current)
+                        & (self.health[battles, side, index] > 0))
+
+        return (((kind == MOVE_ACTION) & move_valid) | ((kind == SWITCH_ACTION) & switch_valid)
+                | ((kind == FLEE_ACTION) & ~fainted))
+
+    def _priorities(self, side: int) -> np.ndarray:
+        """Return the priority of the action queued by the supplied side in every battle."""
+        battles = np.arange(self.get_battle_count())
+        slot = np.clip(self.action_arg[:, side], 0, self.move_id.shape[3] - 1)
+        move_id = self.move_id[battles, side, self.current[:, side], slot]
+        priority = np.full(len(battles), DEFAULT_ACTION_PRIORITY, dtype=np.int64)
+        is_move = self.action_kind[:, side] == MOVE_ACTION
+        priority[is_move] = self.move_priority[move_id[is_move]]
+        return priority
+
+    def step(self, rng: Optional[np.random.Generator] = None) -> np.ndarray:
+        """
+        Resolves one round in every live battle where both trainers have a valid action queued, and returns a mask
+        of the battles which advanced. Actions are enacted in order of priority with ties going to the player, and
+        the post round actions happen before the second action, as in Battle.enact_turn. The second action is skipped
+        if the first one ended the battle. The queued actions of advanced battles are cleared.
+
+        Parameters
+        rng : The generator to draw hit rolls from. A new unseeded generator is used if omitted.
+        """
+        if rng is None:
+            rng = np.random.default_rng()
+        ready = ~self.is_over() & self._valid_actions(PLAYER) & self._valid_actions(ENEMY)
+        first = np.where(self._priorities(PLAYER) <= self._priorities(ENEMY), PLAYER, ENEMY)
+
+        self._enact(ready, first, rng)
+        unfinished = ready & ~self.is_over()
+        self._post_round_actions(unfinished)
+        self._enact(unfinished, 1 - first, rng)
+
+        self.action_kind[ready] = NO_ACTION
+        self.rounds[ready] += 1
+        return ready
+
+    def _enact(self, mask: np.ndarray, sides: np.ndarray, rng: np.random.Generator) -> None:
+        """Applies the action queued by the supplied side in each of the masked battles."""
+        battles = np.nonzero(mask)[0]
+        sides = sides[battles]
+        kind = self.action_kind[battles, sides]
+        arg = self.action_arg[battles, sides]
+
+        switch = kind == SWITCH_ACTION
+        self.current[battles[switch], sides[switch]] = arg[switch]
+
+        flee = battles[kind == FLEE_ACTION]
+        self.ended_early[flee] |= ~self.is_trainer_battle[flee]
+
+        move = kind == MOVE_ACTION
+        battles, sides, slots = battles[move], sides[move], arg[move]
+        users = self.current[battles, sides]
+        move_ids = self.move_id[battles, sides, users, slots]
+        self.move_uses[battles, sides, users, slots] -= 1
+        move_kind = self.move_kind[move_ids]
+
+        buff = move_kind == BUFF_MOVE
+        self._add_modifier(battles[buff], sides[buff], users[buff], move_ids[buff])
+        debuff = move_kind == DEBUFF_MOVE
+        targets = self.current[battles[debuff], 1 - sides[debuff]]
+        self._add_modifier(battles[debuff], 1 - sides[debuff], targets, move_ids[debuff])
+
+        attack = move_kind == ATTACK_MOVE
+        self._attack(battles[attack], sides[attack], users[attack], move_ids[attack], rng)
+
+    def _attack(self, battles: np.ndarray, sides: np.ndarray, users: np.ndarray, move_ids: np.ndarray,
+                rng: np.random.Generator) -> None:
+        """Resolves the supplied attacks, as Attack.apply does, with the hit rolls and damage of kernels.batch_attack."""
+        enemies = 1 - sides
+        targets = self.current[battles, enemies]
+        attacker = self.effective[battles, sides, users]
+        defender = self.effective[battles, enemies, targets]
+
+        hit, damage = batch_attack(self.move_damage[move_ids], self.move_hit_chance[move_ids], self.move_element[move_ids],
+                                   attacker[:, STAT_ATTACK], attacker[:, STAT_HIT_CHANCE], defender[:, STAT_DEFENSE],
+                                   self.element[battles, enemies, targets], rng)
+
+        battles, sides, users, enemies, targets, damage = (
+            column[hit] for column in (battles, sides, users, enemies, targets, damage))
+        max_health = self.effective[battles, enemies, targets, STAT_MAX_HEALTH].astype(np.int64)
+        health = np.clip(self.health[battles, enemies, targets] - damage, 0, max_health)
+        self.health[battles, enemies, targets] = health
+
+        fainted = health == 0
+        experience = np.floor(200 * self.level[battles, enemies, targets] / 7).astype(np.int64)
+        self._gain_experience(battles[fainted], sides[fainted], users[fainted], experience[fainted])
+
+    def _add_modifier(self, battles: np.ndarray, sides: np.ndarray, pokemon: np.ndarray, move_ids: np.ndarray) -> None:
+        """Adds the stat modifiers of the supplied moves to the supplied pokemon, as Pokemon.add_stat_modifier does."""
+        if len(battles) == 0:
+            return
+        slots = self.mod_count[battles, sides, pokemon]
+        while slots.max() >= self.mod_rounds.shape[3]:
+            self._grow_modifier_slots()
+        modifier = self.move_modifier[move_ids]
+        self.mod_values[battles, sides, pokemon, slots] = modifier
+        self.mod_rounds[battles, sides, pokemon, slots] = self.move_rounds[move_ids]
+        self.mod_count[battles, sides, pokemon] += 1
+
+        effective = np.maximum(self.effective[battles, sides, pokemon] + modifier, 0)
+        self.effective[battles, sides, pokemon] = effective
+        self._clamp_health(battles, sides, pokemon)
+
+    def _grow_modifier_slots(self) -> None:
+        """Doubles the number of stat modifier slots for every pokemon."""
+        self.mod_values = np.concatenate([self.mod_values, np.zeros_like(self.mod_values)], axis=3)
+        self.mod_rounds = np.concatenate([self.mod_rounds, np.zeros_like(self.mod_rounds)], axis=3)
+
+    def _apply_modifiers(self, battles: np.ndarray, sides: np.ndarray, pokemon: np.ndarray) -> None:
+        """Rebuilds the effective stats of the supplied pokemon by applying their modifiers in order."""
+        effective = self.stats[battles, sides, pokemon]
+        count = self.mod_count[battles, sides, pokemon]
+        values = self.mod_values[battles, sides, pokemon]
+        for slot in range(values.shape[1]):
+            active = (slot < count)[:, None]
+            effective = np.where(active, np.maximum(effective + values[:, slot], 0), effective)
+        self.effective[battles, sides, pokemon] = effective
+
+    def _clamp_health(self, battles: np.ndarray, sides: np.ndarray, pokemon: np.ndarray) -> None:
+        """Clamps the health of the supplied pokemon to their effective max health."""
+        max_health = self.effective[battles, sides, pokemon, STAT_MAX_HEALTH].astype(np.int64)
+        self.health[battles, sides, pokemon] = np.minimum(self.health[battles, sides, pokemon], max_health)
+
+    def _post_round_actions(self, mask: np.ndarray) -> None:
+        """Counts down the stat modifiers of each current pokemon in the masked battles, as Pokemon.post_round_actions does."""
+        battles = np.nonzero(mask)[0]
+        for side in (PLAYER, ENEMY):
+            sides = np.full(len(battles), side)
+            pokemon = self.current[battles, side]
+            rounds = self.mod_rounds[battles, side, pokemon]
+            active = np.arange(rounds.shape[1]) < self.mod_count[battles, side, pokemon, None]
+            expired = active & (rounds == 1)
+            kept = active & ~expired
+
+            order = np.argsort(~kept, axis=1, kind='stable')
+            self.mod_rounds[battles, side, pokemon] = np.take_along_axis(np.where(kept, rounds - 1, 0), order, axis=1)
+            values = self.mod_values[battles, side, pokemon]
+            self.mod_values[battles, side, pokemon] = np.take_along_axis(values, order[:, :, None], axis=1)
+            self.mod_count[battles, side, pokemon] = kept.sum(axis=1)
+
+            changed = expired.any(axis=1)
+            self._apply_modifiers(battles[changed], sides[changed], pokemon[changed])
+            self._clamp_health(battles, sides, pokemon)
+
+    def _gain_experience(self, battles: np.ndarray, sides: np.ndarray, pokemon: np.ndarray,
+                         experience: np.ndarray) -> None:
+        """Gives experience to the supplied pokemon and levels them up as needed, as Pokemon.gain_experience does."""
+        self.experience[battles, sides, pokemon] += experience
+        while True:
+            level = self.level[battles, sides, pokemon]
+            levelling = self.experience[battles, sides, pokemon] >= (level + 1) ** 3
+            if not levelling.any():
+                return
+            self._level_up(battles[levelling], sides[levelling], pokemon[levelling])
+
+    def _level_up(self, battles: np.ndarray, sides: np.ndarray, pokemon: np.ndarray) -> None:
+        """Levels up the supplied pokemon, as Pokemon.level_up does."""
+        stats = self.stats[battles, sides, pokemon]
+        health = np.minimum(self.health[battles, sides, pokemon], stats[:, STAT_MAX_HEALTH].astype(np.int64))
+        health_reduced = stats[:, STAT_MAX_HEALTH].astype(np.int64) - health
+
+        grown = stats.copy()
+        grown[:, STAT_HIT_CHANCE] = 1
+        grown[:, STAT_MAX_HEALTH:] = np.trunc(grown[:, STAT_MAX_HEALTH:] * LEVEL_UP_STAT_GROWTH)
+        self.stats[battles, sides, pokemon] = grown
+        self.level[battles, sides, pokemon] += 1
+        self.health[battles, sides, pokemon] = np.where(
+            health != 0, grown[:, STAT_MAX_HEALTH].astype(np.int64) - health_reduced, health)
+
+        self._apply_modifiers(battles, sides, pokemon)
+        self._clamp_health(battles, sides, pokemon)